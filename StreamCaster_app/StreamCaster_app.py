@@ -2,31 +2,60 @@ import uvicorn
 import asyncio
 import base64
 import datetime
+import hashlib
 import logging
+import mmap
+import multiprocessing
+import os
+import random
 import secrets
+import signal
+import socket
+import struct
 import sys
+import threading
 import time
 import json
-from collections import defaultdict
+import urllib.parse
+import math
+from bisect import bisect_left
+from collections import (
+    defaultdict,
+    deque,
+)
 from typing import (
     Dict,
     List,
     Optional,
 )
 
+try:
+    import uvloop  # Faster event loop, used if installed
+except ImportError:
+    uvloop = None
 from fastapi import (
     FastAPI,
     HTTPException,
     Depends,
+    Query,
+    Request,
+    WebSocket,
 )
 
 from fastapi.security import (
     HTTPBasic,
     HTTPBasicCredentials,
 )
-from pydantic import BaseModel
+from pydantic import (
+    AwareDatetime,
+    BaseModel,
+)
 from starlette import status
-from starlette.responses import JSONResponse
+from starlette.responses import (
+    JSONResponse,
+    PlainTextResponse,
+    StreamingResponse,
+)
 
 
 logging.basicConfig(level=logging.INFO, filename='report.log')
@@ -35,7 +64,1467 @@ logger = logging.getLogger(__name__)
 SERVER_PASSWORD = "server_password"
 RECONNECT_DELAY = 300  # seconds
 SERVER_TIMEOUT = 120  # seconds
-CONFIG_FILE = "app_settings.json"
+HEARTBEAT_INTERVAL = 10  # seconds without data from server before heartbeat is sent to it
+TIMER_TICK = 1  # seconds, resolution of timer wheel
+TIMER_SLOTS = 512
+CONFIG_FILE = os.environ.get('STREAMCASTER_CONFIG', "app_settings.json")
+NTRIP_PORT = int(os.environ.get('STREAMCASTER_NTRIP_PORT', 2101))
+CONFIG_WRITE_DELAY = 0.5  # seconds, admin changes made within this time are saved with one write
+PASSWORD_HASH_ITERATIONS = 100_000
+AUTH_CACHE_SIZE = 100_000  # verified client credentials kept in memory
+USER_OPTIONS = ('message_types', 'max_connections', 'max_bytes_per_sec')  # optional fields of user, unset if empty
+LISTING_MAX_LIMIT = 1000  # entries in one page of admin listings
+WEB_TOKEN_TTL = 30  # seconds, one-time token of WebSocket and SSE clients is valid for this time
+RECORD_DIR = os.environ.get('STREAMCASTER_RECORD_DIR', 'recordings')
+RECORD_FLUSH_INTERVAL = 1  # seconds, recorded data is written to disk in batches
+RECORD_HEADER = struct.Struct('!dI')  # unix time, chunk length
+RECORD_READ_SIZE = 1024 * 1024  # bytes of segment file read by replay in one executor call
+RELAY_BACKOFF_MIN = 1  # seconds, first delay before reconnecting to upstream caster
+RELAY_BACKOFF_MAX = 60  # seconds
+RELAY_CONNECT_TIMEOUT = 10  # seconds
+WORKERS = int(os.environ.get('STREAMCASTER_WORKERS', 0))  # NTRIP worker processes, 0 - serve inside FastAPI process
+CLUSTER_SOCKET = os.environ.get('STREAMCASTER_CLUSTER_SOCKET', '/tmp/streamcaster_cluster.sock')
+CLIENT_BUFFER_SIZE = 256  # chunks kept in each client ring buffer
+CLIENT_READ_SIZE = 65536  # bytes, data sent by client (NMEA GGA) is read and discarded in pieces up to StreamReader limit
+PROFILE_ENABLED = os.environ.get('STREAMCASTER_PROFILE', '1') != '0'  # event loop lag and slow callback profiler
+PROFILE_INTERVAL = 0.05  # seconds between event loop lag samples
+SLOW_CALLBACK_THRESHOLD = 0.1  # seconds, loop blocked or lock held longer than this is recorded
+PROFILE_KEEP = 100  # recent slow callbacks and lock holds kept for /debug/profile
+REQUEST_MAX_SIZE = 8192  # bytes, request line with headers
+REQUEST_TIMEOUT = 10  # seconds to receive whole request
+REQUEST_IDLE = 0.3  # seconds, NTRIP 1.0 request without empty line is complete after this pause
+DEFAULT_STREAM_SETTINGS = {
+    'read_size': 65536,  # bytes, max chunk read from server at once
+    'coalesce_window_us': 0,  # microseconds to wait for more data after a small read, 0 - forward at once
+    'client_heartbeat_sec': 0,  # send b' ' to clients idle for this time, 0 - rely on TCP keepalive only
+    'slow_client_policy': 'drop_oldest',  # one of SLOW_CLIENT_POLICIES
+    'max_lag_bytes': 1048576,  # bytes waiting in client buffer before slow client policy is applied
+    'max_lag_sec': 5,  # age of the oldest chunk in client buffer before slow client policy is applied
+    'history_mode': 'off',  # one of HISTORY_MODES
+    'history_sec': 30,  # max age of data kept for new clients
+    'history_bytes': 65536,  # max size of data kept for new clients
+    'record': False,  # save server data to segment files in RECORD_DIR
+    'record_segment_sec': 3600,  # duration of one segment file
+    'record_keep_sec': 604800,  # segments older than this are deleted
+    'rtcm3_frames': False,  # broadcast only whole RTCM3 frames with valid CRC-24Q, enables message type filters
+}
+HISTORY_MODES = (
+    'off',
+    'raw',  # the latest chunks as received from server
+    'rtcm3',  # the latest RTCM3 frame of each message type
+)
+SLOW_CLIENT_POLICIES = (
+    'drop_oldest',  # drop the oldest chunks until client is below lag threshold
+    'skip_to_latest',  # drop everything except the latest chunk
+    'disconnect',  # close connection of lagging client
+)
+RTCM3_PREAMBLE = 0xD3
+RTCM3_MAX_FRAME = 3 + 1023 + 3  # header, max payload, crc
+CRC24Q_POLY = 0x1864CFB
+METRICS = {  # {name: (type, help, histogram buckets)}
+    'streamcaster_bytes_in_total': ('counter', 'Bytes received from servers', None),
+    'streamcaster_bytes_out_total': ('counter', 'Bytes sent to clients', None),
+    'streamcaster_dropped_bytes_total': ('counter', 'Bytes dropped by slow client policy', None),
+    'streamcaster_dropped_chunks_total': ('counter', 'Chunks dropped by slow client policy', None),
+    'streamcaster_slow_clients_disconnected_total': ('counter', 'Clients disconnected by slow client policy', None),
+    'streamcaster_client_connections_total': ('counter', 'Accepted client connections', None),
+    'streamcaster_client_disconnections_total': ('counter', 'Closed client connections', None),
+    'streamcaster_client_rejections_total': ('counter', 'Client connections refused', None),
+    'streamcaster_source_connections_total': ('counter', 'Accepted server connections', None),
+    'streamcaster_source_disconnections_total': ('counter', 'Closed server connections', None),
+    'streamcaster_rtcm3_crc_errors_total': ('counter', 'RTCM3 frames dropped because of wrong CRC-24Q', None),
+    'streamcaster_cluster_dropped_bytes_total': (
+        'counter', 'Data not relayed between processes because the other side does not read', None
+    ),
+    'streamcaster_client_queue_depth': (
+        'histogram', 'Chunks waiting in client buffer when new chunk is added', (1, 2, 4, 8, 16, 32, 64, 128, 256)
+    ),
+    'streamcaster_drain_seconds': (
+        'histogram', 'Time of writer.drain() for client socket', (0.0001, 0.001, 0.01, 0.05, 0.1, 0.5, 1, 5)
+    ),
+    'streamcaster_loop_lag_seconds': (
+        'histogram', 'Delay of event loop timer callbacks', (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5)
+    ),
+    'streamcaster_lock_hold_seconds': (
+        'histogram', 'Time admin and config locks are held', (0.0001, 0.001, 0.01, 0.05, 0.1, 0.5, 1, 5)
+    ),
+}
+
+
+def hash_password(
+        password: str
+) -> str:
+    """Returns salted PBKDF2 hash of user password in format pbkdf2_sha256$iterations$salt$hash"""
+    salt = secrets.token_hex(16)
+    digest = hashlib.pbkdf2_hmac('sha256', password.encode(), bytes.fromhex(salt), PASSWORD_HASH_ITERATIONS)
+    return f"pbkdf2_sha256${PASSWORD_HASH_ITERATIONS}${salt}${digest.hex()}"
+
+
+def check_password(
+        password: str,
+        stored_password: str
+) -> bool:
+    """Compares password with stored one, which is either PBKDF2 hash or plain text"""
+    if stored_password.startswith('pbkdf2_sha256$'):
+        _, iterations, salt, digest = stored_password.split('$')
+        password_digest = hashlib.pbkdf2_hmac('sha256', password.encode(), bytes.fromhex(salt), int(iterations))
+        return secrets.compare_digest(password_digest.hex(), digest)
+    return secrets.compare_digest(password.encode(), stored_password.encode())
+
+
+class Metrics:
+    """Counters and histograms of this process exported in Prometheus text format"""
+    def __init__(self):
+        self.counters: Dict[tuple, float] = defaultdict(float)  # {(name, streampoint): value}
+        self.histograms: Dict[tuple, list] = {}  # {(name, streampoint): [bucket counts..., +Inf count, sum]}
+
+    def inc(
+            self,
+            name: str,
+            streampoint: str = '',
+            value: float = 1
+    ) -> None:
+        self.counters[(name, streampoint)] += value
+
+    def observe(
+            self,
+            name: str,
+            value: float,
+            streampoint: str = '',
+            count: int = 1
+    ) -> None:
+        """Add value to histogram count times"""
+        buckets = METRICS[name][2]
+        histogram = self.histograms.get((name, streampoint))
+        if histogram is None:
+            histogram = self.histograms[(name, streampoint)] = [0] * (len(buckets) + 2)
+        histogram[bisect_left(buckets, value)] += count
+        histogram[-1] += value * count
+
+    def snapshot(self) -> dict:
+        """Json compatible copy to send metrics of worker process to main process"""
+        return {
+            'counters': [[name, sp, value] for (name, sp), value in self.counters.items()],
+            'histograms': [[name, sp, values] for (name, sp), values in self.histograms.items()],
+        }
+
+    def render(
+            self,
+            snapshots: list = (),
+            gauges: dict = None
+    ) -> str:
+        """
+        Prometheus text format of this process metrics summed with snapshots of other processes.
+        gauges: {name: (help, {streampoint: value})}
+        """
+        counters = defaultdict(float, self.counters)
+        histograms = {key: list(values) for key, values in self.histograms.items()}
+        for snapshot in snapshots:
+            for name, sp, value in snapshot['counters']:
+                counters[(name, sp)] += value
+            for name, sp, values in snapshot['histograms']:
+                if (name, sp) in histograms:
+                    histograms[(name, sp)] = [a + b for a, b in zip(histograms[(name, sp)], values)]
+                else:
+                    histograms[(name, sp)] = list(values)
+
+        lines = []
+        for name, (metric_type, description, buckets) in METRICS.items():
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            if metric_type == 'counter':
+                for (counter_name, sp), value in counters.items():
+                    if counter_name == name:
+                        lines.append(f"{name}{_labels(sp)} {value}")
+                continue
+            for (histogram_name, sp), values in histograms.items():
+                if histogram_name != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(buckets, values):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_labels(sp, le=bound)} {cumulative}")
+                cumulative += values[-2]
+                lines.append(f"{name}_bucket{_labels(sp, le='+Inf')} {cumulative}")
+                lines.append(f"{name}_sum{_labels(sp)} {values[-1]}")
+                lines.append(f"{name}_count{_labels(sp)} {cumulative}")
+        for name, (description, values) in (gauges or {}).items():
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} gauge")
+            for sp, value in values.items():
+                lines.append(f"{name}{_labels(sp)} {value}")
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(
+        streampoint: str,
+        **extra
+) -> str:
+    labels = {'streampoint': streampoint} if streampoint else {}
+    labels.update(extra)
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape_label(value)}"' for key, value in labels.items()) + '}'
+
+
+def _escape_label(
+        value
+) -> str:
+    """Label value escaped as Prometheus text format requires: backslash, double quote and line feed"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+metrics = Metrics()
+
+
+def describe_stack(
+        frame,
+        depth: int = 8
+) -> list:
+    """Innermost first 'function (file:line)' of frame and its callers, asyncio internals are skipped"""
+    stack = []
+    while frame is not None and len(stack) < depth:
+        code = frame.f_code
+        if os.sep + 'asyncio' + os.sep not in code.co_filename and 'uvloop' not in code.co_filename:
+            stack.append(f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return stack
+
+
+class LoopProfiler:
+    """
+    Samples event loop lag every PROFILE_INTERVAL with a timer. A watchdog thread checks that the timer runs,
+    and while the loop is blocked longer than SLOW_CALLBACK_THRESHOLD it takes the stack of the loop thread,
+    so the blocking coroutine is known without asyncio debug mode. Lock holds longer than the threshold
+    are reported by ProfiledLock. Recent offenders are kept in memory, nothing is done per data chunk
+    """
+    def __init__(
+            self,
+            interval: float = PROFILE_INTERVAL,
+            threshold: float = SLOW_CALLBACK_THRESHOLD,
+            keep: int = PROFILE_KEEP
+    ):
+        self.interval = interval
+        self.threshold = threshold
+        self.lag_last = 0.0
+        self.lag_max = 0.0
+        self.slow_callbacks: deque = deque(maxlen=keep)  # [{time, seconds, where, stack}]
+        self.lock_holds: deque = deque(maxlen=keep)  # [{time, seconds, lock, holder}]
+        self.tick = time.monotonic()  # last run of lag sampler
+        self.stall: Optional[dict] = None  # slow_callbacks entry of current stall, completed by sampler
+        self.loop_thread: Optional[int] = None
+        self.task: Optional[asyncio.Task] = None
+        self.watchdog: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self.task is not None and not self.task.done():
+            return
+        self.loop_thread = threading.get_ident()
+        self.tick = time.monotonic()
+        self.task = asyncio.create_task(self._sample())
+        if self.watchdog is None:
+            self.watchdog = threading.Thread(target=self._watch, name='loop-watchdog', daemon=True)
+            self.watchdog.start()
+
+    async def _sample(self) -> None:
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self.interval)
+            self.tick = time.monotonic()
+            lag = max(0.0, self.tick - started - self.interval)
+            self.lag_last = lag
+            self.lag_max = max(self.lag_max, lag)
+            metrics.observe('streamcaster_loop_lag_seconds', lag)
+            stall = self.stall
+            if stall is not None:
+                stall['seconds'] = round(lag, 4)
+                self.stall = None
+
+    def _watch(self) -> None:
+        """Watchdog thread"""
+        stalled_tick = None
+        while True:
+            time.sleep(self.interval)
+            tick = self.tick
+            blocked = time.monotonic() - tick - self.interval
+            if blocked < self.threshold or tick == stalled_tick or self.task is None or self.task.done():
+                continue
+            stalled_tick = tick
+            stack = describe_stack(sys._current_frames().get(self.loop_thread))
+            where = next((entry for entry in stack if f"({os.path.basename(__file__)}:" in entry), None)
+            self.stall = {
+                'time': str(datetime.datetime.now()),
+                'seconds': round(blocked, 4),  # updated when loop runs again
+                'where': where or (stack[0] if stack else None),
+                'stack': stack,
+            }
+            self.slow_callbacks.append(self.stall)
+
+    def record_lock(
+            self,
+            lock: str,
+            holder: str,
+            seconds: float
+    ) -> None:
+        metrics.observe('streamcaster_lock_hold_seconds', seconds)
+        if seconds >= self.threshold:
+            self.lock_holds.append({
+                'time': str(datetime.datetime.now()),
+                'seconds': round(seconds, 4),
+                'lock': lock,
+                'holder': holder,
+            })
+
+    def report(
+            self,
+            limit: int = 20
+    ) -> dict:
+        """The worst recent slow callbacks and lock holds"""
+        return {
+            'loop_lag': {'last': round(self.lag_last, 4), 'max': round(self.lag_max, 4)},
+            'slow_callbacks': sorted(self.slow_callbacks, key=lambda entry: entry['seconds'], reverse=True)[:limit],
+            'lock_holds': sorted(self.lock_holds, key=lambda entry: entry['seconds'], reverse=True)[:limit],
+        }
+
+    def reset(self) -> None:
+        self.lag_max = 0.0
+        self.slow_callbacks.clear()
+        self.lock_holds.clear()
+
+
+profiler = LoopProfiler()
+
+
+class ProfiledLock(asyncio.Lock):
+    """asyncio.Lock reporting hold time and the coroutine which took it to profiler"""
+    def __init__(
+            self,
+            name: str
+    ):
+        super().__init__()
+        self.name = name
+        self.holder = None
+        self.acquired_at = 0.0
+
+    async def acquire(self) -> bool:
+        await super().acquire()
+        frame = sys._getframe(1)
+        while frame is not None and frame.f_code.co_filename != __file__:
+            frame = frame.f_back  # skip asyncio context manager
+        self.holder = frame.f_code.co_qualname if frame is not None else None
+        self.acquired_at = time.perf_counter()
+        return True
+
+    def release(self) -> None:
+        profiler.record_lock(self.name, self.holder, time.perf_counter() - self.acquired_at)
+        super().release()
+
+
+class TimerWheel:
+    """
+    Hashed timer wheel: one task checks one slot per TIMER_TICK, so scheduling and cancelling
+    a timer cost O(1) regardless of number of connections.
+    Tick n is processed at origin + n * tick in slot n % slots, timer goes to the first tick not earlier
+    than its deadline. Timers longer than a full turn stay in their slot until deadline
+    """
+    def __init__(
+            self,
+            tick: float = TIMER_TICK,
+            slots: int = TIMER_SLOTS
+    ):
+        self.tick = tick
+        self.slots: List[Dict] = [{} for _ in range(slots)]  # [{key: (deadline, callback)}]
+        self.timers: Dict = {}  # {key: slot index}
+        self.origin = 0.0  # loop time of tick 0
+        self.ticks = 0  # number of processed ticks
+        self.task: Optional[asyncio.Task] = None
+
+    def schedule(
+            self,
+            key,
+            delay: float,
+            callback
+    ) -> None:
+        """Call callback() after delay seconds, replaces timer with the same key"""
+        self.cancel(key)
+        loop = asyncio.get_running_loop()
+        if self.task is None or self.task.done():
+            self._start(loop)
+        self._add(key, loop.time() + delay, callback)
+
+    def cancel(
+            self,
+            key
+    ) -> None:
+        index = self.timers.pop(key, None)
+        if index is not None:
+            self.slots[index].pop(key, None)
+
+    def _add(
+            self,
+            key,
+            deadline: float,
+            callback
+    ) -> None:
+        tick = max(self.ticks + 1, math.ceil((deadline - self.origin) / self.tick))
+        index = tick % len(self.slots)
+        self.slots[index][key] = (deadline, callback)
+        self.timers[key] = index
+
+    def _start(
+            self,
+            loop: asyncio.AbstractEventLoop
+    ) -> None:
+        """Start ticks from now, timers left by previous task are placed again"""
+        pending = [(key, *self.slots[index].pop(key)) for key, index in self.timers.items()]
+        self.timers.clear()
+        self.origin = loop.time()
+        self.ticks = 0
+        self.task = loop.create_task(self._run())
+        for key, deadline, callback in pending:
+            self._add(key, deadline, callback)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            tick_time = self.origin + (self.ticks + 1) * self.tick
+            await asyncio.sleep(max(0.0, tick_time - loop.time()))
+            self.ticks += 1
+            slot = self.slots[self.ticks % len(self.slots)]
+            # Timers of this tick are due by tick_time, timers of later turns at least a turn later
+            deadline_limit = tick_time + self.tick / 2
+            due = [(key, callback) for key, (deadline, callback) in slot.items() if deadline <= deadline_limit]
+            for key, callback in due:
+                del slot[key]
+                del self.timers[key]
+                try:
+                    callback()
+                except Exception as e:
+                    logger.debug(f"{str(datetime.datetime.now())} Timer {key} error: {e}")
+
+
+timers = TimerWheel()
+
+
+class ConfigStore:
+    """
+    Saves config to json file outside of the event loop.
+    Changes made within CONFIG_WRITE_DELAY are saved with one write, file is replaced atomically
+    """
+    def __init__(
+            self,
+            snapshot,
+            file: str = CONFIG_FILE,
+            delay: float = CONFIG_WRITE_DELAY
+    ):
+        self.snapshot = snapshot  # function returning copy of current config
+        self.file = file
+        self.delay = delay
+        self.dirty = False
+        self.task: Optional[asyncio.Task] = None
+        self.write_lock = ProfiledLock('config_write')
+
+    def schedule(self) -> None:
+        """Mark config as changed, it will be saved after delay"""
+        self.dirty = True
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._write_later())
+
+    def discard(self) -> None:
+        """Drop pending changes, config was reloaded from the file. Called with write_lock taken"""
+        self.dirty = False
+
+    async def _write_later(self) -> None:
+        # Failed write and changes made during write leave config dirty, they are saved after next delay
+        while self.dirty:
+            await asyncio.sleep(self.delay)
+            await self.flush()
+
+    async def flush(self) -> bool:
+        """Save pending changes now. Returns False if writing failed"""
+        async with self.write_lock:
+            if not self.dirty:
+                return True
+            self.dirty = False
+            config = self.snapshot()
+            try:
+                await asyncio.to_thread(self._write, config)
+                logger.debug(f"{str(datetime.datetime.now())} Config saved to {self.file}")
+                return True
+            except Exception as e:
+                self.dirty = True
+                logger.error(f"{str(datetime.datetime.now())} Failed to write config file: {e}")
+                return False
+
+    def _write(
+            self,
+            config: dict
+    ) -> None:
+        try:
+            with open(self.file, 'r') as config_file:
+                config = {**json.load(config_file), **config}  # Keep sections not managed by StreamCaster
+        except (OSError, ValueError):
+            pass
+        tmp_file = f"{self.file}.tmp"
+        with open(tmp_file, 'w') as config_file:
+            json.dump(config, config_file, indent=4)
+            config_file.flush()
+            os.fsync(config_file.fileno())
+        os.replace(tmp_file, self.file)
+
+
+class NtripRequest:
+    """Request line and headers of NTRIP 1.0 (SOURCE, GET) or NTRIP 2.0 (POST, GET) connection"""
+    def __init__(
+            self,
+            head: bytes,
+            body: bytes = b''
+    ):
+        lines = head.decode('latin-1').splitlines()
+        parts = lines[0].split() if lines else []
+        if len(parts) < 2:
+            raise ValueError(f"invalid request line: {lines[0] if lines else ''}")
+        self.method = parts[0].upper()
+        self.password = None
+        if self.method == 'SOURCE':  # SOURCE password /streampoint
+            if len(parts) < 3:
+                raise ValueError("SOURCE request without streampoint")
+            self.password, target = parts[1], parts[2]
+        else:
+            target = parts[1]
+        path, _, query = target.partition('?')
+        self.streampoint = path.lstrip('/')
+        self.query = dict(urllib.parse.parse_qsl(query))
+        self.headers = {}  # {lowercase name: value}
+        for line in lines[1:]:
+            name, separator, value = line.partition(':')
+            if separator:
+                self.headers[name.strip().lower()] = value.strip()
+        self.version = '2.0' if 'ntrip/2.0' in self.headers.get('ntrip-version', '').lower() else '1.0'
+        self.chunked = 'chunked' in self.headers.get('transfer-encoding', '').lower()
+        self.body = body  # stream data received together with headers
+
+    def basic_auth(self) -> Optional[str]:
+        """base64 credentials of Authorization: Basic header"""
+        parts = self.headers.get('authorization', '').split()
+        if len(parts) == 2 and parts[0].lower() == 'basic':
+            return parts[1]
+        return None
+
+    def ok_response(self) -> bytes:
+        if self.version == '2.0':
+            return (
+                b"HTTP/1.1 200 OK\r\n"
+                b"Ntrip-Version: Ntrip/2.0\r\n"
+                b"Server: NTRIP StreamCaster\r\n"
+                b"Cache-Control: no-store, no-cache, max-age=0\r\n"
+                b"Connection: close\r\n"
+                + (b"Content-Type: gnss/data\r\n" if self.method == 'GET' else b'')
+                + b"\r\n"
+            )
+        return b"ICY 200 OK\r\n\r\n" if self.method == 'SOURCE' else b"ICY 200 OK\r\n"
+
+
+async def read_ntrip_request(
+        reader: asyncio.StreamReader
+) -> NtripRequest:
+    """
+    Reads request until empty line, request may come in any number of TCP segments.
+    NTRIP 1.0 clients often send no empty line, their request is complete after REQUEST_IDLE pause
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + REQUEST_TIMEOUT
+    buffer = bytearray()
+    pos = 0
+    while True:
+        for separator in (b'\r\n\r\n', b'\n\n'):
+            end = buffer.find(separator, pos)
+            if end >= 0:
+                return NtripRequest(bytes(buffer[:end]), bytes(buffer[end + len(separator):]))
+        pos = max(0, len(buffer) - 3)  # Separator may be split between reads
+        if len(buffer) >= REQUEST_MAX_SIZE:
+            raise ValueError("request is too large")
+        timeout = deadline - loop.time()
+        if timeout <= 0:
+            raise ValueError("request timeout")
+        try:
+            data = await asyncio.wait_for(
+                reader.read(REQUEST_MAX_SIZE - len(buffer)),
+                timeout=min(timeout, REQUEST_IDLE) if buffer else timeout
+            )
+        except asyncio.TimeoutError:
+            if not buffer:
+                raise ValueError("request timeout")
+            return NtripRequest(bytes(buffer))
+        if not data:
+            if not buffer:
+                raise ConnectionAbortedError
+            return NtripRequest(bytes(buffer))
+        buffer += data
+
+
+class ChunkedDecoder:
+    """Incremental decoder of chunked transfer encoding used by NTRIP 2.0 servers"""
+    def __init__(self):
+        self.buffer = bytearray()
+        self.remaining = 0  # bytes left in current chunk
+        self.state = 'size'  # size, data or crlf
+
+    def feed(
+            self,
+            data: bytes
+    ) -> bytes:
+        """Returns payload of chunks contained in data, may be empty"""
+        buffer = self.buffer
+        buffer += data
+        payload = []
+        while buffer:
+            if self.state == 'size':
+                end = buffer.find(b'\r\n')
+                if end < 0:
+                    if len(buffer) > 1024:
+                        raise ValueError("invalid chunk size line")
+                    break
+                size = int(bytes(buffer[:end]).split(b';')[0].strip(), 16)
+                del buffer[:end + 2]
+                if size == 0:
+                    raise ConnectionError("server finished chunked stream")
+                self.remaining = size
+                self.state = 'data'
+            elif self.state == 'data':
+                chunk = bytes(buffer[:self.remaining])
+                del buffer[:len(chunk)]
+                payload.append(chunk)
+                self.remaining -= len(chunk)
+                if not self.remaining:
+                    self.state = 'crlf'
+            else:
+                if len(buffer) < 2:
+                    break
+                if buffer[:2] != b'\r\n':
+                    raise ValueError("chunk is not terminated by CRLF")
+                del buffer[:2]
+                self.state = 'size'
+        return b''.join(payload)
+
+
+def _crc24q_table() -> list:
+    table = []
+    for byte in range(256):
+        crc = byte << 16
+        for _ in range(8):
+            crc <<= 1
+            if crc & 0x1000000:
+                crc ^= CRC24Q_POLY
+        table.append(crc & 0xFFFFFF)
+    return table
+
+
+CRC24Q_TABLE = _crc24q_table()
+
+
+def crc24q(
+        data: bytes
+) -> int:
+    """CRC-24Q used by RTCM3 frames"""
+    crc = 0
+    for byte in data:
+        crc = ((crc << 8) & 0xFFFFFF) ^ CRC24Q_TABLE[(crc >> 16) ^ byte]
+    return crc
+
+
+def parse_message_types(
+        value
+) -> frozenset:
+    """
+    RTCM3 message types from '1005,1033,msm4' or list of such items.
+    msmN stands for MSMn messages of all constellations (1074, 1084, ... for msm4)
+    """
+    items = value.split(',') if isinstance(value, str) else value
+    message_types = set()
+    for item in items:
+        item = str(item).strip().lower()
+        if item.startswith('msm') and item[3:].isdigit() and 1 <= int(item[3:]) <= 7:
+            message_types.update(range(1070 + int(item[3:]), 1140, 10))
+        elif item.isdigit():
+            message_types.add(int(item))
+        else:
+            raise ValueError(f"invalid message type {item}")
+    if not message_types:
+        raise ValueError("empty message type list")
+    return frozenset(message_types)
+
+
+def validate_stream_settings(
+        settings: dict
+) -> None:
+    """Raises ValueError for unknown settings or values of streampoint"""
+    unknown = set(settings) - set(DEFAULT_STREAM_SETTINGS)
+    if unknown:
+        raise ValueError(f"Unknown streampoint settings {sorted(unknown)}")
+    if settings.get('slow_client_policy', SLOW_CLIENT_POLICIES[0]) not in SLOW_CLIENT_POLICIES:
+        raise ValueError(f"slow_client_policy must be one of {SLOW_CLIENT_POLICIES}")
+    if settings.get('history_mode', HISTORY_MODES[0]) not in HISTORY_MODES:
+        raise ValueError(f"history_mode must be one of {HISTORY_MODES}")
+
+
+def validate_config(
+        config: dict
+) -> None:
+    """Raises ValueError if config read from file can't be applied"""
+    if not isinstance(config.get('streampoints'), list) or not isinstance(config.get('users'), dict):
+        raise ValueError("Config must contain streampoints list and users dict")
+    for username, user_data in config['users'].items():
+        if not isinstance(user_data, dict) or not isinstance(user_data.get('password'), str):
+            raise ValueError(f"User {username} has no password")
+        if not isinstance(user_data.setdefault('allowed_streampoints', []), list):
+            raise ValueError(f"allowed_streampoints of user {username} must be a list")
+        if user_data.get('message_types'):
+            parse_message_types(user_data['message_types'])
+    for streampoint, settings in config.get('streampoint_settings', {}).items():
+        validate_stream_settings(settings)
+    for streampoint, relay in config.get('relays', {}).items():
+        if 'host' not in relay or 'port' not in relay:
+            raise ValueError(f"Relay of {streampoint} must have host and port")
+
+
+class Rtcm3Splitter:
+    """
+    Splits byte stream into RTCM3 frames, a frame may come in several chunks.
+    With validate=True frames with wrong CRC-24Q are skipped and counted in crc_errors
+    """
+    def __init__(
+            self,
+            validate: bool = False
+    ):
+        self.buffer = bytearray()
+        self.validate = validate
+        self.crc_errors = 0
+
+    def feed(
+            self,
+            data: bytes
+    ) -> list:
+        """Returns [(message type, frame)] of frames completed by data"""
+        buffer = self.buffer
+        buffer += data
+        frames = []
+        pos = 0
+        while True:
+            start = buffer.find(RTCM3_PREAMBLE, pos)
+            if start < 0:
+                pos = len(buffer)
+                break
+            if len(buffer) - start < 5:
+                pos = start
+                break
+            length = ((buffer[start + 1] & 0x03) << 8) | buffer[start + 2]
+            if buffer[start + 1] & 0xFC or length < 2:
+                pos = start + 1  # Not a frame header
+                continue
+            end = start + 3 + length + 3
+            if len(buffer) < end:
+                pos = start
+                break
+            frame = bytes(buffer[start:end])
+            if self.validate and crc24q(frame[:-3]) != int.from_bytes(frame[-3:], 'big'):
+                self.crc_errors += 1
+                pos = start + 1  # Resync on next preamble
+                continue
+            message_type = (buffer[start + 3] << 4) | (buffer[start + 4] >> 4)
+            frames.append((message_type, frame))
+            pos = end
+        del buffer[:pos]
+        return frames
+
+
+class HistoryBuffer:
+    """
+    Recent data of streampoint limited by age and size.
+    New clients get it right after connection, so they don't wait for next messages of the server
+    """
+    def __init__(
+            self,
+            mode: str,
+            max_sec: float,
+            max_bytes: int
+    ):
+        self.mode = mode
+        self.max_sec = max_sec
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.chunks: deque = deque()  # raw mode: [(timestamp, chunk)]
+        self.messages: Dict[int, tuple] = {}  # rtcm3 mode: {message type: (timestamp, frame)} in order of arrival
+        self.splitter = Rtcm3Splitter()
+
+    def add(
+            self,
+            data: bytes,
+            now: float
+    ) -> None:
+        if self.mode == 'raw':
+            self.chunks.append((now, data))
+            self.size += len(data)
+        else:
+            for message_type, frame in self.splitter.feed(data):
+                previous = self.messages.pop(message_type, None)
+                if previous:
+                    self.size -= len(previous[1])
+                self.messages[message_type] = (now, frame)
+                self.size += len(frame)
+        self._trim(now)
+
+    def _trim(
+            self,
+            now: float
+    ) -> None:
+        if self.mode == 'raw':
+            while self.chunks and (self.size > self.max_bytes or now - self.chunks[0][0] > self.max_sec):
+                self.size -= len(self.chunks.popleft()[1])
+            return
+        while self.messages:
+            message_type, (timestamp, frame) = next(iter(self.messages.items()))
+            if self.size <= self.max_bytes and now - timestamp <= self.max_sec:
+                break
+            del self.messages[message_type]
+            self.size -= len(frame)
+
+    def items(
+            self,
+            now: float
+    ) -> list:
+        """Data for new client in order of arrival"""
+        self._trim(now)
+        if self.mode == 'raw':
+            return [chunk for _, chunk in self.chunks]
+        return [frame for _, frame in self.messages.values()]
+
+
+class StreamRecorder:
+    """
+    Writes server data of streampoint to segment files RECORD_DIR/streampoint/<segment start unix time>.seg.
+    Each record is RECORD_HEADER followed by chunk. Data is collected in memory and written
+    by a background thread once per RECORD_FLUSH_INTERVAL, so live broadcast never waits for disk
+    """
+    def __init__(
+            self,
+            streampoint: str,
+            segment_sec: int,
+            keep_sec: int,
+            record_dir: str = RECORD_DIR
+    ):
+        self.path = os.path.join(record_dir, streampoint)
+        self.segment_sec = segment_sec
+        self.keep_sec = keep_sec
+        self.pending: list = []  # [(segment start, bytes)]
+        self.task = asyncio.create_task(self._flush_loop())
+
+    def add(
+            self,
+            data: bytes,
+            now: float
+    ) -> None:
+        segment = int(now // self.segment_sec * self.segment_sec)
+        self.pending.append((segment, RECORD_HEADER.pack(now, len(data)) + data))
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(RECORD_FLUSH_INTERVAL)
+            await self.flush()
+
+    async def flush(self) -> None:
+        if not self.pending:
+            return
+        batch, self.pending = self.pending, []
+        try:
+            await asyncio.to_thread(self._write, batch)
+        except Exception as e:
+            logger.error(f"{str(datetime.datetime.now())} Failed to record {self.path}: {e}")
+
+    def _write(
+            self,
+            batch: list
+    ) -> None:
+        os.makedirs(self.path, exist_ok=True)
+        segments = defaultdict(list)
+        for segment, record in batch:
+            segments[segment].append(record)
+        for segment, records in segments.items():
+            with open(os.path.join(self.path, f"{segment}.seg"), 'ab') as segment_file:
+                segment_file.write(b''.join(records))
+        oldest = time.time() - self.keep_sec - self.segment_sec
+        for start, path in list_segments(os.path.dirname(self.path), os.path.basename(self.path)):
+            if start < oldest:
+                os.unlink(path)
+
+    async def close(self) -> None:
+        self.task.cancel()
+        await self.flush()
+
+
+def list_segments(
+        record_dir: str,
+        streampoint: str
+) -> list:
+    """Returns [(segment start unix time, path)] sorted by time, streampoint must be a name without path"""
+    if streampoint in ('', '.', '..') or os.path.basename(streampoint) != streampoint:
+        return []
+    path = os.path.join(record_dir, streampoint)
+    if not os.path.isdir(path):
+        return []
+    segments = []
+    for filename in os.listdir(path):
+        name, extension = os.path.splitext(filename)
+        if extension == '.seg' and name.isdigit():
+            segments.append((int(name), os.path.join(path, filename)))
+    return sorted(segments)
+
+
+def read_segment(
+        path: str,
+        pos: int = 0,
+        read_size: int = RECORD_READ_SIZE
+) -> tuple:
+    """
+    Returns ([(unix time, chunk)], position after them) of records of segment file starting at pos,
+    reading stops after about read_size bytes. The file is memory-mapped, blocking - run it in executor
+    """
+    records = []
+    with open(path, 'rb') as segment_file:
+        if os.fstat(segment_file.fileno()).st_size == 0:
+            return records, pos
+        with mmap.mmap(segment_file.fileno(), 0, access=mmap.ACCESS_READ) as segment:
+            size = len(segment)
+            stop = min(size, pos + read_size)
+            while pos < stop and pos + RECORD_HEADER.size <= size:
+                timestamp, length = RECORD_HEADER.unpack_from(segment, pos)
+                if pos + RECORD_HEADER.size + length > size:
+                    break  # Record is not written completely yet
+                pos += RECORD_HEADER.size
+                records.append((timestamp, segment[pos:pos + length]))
+                pos += length
+    return records, pos
+
+
+class Sourcetable:
+    """
+    NTRIP sourcetable of active streampoints.
+    STR line of a streampoint is changed only when its source connects or disconnects or settings change,
+    the whole response is rendered once and reused until next change
+    """
+    def __init__(self):
+        self.lines: Dict[str, bytes] = {}  # {streampoint: STR line}
+        self.responses: Dict[str, bytes] = {}  # {NTRIP version: rendered response}
+
+    def update(
+            self,
+            streampoint: str,
+            settings: Optional[dict]
+    ) -> None:
+        """Add or replace STR line of streampoint, settings None removes it"""
+        line = self._line(streampoint, settings) if settings is not None else None
+        if self.lines.get(streampoint) == line:
+            return
+        if line is None:
+            del self.lines[streampoint]
+        else:
+            self.lines[streampoint] = line
+        self.responses.clear()
+
+    @staticmethod
+    def _line(
+            streampoint: str,
+            settings: dict
+    ) -> bytes:
+        # STR;mountpoint;identifier;format;format-details;carrier;nav-system;network;country;latitude;longitude;
+        # nmea;solution;generator;compr-encryp;authentication;fee;bitrate;misc
+        data_format = 'RTCM 3' if settings['rtcm3_frames'] else 'RAW'
+        return f"STR;{streampoint};{streampoint};{data_format};;0;;;;0.00;0.00;0;0;StreamCaster;none;B;N;0;\r\n".encode()
+
+    def response(
+            self,
+            version: str = '1.0'
+    ) -> bytes:
+        response = self.responses.get(version)
+        if response is None:
+            body = b''.join(self.lines[streampoint] for streampoint in sorted(self.lines)) + b"ENDSOURCETABLE\r\n"
+            if version == '2.0':
+                header = b"HTTP/1.1 200 OK\r\nNtrip-Version: Ntrip/2.0\r\nContent-Type: gnss/sourcetable\r\n"
+            else:
+                header = b"SOURCETABLE 200 OK\r\nContent-Type: text/plain\r\n"
+            header += f"Server: NTRIP StreamCaster\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode()
+            response = self.responses[version] = header + body
+        return response
+
+
+class ClientQueue:
+    """
+    Bounded ring buffer of chunks for one client.
+    Only its own writer task sends data to the socket, so chunks always leave in order.
+    Lag of the client is tracked in bytes and in seconds waiting in the buffer
+    """
+    def __init__(
+            self,
+            client_id: int,
+            writer: asyncio.StreamWriter,
+            username: str = None,
+            streampoint: str = '',
+            buffer_size: int = CLIENT_BUFFER_SIZE,
+            policy: str = DEFAULT_STREAM_SETTINGS['slow_client_policy'],
+            max_lag_bytes: int = DEFAULT_STREAM_SETTINGS['max_lag_bytes'],
+            max_lag_sec: float = DEFAULT_STREAM_SETTINGS['max_lag_sec'],
+            message_types: Optional[frozenset] = None,
+            rate: float = 0,
+            reader: Optional[asyncio.StreamReader] = None
+    ):
+        self.client_id = client_id
+        self.writer = writer
+        self.transport = writer.transport
+        self.reader = reader
+        self.username = username
+        self.streampoint = streampoint
+        self.buffer: deque = deque()  # [(timestamp, chunk)]
+        self.buffer_size = buffer_size
+        self.buffered_bytes = 0
+        self.policy = policy
+        self.max_lag_bytes = max_lag_bytes
+        self.max_lag_sec = max_lag_sec
+        self.message_types = message_types  # RTCM3 message types sent to client, None - all data
+        self.rate = rate  # bytes per second, 0 - unlimited
+        self.tokens = rate  # token bucket of one second burst, negative after sending larger chunk
+        self.tokens_time = time.monotonic()
+        self.dropped_bytes = 0
+        self.last_write = time.monotonic()  # end of last successful write to socket
+        self.draining = False  # writer task is sending backlog
+        self.closed = False  # client is being disconnected, fan-out sends nothing more to it
+        self.ready = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.reader_task: Optional[asyncio.Task] = None  # discards data sent by client and notices closed connection
+
+    def reader_closed(self) -> bool:
+        return self.closed or self.writer.is_closing()
+
+    def lag(
+            self,
+            now: float
+    ) -> tuple:
+        """Returns (bytes, seconds) waiting in the buffer"""
+        if not self.buffer:
+            return 0, 0.0
+        return self.buffered_bytes, now - self.buffer[0][0]
+
+    def _drop_oldest(self) -> None:
+        _, data = self.buffer.popleft()
+        self.buffered_bytes -= len(data)
+        self.dropped_bytes += len(data)
+        metrics.inc('streamcaster_dropped_bytes_total', self.streampoint, len(data))
+        metrics.inc('streamcaster_dropped_chunks_total', self.streampoint)
+
+    def try_write(
+            self,
+            data: bytes,
+            now: float
+    ) -> bool:
+        """
+        Fast path for client keeping up with the stream: chunk goes straight to the transport
+        without waking writer task. Returns False if chunk has to be buffered
+        """
+        transport = self.transport
+        if transport is None or self.buffer or self.draining or transport.get_write_buffer_size() or transport.is_closing():
+            return False
+        if self.rate:
+            self._refill(now)
+            if self.tokens < len(data):
+                return False
+            self.tokens -= len(data)
+        transport.write(data)
+        self.last_write = now
+        return True
+
+    def _refill(
+            self,
+            now: float
+    ) -> None:
+        self.tokens = min(self.rate, self.tokens + (now - self.tokens_time) * self.rate)
+        self.tokens_time = now
+
+    async def _wait_tokens(
+            self,
+            size: int
+    ) -> None:
+        """Sleep until bandwidth limit allows to send chunk of size bytes, chunk above one second burst is sent on credit"""
+        self._refill(time.monotonic())
+        if self.tokens < min(size, self.rate):
+            await asyncio.sleep((min(size, self.rate) - self.tokens) / self.rate)
+            self._refill(time.monotonic())
+
+    def _take(
+            self,
+            limit: float = None
+    ) -> tuple:
+        """Returns (chunks, size) removed from buffer: all or at least one up to limit bytes"""
+        if limit is None:
+            chunks = [data for _, data in self.buffer]
+            size = self.buffered_bytes
+            self.buffer.clear()
+        else:
+            chunks = []
+            size = 0
+            while self.buffer and (not chunks or size + len(self.buffer[0][1]) <= limit):
+                data = self.buffer.popleft()[1]
+                chunks.append(data)
+                size += len(data)
+        self.buffered_bytes -= size
+        return chunks, size
+
+    def put(
+            self,
+            data: bytes,
+            now: float
+    ) -> bool:
+        """
+        Append chunk to ring buffer and apply slow client policy.
+        Returns False if client has to be disconnected
+        """
+        metrics.observe('streamcaster_client_queue_depth', len(self.buffer), self.streampoint)
+        if len(self.buffer) >= self.buffer_size:
+            self._drop_oldest()
+        self.buffer.append((now, data))
+        self.buffered_bytes += len(data)
+        self.ready.set()
+
+        lag_bytes, lag_sec = self.lag(now)
+        if lag_bytes <= self.max_lag_bytes and lag_sec <= self.max_lag_sec:
+            return True
+        if self.policy == 'disconnect':
+            self.closed = True
+            return False
+        if self.policy == 'skip_to_latest':
+            while len(self.buffer) > 1:
+                self._drop_oldest()
+        else:
+            while len(self.buffer) > 1 and (
+                    self.buffered_bytes > self.max_lag_bytes or now - self.buffer[0][0] > self.max_lag_sec
+            ):
+                self._drop_oldest()
+        return True
+
+    async def run(self) -> None:
+        """Writer task: send backlog of slow client, whole ring buffer is written at once"""
+        while True:
+            await self.ready.wait()
+            self.ready.clear()
+            self.draining = True
+            try:
+                while self.buffer:
+                    if self.rate:
+                        await self._wait_tokens(len(self.buffer[0][1]))
+                        chunks, size = self._take(self.tokens)
+                        self.tokens -= size
+                    else:
+                        chunks, size = self._take()
+                    self.writer.writelines(chunks)
+                    started = time.perf_counter()
+                    await self.writer.drain()
+                    metrics.observe('streamcaster_drain_seconds', time.perf_counter() - started, self.streampoint)
+                    self.last_write = time.monotonic()
+                    metrics.inc('streamcaster_bytes_out_total', self.streampoint, size)
+            finally:
+                self.draining = False
+
+    async def close(self) -> None:
+        timers.cancel(('client', self.streampoint, self.client_id))
+        for task in (self.task, self.reader_task):
+            if task and task is not asyncio.current_task():
+                task.cancel()
+        try:
+            self.writer.close()
+            await self.writer.wait_closed()
+        except (ConnectionAbortedError, ConnectionResetError, ConnectionError, OSError):
+            pass
+
+
+class WebClientWriter:
+    """
+    StreamWriter replacement for WebSocket and SSE clients, so they are served by the same ClientQueue and fan-out.
+    It has no transport, data always goes through ring buffer of the client. drain() hands one batch to web endpoint
+    and waits while previous batch is being sent, so slow client policy works as for TCP clients
+    """
+    transport = None
+
+    def __init__(self):
+        self.pending: list = []
+        self.batches = asyncio.Queue(maxsize=1)  # joined chunks for web endpoint, None - client is closed
+        self.closed = False
+
+    def write(
+            self,
+            data: bytes
+    ) -> None:
+        self.pending.append(data)
+
+    def writelines(
+            self,
+            chunks: list
+    ) -> None:
+        self.pending.extend(chunks)
+
+    async def drain(self) -> None:
+        if self.closed:
+            raise ConnectionResetError("web client disconnected")
+        if self.pending:
+            data = b''.join(self.pending)
+            self.pending = []
+            await self.batches.put(data)
+
+    def is_closing(self) -> bool:
+        return self.closed
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        if self.batches.full():
+            self.batches.get_nowait()
+        self.batches.put_nowait(None)
+
+    async def wait_closed(self) -> None:
+        pass
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> bytes:
+        data = await self.batches.get()
+        if data is None:
+            raise StopAsyncIteration
+        return data
+
+
+class StreamPointFanout:
+    """
+    Fan-out engine of one streampoint: source data is copied into ring buffer of every client
+    """
+    def __init__(
+            self,
+            streampoint: str,
+            settings: dict = None,
+            on_client_error=None,
+            user_clients: Dict[str, set] = None
+    ):
+        self.streampoint = streampoint
+        self.settings = settings or DEFAULT_STREAM_SETTINGS
+        self.clients: Dict[int, ClientQueue] = {}  # {client_id: ClientQueue}
+        self.user_clients = user_clients if user_clients is not None else defaultdict(set)  # {user: {ClientQueue}}
+        self.on_client_error = on_client_error  # coroutine function (streampoint, client_id)
+        self.history: Optional[HistoryBuffer] = None
+        if self.settings['history_mode'] != 'off':
+            self.history = HistoryBuffer(
+                mode=self.settings['history_mode'],
+                max_sec=self.settings['history_sec'],
+                max_bytes=self.settings['history_bytes']
+            )
+
+    def update_settings(
+            self,
+            settings: dict
+    ) -> None:
+        """
+        Lag limits, slow client policy and heartbeat apply to connected clients at once,
+        other settings are used from next server connection
+        """
+        self.settings = settings
+        for client in self.clients.values():
+            client.policy = settings['slow_client_policy']
+            client.max_lag_bytes = settings['max_lag_bytes']
+            client.max_lag_sec = settings['max_lag_sec']
+
+    def __len__(self) -> int:
+        return len(self.clients)
+
+    def __contains__(self, client_id) -> bool:
+        return client_id in self.clients
+
+    def __iter__(self):
+        return iter(list(self.clients))
+
+    def __getitem__(self, client_id) -> ClientQueue:
+        return self.clients[client_id]
+
+    def add_client(
+            self,
+            writer: asyncio.StreamWriter,
+            username: str = None,
+            message_types: Optional[frozenset] = None,
+            rate: float = 0,
+            reader: Optional[asyncio.StreamReader] = None
+    ) -> ClientQueue:
+        client = ClientQueue(
+            client_id=id(writer),
+            writer=writer,
+            username=username,
+            streampoint=self.streampoint,
+            policy=self.settings['slow_client_policy'],
+            max_lag_bytes=self.settings['max_lag_bytes'],
+            max_lag_sec=self.settings['max_lag_sec'],
+            message_types=message_types,
+            rate=rate,
+            reader=reader
+        )
+        if self.history:
+            now = time.monotonic()
+            for data in self.history.items(now):
+                if message_types is not None:
+                    data = b''.join(frame for t, frame in Rtcm3Splitter().feed(data) if t in message_types)
+                if data:
+                    client.put(data, now)
+        self.clients[client.client_id] = client
+        if username:
+            self.user_clients[username].add(client)
+        metrics.inc('streamcaster_client_connections_total', self.streampoint)
+        client.task = asyncio.create_task(self._client_task(client))
+        if reader is not None:
+            client.reader_task = asyncio.create_task(self._read_client(client))
+        self._schedule_check(client)
+        return client
+
+    def _schedule_check(
+            self,
+            client: ClientQueue
+    ) -> None:
+        delay = SERVER_TIMEOUT
+        if self.settings['client_heartbeat_sec']:
+            delay = min(delay, self.settings['client_heartbeat_sec'])
+        timers.schedule(('client', self.streampoint, client.client_id), delay, lambda: self._check_client(client))
+
+    def _check_client(
+            self,
+            client: ClientQueue
+    ) -> None:
+        """Timer callback: reap client stuck on write, send heartbeat to idle client if enabled"""
+        if self.clients.get(client.client_id) is not client:
+            return
+        now = time.monotonic()
+        idle = now - client.last_write
+        if client.buffer and idle > SERVER_TIMEOUT:
+            logger.debug(f"{str(datetime.datetime.now())} Client {self.streampoint}:{client.client_id} is stuck, disconnecting")
+            client.closed = True
+            if self.on_client_error:
+                asyncio.create_task(self.on_client_error(self.streampoint, client.client_id))
+            return
+        if self.settings['client_heartbeat_sec'] and not client.buffer and idle >= self.settings['client_heartbeat_sec']:
+            client.put(b' ', now)
+        self._schedule_check(client)
+
+    async def _client_task(
+            self,
+            client: ClientQueue
+    ) -> None:
+        try:
+            await client.run()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.debug(
+                f"{str(datetime.datetime.now())} Client {self.streampoint}:{client.client_id} write error: {e}"
+            )
+            if self.on_client_error:
+                await self.on_client_error(self.streampoint, client.client_id)
+
+    async def _read_client(
+            self,
+            client: ClientQueue
+    ) -> None:
+        """
+        Reads and discards data sent by client after request, so it doesn't pile up in StreamReader.
+        Client is disconnected when its connection is closed
+        """
+        try:
+            while await client.reader.read(CLIENT_READ_SIZE):
+                pass
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.debug(f"{str(datetime.datetime.now())} Client {self.streampoint}:{client.client_id} read error: {e}")
+        if self.clients.get(client.client_id) is not client or client.closed:
+            return
+        logger.debug(f"{str(datetime.datetime.now())} Client {self.streampoint}:{client.client_id} closed connection")
+        client.closed = True
+        if self.on_client_error:
+            await self.on_client_error(self.streampoint, client.client_id)
+
+    def publish(
+            self,
+            data: bytes,
+            frames: list = None
+    ) -> None:
+        """
+        Send chunk to all clients. The same bytes object is shared by all of them: it is written directly
+        to sockets which keep up, and only slow clients buffer it and wait in their writer tasks.
+        frames - [(message type, frame)] of data, used for clients with message type filter
+        """
+        now = time.monotonic()
+        if self.history:
+            self.history.add(data, now)
+        direct = 0
+        direct_bytes = 0
+        lagging = []
+        selected = {}  # {message types: frames of these types}, shared by clients with the same filter
+        for client_id, client in self.clients.items():
+            if client.closed:
+                continue  # Waits for on_client_error
+            chunk = data
+            if client.message_types is not None:
+                chunk = selected.get(client.message_types)
+                if chunk is None:
+                    if frames is None:
+                        frames = Rtcm3Splitter().feed(data)
+                    chunk = selected[client.message_types] = b''.join(
+                        frame for message_type, frame in frames if message_type in client.message_types
+                    )
+                if not chunk:
+                    continue
+            if client.try_write(chunk, now):
+                direct += 1
+                direct_bytes += len(chunk)
+            elif not client.put(chunk, now):
+                lagging.append(client_id)
+        if direct:
+            metrics.inc('streamcaster_bytes_out_total', self.streampoint, direct_bytes)
+            metrics.observe('streamcaster_client_queue_depth', 0, self.streampoint, count=direct)
+        for client_id in lagging:
+            logger.debug(f"{str(datetime.datetime.now())} Client {self.streampoint}:{client_id} is too slow, disconnecting")
+            metrics.inc('streamcaster_slow_clients_disconnected_total', self.streampoint)
+            if self.on_client_error:
+                asyncio.create_task(self.on_client_error(self.streampoint, client_id))
+
+    async def remove_client(
+            self,
+            client_id: int
+    ) -> None:
+        client = self.clients.pop(client_id, None)
+        if client:
+            self._release_user(client)
+            metrics.inc('streamcaster_client_disconnections_total', self.streampoint)
+            await client.close()
+
+    def _release_user(
+            self,
+            client: ClientQueue
+    ) -> None:
+        clients = self.user_clients.get(client.username)
+        if clients is not None:
+            clients.discard(client)
+            if not clients:
+                del self.user_clients[client.username]
+
+    async def close(self) -> None:
+        clients = list(self.clients.values())
+        self.clients.clear()
+        metrics.inc('streamcaster_client_disconnections_total', self.streampoint, len(clients))
+        for client in clients:
+            self._release_user(client)
+            await client.close()
 
 
 class StreamCaster:
@@ -44,16 +1533,94 @@ class StreamCaster:
     ):
         self.stream_points: list = []  # [streampoint]
         self.stream_users: Dict[str, Dict] = defaultdict(dict)  # {user: {password: str, allowed_streampoints: list}}
+        self.stream_settings: Dict[str, Dict] = {}  # {streampoint: {read_size: int, coalesce_window_us: int, ...}}
+        self.relays: Dict[str, Dict] = {}  # {streampoint: {host: str, port: int, streampoint: str, user: str, password: str}}
+        self.relay_tasks: Dict[str, asyncio.Task] = {}  # {streampoint: task}
+        self.replays: Dict[str, Dict] = {}  # {virtual streampoint: {streampoint: str, start: float, end: float, speed: float}}
+        self.replay_tasks: Dict[str, asyncio.Task] = {}  # {virtual streampoint: task}
         self.server_connections: Dict[str, Dict] = defaultdict(dict)  # {streampoint: {last_activity:float}}
-        self.client_queues: Dict[str, Dict[str, asyncio.StreamWriter]] = defaultdict(dict)  # {streampoint: {client_id:writer}}
-        self.rate_limit = 0.1
-        self.lock = asyncio.Lock()
-        self.broadcast_queue: asyncio.Queue = asyncio.Queue()
+        self.client_queues: Dict[str, StreamPointFanout] = {}  # {streampoint: StreamPointFanout}
+        self.streampoint_index: frozenset = frozenset()  # streampoints for lookup without lock
+        self.auth_index: Dict[str, tuple] = {}  # {user: (password, frozenset of allowed streampoints or None)}
+        self.auth_cache: Dict[str, tuple] = {}  # {base64 authorization data: (user, password)}
+        self.auth_pending: Dict[tuple, asyncio.Future] = {}  # {(authorization data, password): running check}
+        self.remote_sources: set = set()  # streampoints fed by server connected to another worker
+        self.user_clients: Dict[str, set] = defaultdict(set)  # {user: {ClientQueue}} connected to this process
+        self.sourcetable = Sourcetable()
+        self.config_version = 0  # incremented on each change of streampoints and users, invalidates cached listings
+        self.cluster: Optional["ClusterLink"] = None  # set in worker process
+        self.cluster_hub: Optional["ClusterHub"] = None  # set in main process of multi-process mode
+        self.lock = ProfiledLock('admin')  # serializes admin changes of streampoints and users, not taken by data path
 
         # Default values from app_settings.json
         config = self._read_config_json()
         self.stream_points = config['streampoints']
         self.stream_users = config['users']
+        self.stream_settings = config.get('streampoint_settings', {})
+        self.relays = config.get('relays', {})
+        self.config_store = ConfigStore(snapshot=self.config_copy)
+        self._build_index()
+
+    def _build_index(self) -> None:
+        """
+        Rebuild lookup structures used by handle_client after streampoints or users change.
+        Indexes are replaced at once, so clients read them without lock
+        """
+        self.streampoint_index = frozenset(self.stream_points) | frozenset(self.replays)
+        self.auth_index = {user: self._auth_entry(data) for user, data in self.stream_users.items()}
+        for streampoint in self.streampoint_index | set(self.sourcetable.lines):
+            self.update_sourcetable(streampoint)
+
+    def update_sourcetable(
+            self,
+            streampoint: str
+    ) -> None:
+        """Show streampoint in sourcetable while its source is connected"""
+        active = streampoint in self.streampoint_index and self.is_active(streampoint)
+        self.sourcetable.update(streampoint, self.get_stream_settings(streampoint) if active else None)
+
+    @staticmethod
+    def _auth_entry(
+            user_data: dict
+    ) -> tuple:
+        allowed_streampoints = user_data['allowed_streampoints']
+        return user_data['password'], frozenset(allowed_streampoints) if allowed_streampoints else None
+
+    async def authenticate(
+            self,
+            auth_data: str
+    ) -> tuple:
+        """
+        Returns (user, error) for Basic authorization data.
+        Verified credentials are cached until password of the user changes,
+        concurrent requests with the same credentials wait for one password check
+        """
+        cached = self.auth_cache.get(auth_data)
+        if cached and cached[0] in self.auth_index and self.auth_index[cached[0]][0] == cached[1]:
+            return cached[0], None
+
+        login, password = base64.b64decode(auth_data).decode().split(':', 1)
+        if login not in self.auth_index:
+            return login, "User not found"
+        stored_password = self.auth_index[login][0]
+        if stored_password.startswith('pbkdf2_sha256$'):
+            # Hashing is slow and releases GIL, keep it out of the event loop
+            key = (auth_data, stored_password)
+            check = self.auth_pending.get(key)
+            if check is None:
+                check = asyncio.get_running_loop().run_in_executor(None, check_password, password, stored_password)
+                self.auth_pending[key] = check
+                check.add_done_callback(lambda _: self.auth_pending.pop(key, None))
+            valid = await asyncio.shield(check)  # Disconnected client does not cancel check of others
+        else:
+            valid = check_password(password, stored_password)
+        if not valid:
+            return login, "User authorization failed"
+
+        if len(self.auth_cache) >= AUTH_CACHE_SIZE:
+            del self.auth_cache[next(iter(self.auth_cache))]
+        self.auth_cache[auth_data] = (login, stored_password)
+        return login, None
 
     async def _cleanup(
             self,
@@ -67,59 +1634,65 @@ class StreamCaster:
             username: str = None
     ) -> None:
         """
-        Cleaning disconnected resourses
+        Cleaning disconnected resourses.
+        self.lock is taken only for changes of streampoints and users. Connections are detached from state
+        at once and closed outside of the lock, so leaving clients and servers never wait for each other
+        or for other streampoints
         """
         logger.debug(f"{str(datetime.datetime.now())} Start cleaning")
-        async with self.lock:
-            try:
-                if del_streampoints:
+        try:
+            if del_streampoints:
+                async with self.lock:
                     if streampoint not in self.stream_points:
                         raise KeyError(f"streampoint {streampoint} not found")
-                    else:
-                        self.stream_points.remove(streampoint)
+                    self.stream_points.remove(streampoint)
+                    self.stream_settings.pop(streampoint, None)
+                    self.relays.pop(streampoint, None)
+                    self._build_index()
 
-                if del_stream_users:
+            if del_stream_users:
+                async with self.lock:
                     if username not in self.stream_users:
                         raise KeyError(f"User {username} not found")
                     del self.stream_users[username]
-                    for mp in self.client_queues:
-                        for client_id in self.client_queues[mp]:
-                            if username in client_id:
-                                del self.client_queues[mp][client_id]
-
-
-                if del_server_connections:
-                    if streampoint in self.server_connections and self.server_connections[streampoint] != {}:
-                        try:
-                            writer.close()
-                            await writer.wait_closed()
-                            logger.debug(
-                                f"{str(datetime.datetime.now())} Before deletion, server_connections: {self.server_connections}"
-                                )
-                            del self.server_connections[streampoint]
-                            logger.debug(f"{str(datetime.datetime.now())} After deletion, server_connections: {self.server_connections}")
-                        except Exception:
-                            logger.debug(f"{str(datetime.datetime.now())} Cleaning server_connections error: {self.server_connections}")
-                            del self.server_connections[streampoint]
-
-                if del_client_queues:
-                    if streampoint in self.client_queues:
-                        logger.debug(
-                            f"{str(datetime.datetime.now())} Before deletion client_queues: {self.client_queues[streampoint]}"
-                            )
-                        if client_id and client_id in self.client_queues[streampoint]:
-                            writer = self.client_queues[streampoint][client_id]
-                            try:
-                                writer.close()
-                                await writer.wait_closed()
-                            except (ConnectionAbortedError, ConnectionResetError, ConnectionError, OSError):
-                                pass
-                            del self.client_queues[streampoint][client_id]
-                        elif not client_id:
-                            del self.client_queues[streampoint]
-                    logger.debug(f"{str(datetime.datetime.now())} After deletion client_queues: {self.client_queues[streampoint]}")
-            except KeyError:
-                pass
+                    del self.auth_index[username]
+                for client in list(self.user_clients.get(username, ())):
+                    fanout = self.client_queues.get(client.streampoint)
+                    if fanout:
+                        await fanout.remove_client(client.client_id)
+
+            if del_server_connections:
+                connection = self.server_connections.get(streampoint)
+                if connection and writer is not None and connection.get('writer') not in (None, writer):
+                    # Streampoint is already served by a new connection, its state and clients are kept
+                    connection = None
+                    del_client_queues = False
+                if connection:
+                    writer = writer or connection.get('writer')
+                    logger.debug(
+                        f"{str(datetime.datetime.now())} Before deletion, server_connections: {self.server_connections}"
+                        )
+                    del self.server_connections[streampoint]
+                    logger.debug(f"{str(datetime.datetime.now())} After deletion, server_connections: {self.server_connections}")
+                    self.update_sourcetable(streampoint)
+                if writer is not None:
+                    try:
+                        writer.close()
+                        await writer.wait_closed()
+                    except Exception:
+                        logger.debug(f"{str(datetime.datetime.now())} Closing server connection of {streampoint} error")
+
+            if del_client_queues:
+                fanout = self.client_queues.get(streampoint)
+                logger.debug(f"{str(datetime.datetime.now())} Before deletion client_queues: {fanout}")
+                if fanout and client_id:
+                    await fanout.remove_client(client_id)
+                elif fanout:
+                    del self.client_queues[streampoint]
+                    await fanout.close()
+                logger.debug(f"{str(datetime.datetime.now())} After deletion client_queues: {self.client_queues.get(streampoint)}")
+        except KeyError:
+            pass
         logger.debug(f"{str(datetime.datetime.now())} Stop cleaning")
 
 
@@ -134,29 +1707,321 @@ class StreamCaster:
         except Exception:
             sys.exit("Failed to read config file")
 
-    def _write_config_json(
+    def config_snapshot(self) -> dict:
+        return {
+            "streampoints": self.stream_points,
+            "users": self.stream_users,
+            "streampoint_settings": self.stream_settings,
+            "relays": self.relays,
+            "replays": self.replays,
+        }
+
+    def config_copy(self) -> dict:
+        """Copy of config which can be serialized in another thread while admin changes continue"""
+        return {
+            "streampoints": list(self.stream_points),
+            "users": {user: dict(data) for user, data in self.stream_users.items()},
+            "streampoint_settings": dict(self.stream_settings),
+            "relays": dict(self.relays),
+        }
+
+    def _config_changed(self) -> None:
+        """Persist config and share it with worker processes"""
+        self.config_version += 1
+        self.config_store.schedule()
+        if self.cluster_hub:
+            self.cluster_hub.publish_config()
+
+    def _replace_config(
             self,
-            file=CONFIG_FILE,
-            ) -> None:
-        config = self._read_config_json()
-        config["streampoints"] = self.stream_points
-        config["users"] = self.stream_users
-        try:
-            with open(file, 'w') as config_file:
-                json.dump(config, config_file, indent=4)
-        except Exception:
-            sys.exit("Failed to write config file")
+            config: dict
+    ) -> tuple:
+        """
+        Replace streampoints and users with given config at once, called under self.lock.
+        Returns (summary of changes, clients which lost access), removed streampoints and clients
+        are disconnected afterwards by _disconnect_removed
+        """
+        users = config['users']
+        changes = {
+            'streampoints_added': sorted(set(config['streampoints']) - set(self.stream_points)),
+            'streampoints_removed': sorted(set(self.stream_points) - set(config['streampoints'])),
+            'users_added': sorted(set(users) - set(self.stream_users)),
+            'users_removed': sorted(set(self.stream_users) - set(users)),
+            'users_changed': sorted(
+                username for username in set(users) & set(self.stream_users)
+                if users[username] != self.stream_users[username]
+            ),
+            'clients_disconnected': 0,
+        }
+        removed_streampoints = set(changes['streampoints_removed'])
+        revoked = []  # clients which lost access
+        for username in changes['users_removed']:
+            revoked.extend(self.user_clients.get(username, ()))
+        for username in changes['users_changed']:
+            allowed_streampoints = users[username].get('allowed_streampoints')
+            password_changed = users[username].get('password') != self.stream_users[username].get('password')
+            for client in self.user_clients.get(username, ()):
+                if password_changed or (allowed_streampoints and client.streampoint not in allowed_streampoints):
+                    revoked.append(client)
+                else:
+                    client.rate = users[username].get('max_bytes_per_sec') or 0
+        revoked = [client for client in revoked if client.streampoint not in removed_streampoints]
+        changes['clients_disconnected'] = len(revoked) + sum(
+            len(self.client_queues.get(streampoint, ())) for streampoint in removed_streampoints
+        )
+
+        self.stream_points = list(config['streampoints'])
+        self.stream_users = users
+        self.stream_settings = config.get('streampoint_settings', {})
+        relays = config.get('relays', {})
+        for streampoint, task in list(self.relay_tasks.items()):
+            if relays.get(streampoint) != self.relays.get(streampoint):
+                task.cancel()
+                del self.relay_tasks[streampoint]
+        self.relays = relays
+        self.replays = config.get('replays', {})
+        self.config_version += 1
+        self._build_index()
+        self.sync_relays()
+        for streampoint, fanout in self.client_queues.items():
+            fanout.update_settings(self.get_stream_settings(streampoint))
+        return changes, revoked
+
+    async def _disconnect_removed(
+            self,
+            changes: dict,
+            revoked: list
+    ) -> None:
+        """Close servers and clients of removed streampoints and clients which lost access, outside of self.lock"""
+        for streampoint in changes['streampoints_removed']:
+            await self._cleanup(del_server_connections=True, streampoint=streampoint)
+            await self._cleanup(del_client_queues=True, streampoint=streampoint)
+        for client in revoked:
+            fanout = self.client_queues.get(client.streampoint)
+            if fanout and client.client_id in fanout:
+                await fanout.remove_client(client.client_id)
+
+    async def apply_config(
+            self,
+            config: dict
+    ) -> dict:
+        """
+        Apply differences with given config. Removed streampoints and users are closed, clients are disconnected
+        only if their user lost access (password changed or streampoint not allowed), other connections are kept.
+        Returns summary of changes
+        """
+        async with self.lock:
+            changes, revoked = self._replace_config(config)
+        await self._disconnect_removed(changes, revoked)
+        return changes
+
+    async def apply_batch(
+            self,
+            streampoints: dict = None,
+            users: dict = None
+    ) -> dict:
+        """
+        Create, update and delete many streampoints and users in one transaction:
+        {create: [...], update: [...], delete: [names]} for each of them, entries as in add_streampoint
+        and add_stream_user, update changes only given fields (None - reset to default).
+        Either all changes are applied and saved with one write, or none if any of them is invalid (ValueError).
+        Returns summary of changes as apply_config
+        """
+        streampoints = streampoints or {}
+        users = users or {}
+        passwords = list({
+            entry['password']: None for entry in users.get('create', []) + users.get('update', [])
+            if entry.get('password') is not None
+        })
+        # Hashing is slow and releases GIL, passwords of the batch are hashed in parallel
+        loop = asyncio.get_running_loop()
+        hashed = dict(zip(passwords, await asyncio.gather(
+            *(loop.run_in_executor(None, hash_password, password) for password in passwords)
+        )))
+
+        async with self.lock:
+            config = self.config_copy()
+            config['streampoint_settings'] = {
+                streampoint: dict(settings) for streampoint, settings in config['streampoint_settings'].items()
+            }
+            config['replays'] = self.replays
+            self._batch_streampoints(config, streampoints)
+            self._batch_users(config, users, hashed)
+            validate_config(config)
+            changes, revoked = self._replace_config(config)
+            self._config_changed()
+        await self.config_store.flush()
+        await self._disconnect_removed(changes, revoked)
+        logger.debug(f"{str(datetime.datetime.now())} Batch applied: {changes}")
+        return changes
+
+    def _batch_streampoints(
+            self,
+            config: dict,
+            batch: dict
+    ) -> None:
+        stream_points = config['streampoints']
+        existing = set(stream_points)
+        for streampoint in batch.get('delete', []):
+            if streampoint not in existing:
+                raise ValueError(f"streampoint {streampoint} not found")
+            existing.remove(streampoint)
+            config['streampoint_settings'].pop(streampoint, None)
+            config['relays'].pop(streampoint, None)
+        for entry in batch.get('create', []):
+            streampoint = entry['stream_point']
+            if streampoint in existing or streampoint in self.replays:
+                raise ValueError(f"streampoint {streampoint} already exists")
+            existing.add(streampoint)
+            stream_points.append(streampoint)
+            settings = {key: entry[key] for key in DEFAULT_STREAM_SETTINGS if entry.get(key) is not None}
+            if settings:
+                config['streampoint_settings'][streampoint] = settings
+            if entry.get('relay'):
+                config['relays'][streampoint] = entry['relay']
+        for entry in batch.get('update', []):
+            streampoint = entry['stream_point']
+            if streampoint not in existing:
+                raise ValueError(f"streampoint {streampoint} not found")
+            settings = config['streampoint_settings'].setdefault(streampoint, {})
+            for key in DEFAULT_STREAM_SETTINGS:
+                if key in entry and entry[key] is None:
+                    settings.pop(key, None)
+                elif key in entry:
+                    settings[key] = entry[key]
+            if 'relay' in entry and entry['relay'] is None:
+                config['relays'].pop(streampoint, None)
+            elif 'relay' in entry:
+                config['relays'][streampoint] = entry['relay']
+        config['streampoints'] = [streampoint for streampoint in stream_points if streampoint in existing]
+
+    def _batch_users(
+            self,
+            config: dict,
+            batch: dict,
+            hashed: dict
+    ) -> None:
+        stream_users = config['users']
+        for username in batch.get('delete', []):
+            if username not in stream_users:
+                raise ValueError(f"User {username} not found")
+            del stream_users[username]
+        for entry in batch.get('create', []):
+            username = entry['login']
+            if username in stream_users:
+                raise ValueError(f"User {username} already exists")
+            stream_users[username] = {
+                'password': hashed[entry['password']],
+                'allowed_streampoints': entry.get('allowed_streampoints') or []
+            }
+            for key in USER_OPTIONS:
+                if entry.get(key):
+                    stream_users[username][key] = entry[key]
+        for entry in batch.get('update', []):
+            username = entry['login']
+            if username not in stream_users:
+                raise ValueError(f"User {username} not found")
+            user_data = stream_users[username]
+            if entry.get('password') is not None:
+                user_data['password'] = hashed[entry['password']]
+            if 'allowed_streampoints' in entry:
+                user_data['allowed_streampoints'] = entry['allowed_streampoints'] or []
+            for key in USER_OPTIONS:
+                if key in entry and not entry[key]:
+                    user_data.pop(key, None)
+                elif key in entry:
+                    user_data[key] = entry[key]
+
+    async def reload_config(
+            self,
+            file: str = None
+    ) -> dict:
+        """
+        Re-read config file edited outside of REST API and apply only differences, live connections are kept.
+        Replays are not stored in the file and stay running. Raises ValueError if the file is invalid
+        """
+        file = file or self.config_store.file
+
+        def read() -> dict:
+            with open(file, 'r') as config_file:
+                return json.load(config_file)
+
+        # Save in progress finishes before the file is read, and nothing is saved until config is replaced
+        async with self.config_store.write_lock:
+            try:
+                config = await asyncio.to_thread(read)
+            except (OSError, ValueError) as e:
+                raise ValueError(f"Failed to read config file: {e}")
+            validate_config(config)
+            config['replays'] = self.replays
+            self.config_store.discard()  # The file is newer than not yet saved changes
+            async with self.lock:
+                changes, revoked = self._replace_config(config)
+        await self._disconnect_removed(changes, revoked)
+        if self.cluster_hub:
+            self.cluster_hub.publish_config()
+        logger.info(f"{str(datetime.datetime.now())} Config reloaded from {file}: {changes}")
+        return changes
+
+    def is_active(
+            self,
+            streampoint: str
+    ) -> bool:
+        """Returns True if server of streampoint is connected to this or another worker"""
+        if streampoint in self.remote_sources:
+            return True
+        return streampoint in self.server_connections and self.server_connections[streampoint] != {}
+
+    def client_count(
+            self,
+            streampoint: str
+    ) -> int:
+        if self.cluster_hub:
+            return self.cluster_hub.client_count(streampoint)
+        if streampoint in self.client_queues:
+            return len(self.client_queues[streampoint])
+        return 0
+
+    def get_fanout(
+            self,
+            streampoint: str
+    ) -> StreamPointFanout:
+        if streampoint not in self.client_queues:
+            self.client_queues[streampoint] = StreamPointFanout(
+                streampoint=streampoint,
+                settings=self.get_stream_settings(streampoint),
+                on_client_error=self._client_error,
+                user_clients=self.user_clients
+            )
+        return self.client_queues[streampoint]
+
+    def get_stream_settings(
+            self,
+            streampoint: str
+    ) -> dict:
+        """Returns throughput and latency settings of streampoint merged with defaults"""
+        return {**DEFAULT_STREAM_SETTINGS, **self.stream_settings.get(streampoint, {})}
 
     async def add_streampoint(
             self,
             streampoint: str,
+            settings: dict = None,
+            relay: dict = None
     ) -> None:
         """Add new stream point for streaming"""
         async with self.lock:
             if streampoint in self.stream_points:
                 raise ValueError(f"streampoint {streampoint} already exists")
+            if settings:
+                validate_stream_settings(settings)
             self.stream_points.append(streampoint)
-            self._write_config_json()
+            if settings:
+                self.stream_settings[streampoint] = settings
+            if relay:
+                self.relays[streampoint] = relay
+            self._build_index()
+            self._config_changed()
+            self.sync_relays()
             logger.debug(f"{str(datetime.datetime.now())} Added new streampoint: {streampoint}")
 
 
@@ -168,16 +2033,28 @@ class StreamCaster:
         await self._cleanup(del_streampoints=True, streampoint=streampoint)
         await self._cleanup(del_server_connections=True, streampoint=streampoint)
         await self._cleanup(del_client_queues=True, streampoint=streampoint)
-        self._write_config_json()
+        self.sync_relays()
+        self._config_changed()
         logger.debug(f"{str(datetime.datetime.now())} Removed streampoint: {streampoint}")
 
     async def add_stream_user(
             self,
             username: str,
             password: str,
-            allowed_streampoints: list = list()
+            allowed_streampoints: list = list(),
+            message_types: list = None,
+            max_connections: int = None,
+            max_bytes_per_sec: int = None
             ) -> None:
-        """Add new user"""
+        """
+        Add new user. message_types - RTCM3 messages sent to user by default, e.g. [1005, 'msm4'],
+        max_connections - concurrent clients of user, max_bytes_per_sec - bandwidth of each client
+        """
+        if username in self.stream_users:
+            raise ValueError(f"User {username} already exists")
+        if message_types:
+            parse_message_types(message_types)
+        password = await asyncio.get_running_loop().run_in_executor(None, hash_password, password)
         async with self.lock:
             if username in self.stream_users:
                 raise ValueError(f"User {username} already exists")
@@ -185,7 +2062,14 @@ class StreamCaster:
                 'password': password,
                 'allowed_streampoints': allowed_streampoints
             }
-            self._write_config_json()
+            if message_types:
+                self.stream_users[username]['message_types'] = message_types
+            if max_connections:
+                self.stream_users[username]['max_connections'] = max_connections
+            if max_bytes_per_sec:
+                self.stream_users[username]['max_bytes_per_sec'] = max_bytes_per_sec
+            self.auth_index[username] = self._auth_entry(self.stream_users[username])
+            self._config_changed()
             logger.debug(f"{str(datetime.datetime.now())} Added new user: {username}")
 
     async def remove_stream_user(
@@ -194,7 +2078,7 @@ class StreamCaster:
             ) -> None:
         """Remove user"""
         await self._cleanup(del_stream_users=True, username=username)
-        self._write_config_json()
+        self._config_changed()
         logger.debug(f"{str(datetime.datetime.now())} User {username} successfully removed")
 
     async def handle_connection(
@@ -204,14 +2088,21 @@ class StreamCaster:
     ) -> None:
         """ Handler for each new connection inside asyncio.start_server"""
         try:
-            data = await reader.read(4096)
-            info_line = data.split(b'\n')[0].decode().strip()
-            logger.debug(f"{str(datetime.datetime.now())} Handle connection received data: {data}")
-
-            if "SOURCE" in info_line:
-                await self.handle_server(reader=reader, writer=writer, info_line=info_line)
-            elif "GET /" in info_line:
-                await self.handle_client(writer=writer, info_line=info_line, data=data)
+            try:
+                request = await read_ntrip_request(reader)
+            except ValueError as e:
+                logger.debug(f"{str(datetime.datetime.now())} Invalid request: {e}")
+                request = None
+            if request is not None:
+                logger.debug(
+                    f"{str(datetime.datetime.now())} Handle connection {request.method} /{request.streampoint} "
+                    f"NTRIP {request.version}"
+                )
+
+            if request is not None and request.method in ('SOURCE', 'POST'):
+                await self.handle_server(reader=reader, writer=writer, request=request)
+            elif request is not None and request.method == 'GET':
+                await self.handle_client(writer=writer, request=request, reader=reader)
             else:
                 writer.write(b"ERROR - Invalid protocol\r\n")
                 await writer.drain()
@@ -220,70 +2111,143 @@ class StreamCaster:
         except Exception as e:
             logger.debug(f"{str(datetime.datetime.now())} Connection error: {e}")
 
+    async def _register_source(
+            self,
+            streampoint: str,
+            writer: asyncio.StreamWriter
+    ) -> Optional[StreamPointFanout]:
+        """Marks streampoint as fed by given connection. Returns None if streampoint is already in use"""
+        if self.is_active(streampoint):
+            return None
+        if self.cluster:
+            if not await self.cluster.claim(streampoint):
+                return None
+            if self.is_active(streampoint):  # Registered by another connection while waiting for cluster hub
+                self.cluster.release(streampoint)
+                return None
+        if self.cluster_hub and not self.cluster_hub.claim(streampoint, MAIN_PROCESS):
+            return None
+        self.server_connections[streampoint]['last_activity'] = time.time()
+        self.server_connections[streampoint]['writer'] = writer
+        self.update_sourcetable(streampoint)
+        metrics.inc('streamcaster_source_connections_total', streampoint)
+        return self.get_fanout(streampoint)
+
     async def handle_server(
             self,
             reader: asyncio.StreamReader,
             writer: asyncio.StreamWriter,
-            info_line: str,
+            request: NtripRequest
     ) -> None:
-        """Handler for servers"""
-        _, password, streampoint = info_line.split()
-        streampoint = streampoint.lstrip('/')
+        """Handler for servers: NTRIP 1.0 SOURCE or NTRIP 2.0 POST with Basic authorization"""
+        streampoint = request.streampoint
+        password = request.password
+        if password is None:
+            try:
+                password = base64.b64decode(request.basic_auth() or '').decode().split(':', 1)[-1]
+            except ValueError:
+                password = None
         logger.debug(f"{str(datetime.datetime.now())} Start server handle task for {streampoint} \r\n")
+        fanout = None
         try:
             if streampoint not in self.stream_points or password != SERVER_PASSWORD:
                 writer.write(b"ERROR - Invalid streampoint or password\r\n")
                 logger.debug(f"{str(datetime.datetime.now())} ERROR - Invalid streampoint or password\r\n")
                 await writer.drain()
                 return
-            if streampoint in self.server_connections and self.server_connections[streampoint] != {}:
+            fanout = await self._register_source(streampoint=streampoint, writer=writer)
+            if fanout is None:
                 writer.write(b"ERROR - streampoint is already in use\r\n")
                 logger.debug(f"{str(datetime.datetime.now())} ERROR - streampoint is already in use")
                 await writer.drain()
                 return
-            async with self.lock:
-                self.server_connections[streampoint]['last_activity'] = time.time()
-            writer.write(b"ICY 200 OK\r\n\r\n")
+            writer.write(request.ok_response())
             await writer.drain()
         except Exception as e:
             logger.debug(f"{str(datetime.datetime.now())} ERROR - Server task exception: {e}\r\n")
+            if fanout is not None:  # Registered, but response was not sent
+                if self.cluster:
+                    self.cluster.release(streampoint)
+                await self._cleanup(
+                    del_server_connections=True,
+                    del_client_queues=True,
+                    streampoint=streampoint,
+                    writer=writer
+                )
             return
 
+        await self._serve_source(
+            reader=reader,
+            writer=writer,
+            streampoint=streampoint,
+            fanout=fanout,
+            initial=request.body,
+            chunked=request.chunked
+        )
+
+    async def _serve_source(
+            self,
+            reader: asyncio.StreamReader,
+            writer: asyncio.StreamWriter,
+            streampoint: str,
+            fanout: StreamPointFanout,
+            keepalive: bool = True,
+            initial: bytes = b'',
+            chunked: bool = False
+    ) -> None:
+        """
+        Reads data of registered server (or upstream caster) and broadcasts it until connection is lost.
+        initial - data received together with request headers
+        """
+        settings = self.get_stream_settings(streampoint)
+        recorder = None
+        if settings['record']:
+            recorder = StreamRecorder(
+                streampoint=streampoint,
+                segment_sec=settings['record_segment_sec'],
+                keep_sec=settings['record_keep_sec']
+            )
+        decoder = ChunkedDecoder() if chunked else None
+        splitter = Rtcm3Splitter(validate=True) if settings['rtcm3_frames'] else None
+        frames = None
+        connection = self.server_connections[streampoint]
+        connection['keepalive'] = keepalive
+        self._schedule_source_check(streampoint, HEARTBEAT_INTERVAL)
         try:
             while True:
-                # Read data from server and check its activity
+                # Read data from server, idle connection is checked by timer wheel
                 try:
-                    server_activity_sec = time.time() - self.server_connections[streampoint]['last_activity']
-                    logger.debug(
-                        f"{str(datetime.datetime.now())} {streampoint} clients {len(self.client_queues[streampoint])} clients")
-                    if server_activity_sec > SERVER_TIMEOUT:
-                        logger.debug(
-                            f"{str(datetime.datetime.now())} Wait for server data for streampoint {streampoint}..."
-                        )
-                        if server_activity_sec > RECONNECT_DELAY:
-                            raise TimeoutError
-                    writer.write(b' ')
-                    await writer.drain()
-                    data = await asyncio.wait_for(reader.read(4096), timeout=1)
-                    if data:
-                        self.server_connections[streampoint]['last_activity'] = time.time()
+                    data = initial or await reader.read(settings['read_size'])
+                    initial = b''
+                    if not data:
+                        raise ConnectionError("server closed connection")
+                    connection['last_activity'] = time.time()
+                    data = await self._coalesce(reader=reader, data=data, settings=settings)
+                    if decoder:
+                        data = decoder.feed(data)
+                        if not data:
+                            continue
+                    metrics.inc('streamcaster_bytes_in_total', streampoint, len(data))
+                    if splitter:
+                        frames = splitter.feed(data)
+                        if splitter.crc_errors:
+                            metrics.inc('streamcaster_rtcm3_crc_errors_total', streampoint, splitter.crc_errors)
+                            splitter.crc_errors = 0
+                        if not frames:
+                            continue
+                        data = frames[0][1] if len(frames) == 1 else b''.join(frame for _, frame in frames)
+                    if recorder:
+                        recorder.add(data, time.time())
                 except Exception as e:
                     logger.debug(
-                        f"{str(datetime.datetime.now())} Error reading data from {streampoint} server:{e}"
+                        f"{str(datetime.datetime.now())} Connection with server for {streampoint} lost: {e}"
                         )
-                    data = b' '  # Empty data to maintain client connection
-                    if isinstance(e, (ConnectionError, OSError)):
-                        logger.debug(
-                            f"{str(datetime.datetime.now())} Connection with server for {streampoint} lost: {e}"
-                            )
-                        raise TimeoutError
-                # Put data to broadcast queue
+                    raise TimeoutError
+                # Put data to client ring buffers
                 try:
-                    await self.broadcast_queue.put((streampoint, data))
-                    logger.debug(
-                        f"{str(datetime.datetime.now())} Broadcast data to {streampoint} (server): {data}"
-                        )
-                    await asyncio.sleep(self.rate_limit)
+                    fanout.publish(data, frames)
+                    if self.cluster:
+                        self.cluster.send_data(streampoint, data)
                 except Exception as e:
                     logger.debug(
                         f"{str(datetime.datetime.now())} Error broadcasting data for {streampoint}:{e}"
@@ -294,6 +2258,12 @@ class StreamCaster:
             logger.debug(f"{str(datetime.datetime.now())} Error - Server exception {e}")
         finally:
             logger.debug(f"{str(datetime.datetime.now())} Removing server task...")
+            timers.cancel(('source', streampoint))
+            metrics.inc('streamcaster_source_disconnections_total', streampoint)
+            if recorder:
+                await recorder.close()
+            if self.cluster:
+                self.cluster.release(streampoint)
             await self._cleanup(
                 del_server_connections=True,
                 del_client_queues=True,
@@ -307,117 +2277,322 @@ class StreamCaster:
                     f"{str(datetime.datetime.now())} Server task cancel for streampoint {streampoint} error"
                     f" {self.server_connections}\n"
                 )
-            return
 
-    async def handle_broadcast(self) -> None:
-        """Handler for broadcast task"""
-        while True:
+    async def add_replay(
+            self,
+            name: str,
+            streampoint: str,
+            start: float,
+            end: float,
+            speed: float = 1
+    ) -> None:
+        """Serve recorded data of streampoint between start and end (unix time) as virtual streampoint name"""
+        if name in self.streampoint_index:
+            raise ValueError(f"streampoint {name} already exists")
+        if speed < 1:
+            raise ValueError("speed must be 1 or more")
+        if not await asyncio.to_thread(list_segments, RECORD_DIR, streampoint):
+            raise ValueError(f"No recordings for streampoint {streampoint}")
+        self.replays[name] = {'streampoint': streampoint, 'start': start, 'end': end, 'speed': speed}
+        self._build_index()
+        if self.cluster_hub:
+            self.cluster_hub.publish_config()
+        self.replay_tasks[name] = asyncio.create_task(self.run_replay(name))
+
+    async def remove_replay(
+            self,
+            name: str
+    ) -> None:
+        if name not in self.replays:
+            raise KeyError(f"Replay {name} not found")
+        self.replay_tasks.pop(name).cancel()
+
+    async def run_replay(
+            self,
+            name: str
+    ) -> None:
+        """Publishes recorded chunks keeping their original intervals divided by speed"""
+        replay = self.replays[name]
+        fanout = None
+        try:
+            fanout = await self._register_source(streampoint=name, writer=None)
+            if fanout is None:
+                return
+            segments = await asyncio.to_thread(list_segments, RECORD_DIR, replay['streampoint'])
+            segments = [
+                path for i, (segment_start, path) in enumerate(segments)
+                if segment_start <= replay['end'] and (i + 1 == len(segments) or segments[i + 1][0] > replay['start'])
+            ]
+            loop = asyncio.get_running_loop()
+            started = None
+            for path in segments:
+                pos = 0
+                while True:
+                    records, pos = await asyncio.to_thread(read_segment, path, pos)  # Disk reads off event loop
+                    if not records:
+                        break
+                    for timestamp, chunk in records:
+                        if timestamp < replay['start']:
+                            continue
+                        if timestamp > replay['end']:
+                            return
+                        if started is None:
+                            started = (loop.time(), timestamp)
+                        delay = (timestamp - started[1]) / replay['speed'] - (loop.time() - started[0])
+                        if delay > 0:
+                            await asyncio.sleep(delay)
+                        self.server_connections[name]['last_activity'] = time.time()
+                        fanout.publish(chunk)
+                        if self.cluster_hub:
+                            self.cluster_hub.send_data(name, chunk)
+        finally:
+            logger.debug(f"{str(datetime.datetime.now())} Replay {name} finished")
+            if fanout is not None:
+                if self.cluster_hub:
+                    self.cluster_hub.release(name, MAIN_PROCESS)
+                await self._cleanup(del_server_connections=True, del_client_queues=True, streampoint=name)
+            self.replays.pop(name, None)
+            self.replay_tasks.pop(name, None)
+            self._build_index()
+            if self.cluster_hub:
+                self.cluster_hub.publish_config()
+
+    def _schedule_source_check(
+            self,
+            streampoint: str,
+            delay: float
+    ) -> None:
+        timers.schedule(('source', streampoint), delay, lambda: self._check_source(streampoint))
+
+    def _check_source(
+            self,
+            streampoint: str
+    ) -> None:
+        """Timer callback: heartbeat to idle server, close server idle longer than RECONNECT_DELAY"""
+        connection = self.server_connections.get(streampoint)
+        if not connection or not connection.get('writer'):
+            return
+        idle = time.time() - connection['last_activity']
+        if idle < HEARTBEAT_INTERVAL:
+            self._schedule_source_check(streampoint, HEARTBEAT_INTERVAL - idle)
+            return
+        if idle > RECONNECT_DELAY:
+            logger.debug(f"{str(datetime.datetime.now())} Error - Server timeout for streampoint {streampoint}")
+            connection['writer'].close()  # Read loop of server ends and cleans resources
+            return
+        if idle > SERVER_TIMEOUT:
+            logger.debug(f"{str(datetime.datetime.now())} Wait for server data for streampoint {streampoint}...")
+        if connection.get('keepalive'):
+            connection['writer'].write(b' ')
+        self._schedule_source_check(streampoint, min(HEARTBEAT_INTERVAL, RECONNECT_DELAY - idle + TIMER_TICK))
+
+    def sync_relays(self) -> None:
+        """Start relay tasks for new relay streampoints and stop tasks of removed ones"""
+        if self.cluster_hub or (self.cluster and self.cluster.worker_id != 0):
+            return  # In multi-process mode relays run in the first worker only
+        for streampoint in list(self.relay_tasks):
+            if streampoint not in self.relays:
+                self.relay_tasks.pop(streampoint).cancel()
+        for streampoint in self.relays:
+            if streampoint not in self.relay_tasks or self.relay_tasks[streampoint].done():
+                self.relay_tasks[streampoint] = asyncio.create_task(self.run_relay(streampoint))
+
+    async def _connect_upstream(
+            self,
+            relay: dict,
+            streampoint: str
+    ) -> tuple:
+        """
+        Connects to upstream caster as NTRIP client and returns (reader, writer, chunked)
+        positioned at stream data. Only 'ICY 200 OK' or 'HTTP/1.x 200' without gnss/sourcetable content
+        is stream data, upstream sends sourcetable if its mountpoint is missing
+        """
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(relay['host'], relay['port']),
+            timeout=RELAY_CONNECT_TIMEOUT
+        )
+        auth_data = base64.b64encode(f"{relay.get('user', '')}:{relay.get('password', '')}".encode()).decode()
+        writer.write(
+            f"GET /{relay.get('streampoint', streampoint)} HTTP/1.1\r\n"
+            f"Host: {relay['host']}\r\n"
+            f"User-Agent: NTRIP StreamCaster\r\n"
+            f"Authorization: Basic {auth_data}\r\n\r\n".encode()
+        )
+        await writer.drain()
+        status_line = await asyncio.wait_for(reader.readline(), timeout=RELAY_CONNECT_TIMEOUT)
+        status = status_line.split()[:2]
+        http = len(status) == 2 and status[0] in (b'HTTP/1.0', b'HTTP/1.1') and status[1] == b'200'
+        if status != [b'ICY', b'200'] and not http:
+            writer.close()
+            raise ConnectionError(f"upstream refused: {status_line.strip()}")
+        headers = {}  # {lowercase name: lowercase value}
+        if http:
+            while header := (await asyncio.wait_for(reader.readline(), timeout=RELAY_CONNECT_TIMEOUT)).strip():
+                name, _, value = header.partition(b':')
+                headers[name.strip().lower()] = value.strip().lower()
+        if headers.get(b'content-type', b'').startswith(b'gnss/sourcetable'):
+            writer.close()
+            raise ConnectionError("upstream sent sourcetable, streampoint not found")
+        return reader, writer, b'chunked' in headers.get(b'transfer-encoding', b'')
+
+    async def run_relay(
+            self,
+            streampoint: str
+    ) -> None:
+        """Feeds streampoint from another caster, reconnecting with exponential backoff"""
+        delay = RELAY_BACKOFF_MIN
+        while streampoint in self.relays:
+            relay = self.relays[streampoint]
+            started = time.time()
+            try:
+                reader, writer, chunked = await self._connect_upstream(relay=relay, streampoint=streampoint)
+                fanout = await self._register_source(streampoint=streampoint, writer=writer)
+                if fanout is None:
+                    writer.close()
+                    raise ConnectionError("streampoint is already in use")
+                logger.info(
+                    f"{str(datetime.datetime.now())} Relay {streampoint} connected to "
+                    f"{relay['host']}:{relay['port']}/{relay.get('streampoint', streampoint)}"
+                )
+                await self._serve_source(
+                    reader=reader,
+                    writer=writer,
+                    streampoint=streampoint,
+                    fanout=fanout,
+                    keepalive=False,
+                    chunked=chunked
+                )
+            except Exception as e:
+                logger.debug(f"{str(datetime.datetime.now())} Relay {streampoint} error: {e}")
+            if time.time() - started > RELAY_BACKOFF_MAX:
+                delay = RELAY_BACKOFF_MIN  # Connection was healthy, reconnect quickly
+            logger.debug(f"{str(datetime.datetime.now())} Relay {streampoint} reconnect in {delay} s")
+            await asyncio.sleep(delay * random.uniform(0.5, 1.5))
+            delay = min(delay * 2, RELAY_BACKOFF_MAX)
+
+    async def _coalesce(
+            self,
+            reader: asyncio.StreamReader,
+            data: bytes,
+            settings: dict
+    ) -> bytes:
+        """Joins small reads which arrive inside coalesce window into one chunk"""
+        window = settings['coalesce_window_us'] / 1_000_000
+        read_size = settings['read_size']
+        if not window or len(data) >= read_size:
+            return data
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + window
+        chunks = [data]
+        size = len(data)
+        while size < read_size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
             try:
-                streampoint, data = await asyncio.wait_for(self.broadcast_queue.get(), timeout=10)
-                asyncio.create_task(self.start_broadcast_task(streampoint=streampoint, data=data))
-            except Exception:
-                logger.debug(f"{str(datetime.datetime.now())} No data in queue from server")
-            await asyncio.sleep(self.rate_limit)
+                chunk = await asyncio.wait_for(reader.read(read_size - size), timeout=remaining)
+            except asyncio.TimeoutError:
+                break
+            if not chunk:
+                break
+            chunks.append(chunk)
+            size += len(chunk)
+        return b''.join(chunks)
+
+    async def _client_error(
+            self,
+            streampoint: str,
+            client_id: int
+    ) -> None:
+        """Callback of fan-out engine for clients with broken connection"""
+        await self._cleanup(del_client_queues=True, streampoint=streampoint, client_id=client_id)
 
-    async def start_broadcast_task(
+    async def admit_client(
             self,
             streampoint: str,
-            data: bytes
-            ) -> None:
-        """ Broadcasting data to clients"""
-        logger.debug(f"{str(datetime.datetime.now())} Start broadcast for {streampoint}")
+            auth_data: Optional[str],
+            message_types: Optional[str] = None
+    ) -> tuple:
+        """
+        Checks that client may receive streampoint, used for NTRIP, WebSocket and SSE clients.
+        Returns (user, user settings, message types filter), raises ValueError with reason of refusal.
+        Connection limit is checked last without await after it, client has to be added right after return
+        """
+        login = None
         try:
-            disconnected = []
-            async with self.lock:
-                clients = list(self.client_queues[streampoint].items())
-            clients_id = [i[0] for i in clients]
-            logger.debug(f"{str(datetime.datetime.now())} Broadcast {streampoint} for {len(clients_id)} clients")
-            for client_id, writer in clients:
-                try:
-                    writer.write(data)
-                    await writer.drain()
-                except (ConnectionError, ConnectionResetError, ConnectionAbortedError, OSError):
-                    disconnected.append(client_id)
-                    logger.debug(
-                        f"{str(datetime.datetime.now())} Client {streampoint}:{client_id} write error"
-                    )
-                except Exception as e:
-                    logger.debug(
-                        f"{str(datetime.datetime.now())} Error - writing data to {streampoint}:{client_id} exception: {e}"
-                    )
-                    disconnected.append(client_id)
-
-            logger.debug(f"{str(datetime.datetime.now())} Disconnected list for {streampoint}: {disconnected}")
-            if disconnected:
-                logger.debug(
-                    f"{str(datetime.datetime.now())} Removing {len(disconnected)} inactive clients"
-                    )
-                for client_id in disconnected:
-                    await self._cleanup(del_client_queues=True, streampoint=streampoint, client_id=client_id)
-        except Exception as e:
-            logger.debug(f"{str(datetime.datetime.now())} Broadcast error: {e}")
-        finally:
-            return
+            if auth_data:
+                login, error = await self.authenticate(auth_data)
+                if error:
+                    raise ValueError(error)
+                allowed_streampoints = self.auth_index[login][1]
+                if allowed_streampoints is not None and streampoint not in allowed_streampoints:
+                    raise ValueError("streampoint not allowed for user")
+
+            user_data = self.stream_users.get(login, {}) if login else {}
+            rtcm3_frames = self.get_stream_settings(streampoint)['rtcm3_frames']
+            if message_types and not rtcm3_frames:
+                raise ValueError("message type filter is not available for streampoint")
+            if message_types is None and rtcm3_frames:
+                message_types = user_data.get('message_types')
+            message_types = parse_message_types(message_types) if message_types else None
+
+            if streampoint not in self.streampoint_index:
+                raise ValueError("streampoint not found")
+            if not self.is_active(streampoint):
+                raise ValueError("streampoint is not active")
+
+            max_connections = user_data.get('max_connections')
+            if max_connections and len(self.user_clients.get(login, ())) >= max_connections:
+                # Web clients and clients being disconnected may still hold their slots
+                for client in [client for client in self.user_clients[login] if client.reader_closed()]:
+                    await self._client_error(client.streampoint, client.client_id)
+                if len(self.user_clients.get(login, ())) >= max_connections:
+                    raise ValueError("connection limit reached for user")
+        except ValueError as e:
+            metrics.inc('streamcaster_client_rejections_total', streampoint)
+            logger.debug(f"{str(datetime.datetime.now())} Error - {e} for {login} on {streampoint}\r\n")
+            raise
+        return login, user_data, message_types
 
     async def handle_client(
             self,
             writer: asyncio.StreamWriter,
-            info_line: str,
-            data: bytes
+            request: NtripRequest,
+            reader: asyncio.StreamReader = None
     ) -> None:
-        """Handler for clients"""
-        streampoint = info_line.split()[1].lstrip('/')
-        header_data = data.split(b'\n')
+        """Handler for clients, GET / returns sourcetable"""
+        streampoint = request.streampoint
         logger.debug(f"{str(datetime.datetime.now())} Start client handle task for {streampoint}\r\n")
         try:
-            for header in header_data:
-                header = header.decode()
-                if 'Authorization:' in header and 'Basic' in header:
-                    auth_data = header.split(':')[1].split(' ')[-1]  # Get authorization data
-                    login, password = base64.b64decode(auth_data).decode().split(':')
-                    async with self.lock:
-                        if login not in self.stream_users:
-                            writer.write(b"Error - User not found\r\n")
-                            logger.debug(f"{str(datetime.datetime.now())} Error - User {login} not found\r\n")
-                            await writer.drain()
-                            return
-
-                        if password != self.stream_users[login]['password']:
-                            writer.write(b"Error - User authorization failed\r\n")
-                            logger.debug(f"{str(datetime.datetime.now())} Error - User {login} authorization failed\r\n")
-                            await writer.drain()
-                            return
-
-                        if self.stream_users[login]['allowed_streampoints']:
-                            if streampoint not in self.stream_users[login]['allowed_streampoints']:
-                                writer.write(b"Error - streampoint not allowed for user\r\n")
-                                logger.debug(f"{str(datetime.datetime.now())} Error - streampoint {streampoint} not allowed for {login}\r\n")
-                                await writer.drain()
-                                return
-
-            if streampoint not in self.stream_points:
-                writer.write(b"Error - streampoint not found\r\n")
-                logger.debug(
-                    f"{str(datetime.datetime.now())} Error - streampoint {streampoint} not found\r\n"
-                    )
+            if not streampoint:
+                writer.write(self.sourcetable.response(request.version))
                 await writer.drain()
+                writer.close()
                 return
 
-            if streampoint not in self.server_connections or\
-                    self.server_connections[streampoint] == {}:
-                writer.write(b"Error - streampoint is not active\r\n")
-                logger.debug(
-                    f"{str(datetime.datetime.now())} Error - streampoint {streampoint} is not active\r\n"
-                    )
+            try:
+                login, user_data, message_types = await self.admit_client(
+                    streampoint=streampoint,
+                    auth_data=request.basic_auth(),
+                    message_types=request.query.get('types')
+                )
+            except ValueError as e:
+                writer.write(f"Error - {e}\r\n".encode())
                 await writer.drain()
                 return
 
-            writer.write(b"ICY 200 OK\r\n")
-            await writer.drain()
-
-            client_id = id(writer)
-            new_client = {client_id: writer}
-            self.client_queues[streampoint] = {**new_client, **self.client_queues[streampoint]}  # Add new client to start
+            client_socket = writer.get_extra_info('socket')
+            if client_socket is not None:
+                client_socket.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            # No await after admit_client, data follows response in transport buffer
+            writer.write(request.ok_response())
+            client_id = self.get_fanout(streampoint).add_client(
+                writer=writer,
+                username=login,
+                message_types=message_types,
+                rate=user_data.get('max_bytes_per_sec') or 0,
+                reader=reader
+            ).client_id
             logger.debug(
                 f"{str(datetime.datetime.now())} Client {streampoint}:{client_id} added\r\n"
             )
@@ -429,6 +2604,375 @@ class StreamCaster:
         finally:
             return
 
+
+# Multi-process mode: frames exchanged between main process (ClusterHub) and workers (ClusterLink)
+FRAME_HEADER = struct.Struct('!BI')  # frame kind, payload length
+(
+    FRAME_HELLO,  # worker -> hub: worker id
+    FRAME_CONFIG,  # hub -> worker: json config
+    FRAME_CLAIM,  # worker -> hub: streampoint whose server connected to worker
+    FRAME_CLAIMED,  # hub -> worker: b'1' / b'0' + streampoint
+    FRAME_RELEASE,  # worker -> hub: streampoint whose server disconnected
+    FRAME_SOURCE_UP,  # hub -> worker: streampoint is fed by another worker
+    FRAME_SOURCE_DOWN,  # hub -> worker: streampoint is not fed any more
+    FRAME_DATA,  # both ways: streampoint + b'\0' + data
+    FRAME_STATS,  # worker -> hub: json {clients: {streampoint: client_count}, metrics: metrics snapshot, profile: report}
+    FRAME_CONFIG_DELTA,  # hub -> worker: json changes of config, see config_delta
+) = range(10)
+CLUSTER_STATS_INTERVAL = 1  # seconds
+CLUSTER_BUFFER_LIMIT = 4 * 1024 * 1024  # bytes waiting in unix socket buffer before data frames are dropped
+CLUSTER_CONFIG_DELAY = 0.1  # seconds, config changes made within this time after the previous one are sent together
+CONFIG_SECTIONS = ('users', 'streampoint_settings', 'relays', 'replays')  # dict sections of config
+MAIN_PROCESS = -1  # owner id of streampoints served by main process (replays)
+
+
+def pack_frame(
+        kind: int,
+        payload: bytes
+) -> bytes:
+    return FRAME_HEADER.pack(kind, len(payload)) + payload
+
+
+async def read_frame(
+        reader: asyncio.StreamReader
+) -> tuple:
+    kind, length = FRAME_HEADER.unpack(await reader.readexactly(FRAME_HEADER.size))
+    return kind, await reader.readexactly(length)
+
+
+def write_data_frame(
+        writer: asyncio.StreamWriter,
+        streampoint: str,
+        frame: bytes
+) -> bool:
+    """
+    Writes data frame unless the other process does not keep up: more than CLUSTER_BUFFER_LIMIT is waiting
+    in transport buffer. Data is dropped then, as for slow clients, so memory of this process doesn't grow
+    """
+    if writer.transport.get_write_buffer_size() > CLUSTER_BUFFER_LIMIT:
+        metrics.inc('streamcaster_cluster_dropped_bytes_total', streampoint, len(frame))
+        return False
+    writer.write(frame)
+    return True
+
+
+def config_delta(
+        old: dict,
+        new: dict
+) -> dict:
+    """
+    Changes between two configs: {streampoints_added: [...], streampoints_removed: [...],
+    section: {key: new value, None if removed}} for CONFIG_SECTIONS, unchanged parts are left out
+    """
+    delta = {}
+    old_streampoints = set(old['streampoints'])
+    new_streampoints = set(new['streampoints'])
+    added = [streampoint for streampoint in new['streampoints'] if streampoint not in old_streampoints]
+    removed = [streampoint for streampoint in old['streampoints'] if streampoint not in new_streampoints]
+    if added:
+        delta['streampoints_added'] = added
+    if removed:
+        delta['streampoints_removed'] = removed
+    for section in CONFIG_SECTIONS:
+        old_entries = old.get(section, {})
+        new_entries = new.get(section, {})
+        changes = {key: value for key, value in new_entries.items() if old_entries.get(key) != value}
+        changes.update({key: None for key in old_entries if key not in new_entries})
+        if changes:
+            delta[section] = changes
+    return delta
+
+
+def apply_config_delta(
+        config: dict,
+        delta: dict
+) -> dict:
+    """Returns config with changes of config_delta, given config is not modified. Applying delta twice changes nothing"""
+    removed = set(delta.get('streampoints_removed', ()))
+    streampoints = [streampoint for streampoint in config['streampoints'] if streampoint not in removed]
+    present = set(streampoints)
+    streampoints += [streampoint for streampoint in delta.get('streampoints_added', ()) if streampoint not in present]
+    result = {'streampoints': streampoints}
+    for section in CONFIG_SECTIONS:
+        entries = dict(config.get(section, {}))
+        for key, value in delta.get(section, {}).items():
+            if value is None:
+                entries.pop(key, None)
+            else:
+                entries[key] = value
+        result[section] = entries
+    return result
+
+
+class ClusterHub:
+    """
+    Runs in the main process in multi-process mode.
+    Decides which worker owns the server of each streampoint, relays server data to other workers
+    and sends them config changes made through FastAPI. Workers get full config on connection and then only
+    changes, a burst of admin changes is sent as one delta
+    """
+    def __init__(
+            self,
+            caster: StreamCaster,
+            path: str = CLUSTER_SOCKET
+    ):
+        self.caster = caster
+        self.path = path
+        self.workers: Dict[int, asyncio.StreamWriter] = {}  # {worker_id: writer}
+        self.sources: Dict[str, int] = {}  # {streampoint: worker_id}
+        self.client_counts: Dict[int, Dict[str, int]] = {}  # {worker_id: {streampoint: client_count}}
+        self.worker_metrics: Dict[int, dict] = {}  # {worker_id: metrics snapshot}
+        self.worker_profiles: Dict[int, dict] = {}  # {worker_id: profiler report}
+        self.published: dict = {}  # config of the last delta sent to workers
+        self.config_dirty = False  # config changed after the last delta
+        self.config_task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self.published = self._config()
+        self.server = await asyncio.start_unix_server(self.handle_worker, path=self.path)
+
+    def client_count(
+            self,
+            streampoint: str
+    ) -> int:
+        """Clients of all workers and WebSocket/SSE clients of main process"""
+        local = len(self.caster.client_queues.get(streampoint, ()))
+        return local + sum(counts.get(streampoint, 0) for counts in self.client_counts.values())
+
+    def _send(
+            self,
+            frame: bytes,
+            exclude: int = None,
+            streampoint: str = None
+    ) -> None:
+        """Send frame to workers, streampoint is given for data frames which are dropped for lagging workers"""
+        for worker_id, writer in list(self.workers.items()):
+            if worker_id == exclude:
+                continue
+            if streampoint is None:
+                writer.write(frame)
+            else:
+                write_data_frame(writer, streampoint, frame)
+
+    def _config(self) -> dict:
+        return {**self.caster.config_copy(), 'replays': dict(self.caster.replays)}
+
+    def publish_config(self) -> None:
+        """
+        Send config changes to workers. The first change is sent at once, changes made within
+        CLUSTER_CONFIG_DELAY after it are collected and sent as one delta
+        """
+        if self.config_task is not None and not self.config_task.done():
+            self.config_dirty = True
+            return
+        self._send_config_delta()
+        self.config_task = asyncio.create_task(self._publish_later())
+
+    async def _publish_later(self) -> None:
+        while True:
+            await asyncio.sleep(CLUSTER_CONFIG_DELAY)
+            if not self.config_dirty:
+                return
+            self.config_dirty = False
+            self._send_config_delta()
+
+    def _send_config_delta(self) -> None:
+        config = self._config()
+        delta = config_delta(self.published, config)
+        self.published = config
+        if delta:
+            self._send(pack_frame(FRAME_CONFIG_DELTA, json.dumps(delta).encode()))
+
+    def claim(
+            self,
+            streampoint: str,
+            worker_id: int
+    ) -> bool:
+        """Make worker (or MAIN_PROCESS) the only server of streampoint. Returns False if it is already served"""
+        if streampoint in self.sources:
+            return False
+        self.sources[streampoint] = worker_id
+        self.caster.server_connections[streampoint] = {
+            'last_activity': time.time(),
+            'worker': worker_id
+        }
+        self._send(pack_frame(FRAME_SOURCE_UP, streampoint.encode()), exclude=worker_id)
+        return True
+
+    def release(
+            self,
+            streampoint: str,
+            worker_id: int
+    ) -> None:
+        if self.sources.get(streampoint) != worker_id:
+            return
+        del self.sources[streampoint]
+        self.caster.server_connections.pop(streampoint, None)
+        self._send(pack_frame(FRAME_SOURCE_DOWN, streampoint.encode()), exclude=worker_id)
+        if streampoint in self.caster.client_queues:
+            asyncio.create_task(self.caster._cleanup(del_client_queues=True, streampoint=streampoint))
+
+    def send_data(
+            self,
+            streampoint: str,
+            data: bytes
+    ) -> None:
+        """Data of streampoint served by main process"""
+        self._send(pack_frame(FRAME_DATA, streampoint.encode() + b'\0' + data), streampoint=streampoint)
+
+    async def handle_worker(
+            self,
+            reader: asyncio.StreamReader,
+            writer: asyncio.StreamWriter
+    ) -> None:
+        worker_id = None
+        try:
+            kind, payload = await read_frame(reader)
+            if kind != FRAME_HELLO:
+                return
+            worker_id = int(payload)
+            self.workers[worker_id] = writer
+            writer.write(pack_frame(FRAME_CONFIG, json.dumps(self.caster.config_snapshot()).encode()))
+            for streampoint in self.sources:
+                writer.write(pack_frame(FRAME_SOURCE_UP, streampoint.encode()))
+            logger.debug(f"{str(datetime.datetime.now())} Worker {worker_id} connected to cluster hub")
+
+            while True:
+                kind, payload = await read_frame(reader)
+                if kind == FRAME_DATA:
+                    streampoint, data = payload.split(b'\0', 1)
+                    streampoint = streampoint.decode()
+                    self._send(pack_frame(FRAME_DATA, payload), exclude=worker_id, streampoint=streampoint)
+                    fanout = self.caster.client_queues.get(streampoint)  # WebSocket and SSE clients of main process
+                    if fanout:
+                        fanout.publish(data)
+                elif kind == FRAME_CLAIM:
+                    claimed = self.claim(payload.decode(), worker_id)
+                    writer.write(pack_frame(FRAME_CLAIMED, (b'1' if claimed else b'0') + payload))
+                elif kind == FRAME_RELEASE:
+                    self.release(payload.decode(), worker_id)
+                elif kind == FRAME_STATS:
+                    stats = json.loads(payload)
+                    self.client_counts[worker_id] = stats['clients']
+                    self.worker_metrics[worker_id] = stats['metrics']
+                    self.worker_profiles[worker_id] = stats['profile']
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, OSError) as e:
+            logger.debug(f"{str(datetime.datetime.now())} Worker {worker_id} disconnected from cluster hub: {e}")
+        finally:
+            self.workers.pop(worker_id, None)
+            self.client_counts.pop(worker_id, None)
+            self.worker_metrics.pop(worker_id, None)
+            self.worker_profiles.pop(worker_id, None)
+            for streampoint in [sp for sp, owner in self.sources.items() if owner == worker_id]:
+                self.release(streampoint, worker_id)
+            writer.close()
+
+
+class ClusterLink:
+    """
+    Connection of worker process to ClusterHub.
+    Shares server data of local streampoints with other workers and applies data and config received from hub
+    """
+    def __init__(
+            self,
+            caster: StreamCaster,
+            worker_id: int,
+            path: str = CLUSTER_SOCKET
+    ):
+        self.caster = caster
+        self.worker_id = worker_id
+        self.path = path
+        self.pending_claims: Dict[str, deque] = defaultdict(deque)  # {streampoint: futures in order of requests}
+        self.closed = asyncio.Event()
+
+    async def connect(self) -> None:
+        self.reader, self.writer = await asyncio.open_unix_connection(path=self.path)
+        self.writer.write(pack_frame(FRAME_HELLO, str(self.worker_id).encode()))
+        await self.writer.drain()
+        asyncio.create_task(self._read_loop())
+        asyncio.create_task(self._stats_loop())
+
+    async def claim(
+            self,
+            streampoint: str
+    ) -> bool:
+        """
+        Returns True if hub allowed this worker to serve the server of streampoint.
+        Hub answers claims in order, a claim granted after timeout is released by _read_loop
+        """
+        future = asyncio.get_running_loop().create_future()
+        self.pending_claims[streampoint].append(future)
+        self.writer.write(pack_frame(FRAME_CLAIM, streampoint.encode()))
+        await self.writer.drain()
+        return await asyncio.wait_for(future, timeout=5)
+
+    def release(
+            self,
+            streampoint: str
+    ) -> None:
+        self.writer.write(pack_frame(FRAME_RELEASE, streampoint.encode()))
+
+    def send_data(
+            self,
+            streampoint: str,
+            data: bytes
+    ) -> None:
+        write_data_frame(self.writer, streampoint, pack_frame(FRAME_DATA, streampoint.encode() + b'\0' + data))
+
+    async def _stats_loop(self) -> None:
+        while not self.closed.is_set():
+            stats = {
+                'clients': {sp: len(fanout) for sp, fanout in self.caster.client_queues.items()},
+                'metrics': metrics.snapshot(),
+                'profile': profiler.report(),
+            }
+            if self.writer.transport.get_write_buffer_size() <= CLUSTER_BUFFER_LIMIT:
+                self.writer.write(pack_frame(FRAME_STATS, json.dumps(stats).encode()))
+            await asyncio.sleep(CLUSTER_STATS_INTERVAL)
+
+    async def _read_loop(self) -> None:
+        try:
+            while True:
+                kind, payload = await read_frame(self.reader)
+                if kind == FRAME_DATA:
+                    streampoint, data = payload.split(b'\0', 1)
+                    streampoint = streampoint.decode()
+                    if streampoint in self.caster.remote_sources:
+                        self.caster.get_fanout(streampoint).publish(data)
+                elif kind == FRAME_SOURCE_UP:
+                    streampoint = payload.decode()
+                    self.caster.remote_sources.add(streampoint)
+                    self.caster.update_sourcetable(streampoint)
+                elif kind == FRAME_SOURCE_DOWN:
+                    streampoint = payload.decode()
+                    self.caster.remote_sources.discard(streampoint)
+                    self.caster.update_sourcetable(streampoint)
+                    await self.caster._cleanup(del_client_queues=True, streampoint=streampoint)
+                elif kind == FRAME_CLAIMED:
+                    streampoint = payload[1:].decode()
+                    granted = payload[:1] == b'1'
+                    futures = self.pending_claims.get(streampoint)
+                    future = futures.popleft() if futures else None
+                    if futures is not None and not futures:
+                        del self.pending_claims[streampoint]
+                    if future is not None and not future.done():
+                        future.set_result(granted)
+                    elif granted:
+                        self.release(streampoint)  # Claim timed out, streampoint is not served by this worker
+                elif kind == FRAME_CONFIG:
+                    await self.caster.apply_config(json.loads(payload))
+                elif kind == FRAME_CONFIG_DELTA:
+                    config = {**self.caster.config_copy(), 'replays': self.caster.replays}
+                    await self.caster.apply_config(apply_config_delta(config, json.loads(payload)))
+        except (asyncio.IncompleteReadError, ConnectionError, OSError) as e:
+            logger.debug(f"{str(datetime.datetime.now())} Worker {self.worker_id} lost cluster hub: {e}")
+        finally:
+            self.closed.set()
+
+
 proxy = StreamCaster()
 
 
@@ -445,6 +2989,20 @@ def verify_password(
 # Models
 class StreamPointCreate(BaseModel):
     stream_point: str
+    read_size: Optional[int] = None
+    coalesce_window_us: Optional[int] = None
+    client_heartbeat_sec: Optional[float] = None
+    slow_client_policy: Optional[str] = None
+    max_lag_bytes: Optional[int] = None
+    max_lag_sec: Optional[float] = None
+    history_mode: Optional[str] = None
+    history_sec: Optional[float] = None
+    history_bytes: Optional[int] = None
+    record: Optional[bool] = None
+    record_segment_sec: Optional[int] = None
+    record_keep_sec: Optional[int] = None
+    rtcm3_frames: Optional[bool] = None
+    relay: Optional[dict] = None  # {host, port, streampoint, user, password} of upstream caster
 
 
 class StreamPointInfo(BaseModel):
@@ -453,16 +3011,56 @@ class StreamPointInfo(BaseModel):
     server_connected: bool
 
 
+class ReplayCreate(BaseModel):
+    name: str  # virtual streampoint for clients
+    stream_point: str  # recorded streampoint
+    start: AwareDatetime  # with timezone offset, e.g. 2024-01-01T10:00:00Z, naive time is ambiguous
+    end: AwareDatetime
+    speed: float = 1
+
+
 class StreamUsers(BaseModel):
     login: str
     password: str
     allowed_streampoints: Optional[list] = []
+    message_types: Optional[list] = None  # e.g. [1005, "msm4"], applied on rtcm3_frames streampoints
+    max_connections: Optional[int] = None  # concurrent clients, None - unlimited
+    max_bytes_per_sec: Optional[int] = None  # bandwidth of each client, None - unlimited
 
 
 class StreamUsersInfo(BaseModel):
     login: str
     password: str
     allowed_streampoints: list
+    message_types: Optional[list] = None
+    max_connections: Optional[int] = None
+    max_bytes_per_sec: Optional[int] = None
+
+
+class StreamUsersUpdate(BaseModel):
+    login: str
+    password: Optional[str] = None  # None - keep current password
+    allowed_streampoints: Optional[list] = None
+    message_types: Optional[list] = None
+    max_connections: Optional[int] = None
+    max_bytes_per_sec: Optional[int] = None
+
+
+class StreamPointsBulk(BaseModel):
+    create: List[StreamPointCreate] = []
+    update: List[StreamPointCreate] = []  # only given fields are changed, null resets field to default
+    delete: List[str] = []
+
+
+class StreamUsersBulk(BaseModel):
+    create: List[StreamUsers] = []
+    update: List[StreamUsersUpdate] = []  # only given fields are changed, null resets field to default
+    delete: List[str] = []
+
+
+class BulkChanges(BaseModel):
+    streampoints: StreamPointsBulk = StreamPointsBulk()
+    users: StreamUsersBulk = StreamUsersBulk()
 
 
 @app.post("/streampoints/", status_code=status.HTTP_201_CREATED)
@@ -475,7 +3073,12 @@ async def create_stream_point(
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid server credentials")
 
     try:
-        await proxy.add_streampoint(stream_data.stream_point)
+        settings = {
+            key: getattr(stream_data, key)
+            for key in DEFAULT_STREAM_SETTINGS
+            if getattr(stream_data, key) is not None
+        }
+        await proxy.add_streampoint(stream_data.stream_point, settings=settings, relay=stream_data.relay)
         content = {
             "message": f"streampoint {stream_data.stream_point} created successfully"
         }
@@ -503,25 +3106,157 @@ async def delete_streampoint(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="streampoint not found")
 
 
+listing_cache: Dict[str, tuple] = {}  # {listing: (config_version, entries)}
+
+
+def cached_listing(
+        name: str,
+        build
+) -> list:
+    """Entries of admin listing, built again only after streampoints or users change"""
+    cached = listing_cache.get(name)
+    if cached is None or cached[0] != proxy.config_version:
+        cached = listing_cache[name] = (proxy.config_version, build())
+    return cached[1]
+
+
+def listing_page(
+        entries: list,
+        offset: int,
+        limit: Optional[int]
+) -> tuple:
+    """Returns (page of entries, headers with total count), all entries if limit is not given"""
+    page = entries[offset:offset + limit] if limit else entries[offset:]
+    return page, {"X-Total-Count": str(len(entries))}
+
+
 @app.get("/streampoints/", response_model=List[StreamPointInfo], status_code=status.HTTP_200_OK)
-async def list_stream_points() -> list:
-    """List all available stream points with connection status"""
-    mp_list = []
-    for sp in proxy.stream_points:
-        client_count = 0
-        if sp in proxy.client_queues:
-            client_count = len(proxy.client_queues[sp])
-        server_connected = False
-        if sp in proxy.server_connections and proxy.server_connections[sp] != {}:
-            server_connected = True
-        mp_list.append(
-            StreamPointInfo(
-                stream_point=sp,
-                client_count=client_count,
-                server_connected=server_connected
-            )
+async def list_stream_points(
+        offset: int = Query(0, ge=0),
+        limit: Optional[int] = Query(None, ge=1, le=LISTING_MAX_LIMIT)
+) -> JSONResponse:
+    """List stream points with connection status, a page of them if limit is given"""
+    streampoints, headers = listing_page(cached_listing('streampoints', lambda: list(proxy.stream_points)), offset, limit)
+    content = [
+        {
+            "stream_point": sp,
+            "client_count": proxy.client_count(sp),
+            "server_connected": proxy.is_active(sp)
+        }
+        for sp in streampoints
+    ]
+    return JSONResponse(content=content, headers=headers)
+
+
+@app.get("/recordings/{streampoint}", status_code=status.HTTP_200_OK)
+async def list_recordings(
+        streampoint: str
+) -> JSONResponse:
+    """List recorded segments of streampoint"""
+    if streampoint not in proxy.stream_points:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="streampoint not found")
+    segments = await asyncio.to_thread(list_segments, RECORD_DIR, streampoint)
+    content = [
+        {
+            "start": datetime.datetime.fromtimestamp(start, tz=datetime.timezone.utc).isoformat(),
+            "size": os.path.getsize(path)
+        }
+        for start, path in segments
+    ]
+    return JSONResponse(content=content)
+
+
+@app.post("/replays/", status_code=status.HTTP_201_CREATED)
+async def create_replay(
+        replay_data: ReplayCreate,
+        credentials: HTTPBasicCredentials = Depends(security)
+) -> JSONResponse:
+    """Serve recorded time range of streampoint as virtual streampoint"""
+    if not verify_password(credentials, SERVER_PASSWORD):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid server credentials")
+
+    try:
+        await proxy.add_replay(
+            name=replay_data.name,
+            streampoint=replay_data.stream_point,
+            start=replay_data.start.timestamp(),
+            end=replay_data.end.timestamp(),
+            speed=replay_data.speed
         )
-    return mp_list
+        content = {
+            "message": f"Replay {replay_data.name} of {replay_data.stream_point} started"
+        }
+        return JSONResponse(content=content)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@app.get("/replays/", status_code=status.HTTP_200_OK)
+async def list_replays() -> JSONResponse:
+    return JSONResponse(content=proxy.replays)
+
+
+@app.delete("/replays/{name}", status_code=status.HTTP_200_OK)
+async def delete_replay(
+        name: str,
+        credentials: HTTPBasicCredentials = Depends(security)
+) -> JSONResponse:
+    if not verify_password(credentials, SERVER_PASSWORD):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid server credentials")
+
+    try:
+        await proxy.remove_replay(name)
+        content = {
+            "delete": "success",
+            "replay": name
+        }
+        return JSONResponse(content=content)
+    except KeyError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Replay not found")
+
+
+@app.get("/debug/profile", status_code=status.HTTP_200_OK)
+async def get_profile(
+        limit: int = Query(20, ge=1, le=PROFILE_KEEP),
+        reset: bool = False,
+        credentials: HTTPBasicCredentials = Depends(security)
+) -> JSONResponse:
+    """
+    Event loop lag and the worst recent slow callbacks and lock holds with the coroutines responsible,
+    worker processes included. reset=true clears collected data of this process
+    """
+    if not verify_password(credentials, SERVER_PASSWORD):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid server credentials")
+
+    content = {
+        "enabled": PROFILE_ENABLED,
+        "main": profiler.report(limit),
+        "workers": {
+            worker_id: {key: value[:limit] if isinstance(value, list) else value for key, value in report.items()}
+            for worker_id, report in (proxy.cluster_hub.worker_profiles.items() if proxy.cluster_hub else ())
+        },
+    }
+    if reset:
+        profiler.reset()
+    return JSONResponse(content=content)
+
+
+@app.get("/metrics", response_class=PlainTextResponse, status_code=status.HTTP_200_OK)
+async def get_metrics() -> PlainTextResponse:
+    """Runtime metrics in Prometheus text format, worker processes included"""
+    snapshots = list(proxy.cluster_hub.worker_metrics.values()) if proxy.cluster_hub else []
+    gauges = {
+        'streamcaster_clients': (
+            'Connected clients', {sp: proxy.client_count(sp) for sp in proxy.stream_points}
+        ),
+        'streamcaster_source_connected': (
+            'Server of streampoint is connected', {sp: int(proxy.is_active(sp)) for sp in proxy.stream_points}
+        ),
+    }
+    return PlainTextResponse(
+        content=metrics.render(snapshots=snapshots, gauges=gauges),
+        media_type="text/plain; version=0.0.4"
+    )
 
 
 @app.post("/users/", status_code=status.HTTP_201_CREATED)
@@ -537,7 +3272,10 @@ async def create_stream_user(
         await proxy.add_stream_user(
             username=user_data.login,
             password=user_data.password,
-            allowed_streampoints=user_data.allowed_streampoints
+            allowed_streampoints=user_data.allowed_streampoints,
+            message_types=user_data.message_types,
+            max_connections=user_data.max_connections,
+            max_bytes_per_sec=user_data.max_bytes_per_sec
         )
         content = {
             "message": f"User {user_data.login} created successfully"
@@ -548,16 +3286,24 @@ async def create_stream_user(
 
 
 @app.get("/users/", response_model=List[StreamUsersInfo], status_code=status.HTTP_200_OK)
-async def list_stream_points() -> list:
-    """List all users"""
-    return [
-        StreamUsersInfo(
-            login=user,
-            password=data['password'],
-            allowed_streampoints=data['allowed_streampoints']
-        )
-        for user, data in proxy.stream_users.items()
-    ]
+async def list_stream_points(
+        offset: int = Query(0, ge=0),
+        limit: Optional[int] = Query(None, ge=1, le=LISTING_MAX_LIMIT)
+) -> JSONResponse:
+    """List users, a page of them if limit is given"""
+    def build() -> list:
+        return [
+            {
+                "login": user,
+                "password": data['password'],
+                "allowed_streampoints": data['allowed_streampoints'],
+                **{key: data.get(key) for key in USER_OPTIONS}
+            }
+            for user, data in proxy.stream_users.items()
+        ]
+
+    users, headers = listing_page(cached_listing('users', build), offset, limit)
+    return JSONResponse(content=users, headers=headers)
 
 
 @app.delete("/users/{username}", status_code=status.HTTP_200_OK)
@@ -580,24 +3326,267 @@ async def delete_streampoint(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
 
-async def run_proxy():
-    asyncio.create_task(proxy.handle_broadcast())
+@app.post("/bulk/", status_code=status.HTTP_200_OK)
+async def bulk_changes(
+        changes: BulkChanges,
+        credentials: HTTPBasicCredentials = Depends(security)
+) -> JSONResponse:
+    """
+    Create, update and delete many streampoints and users at once (only authorized servers can do this).
+    All changes are applied in one transaction and saved with one write, nothing is changed if any of them fails
+    """
+    if not verify_password(credentials, SERVER_PASSWORD):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid server credentials")
+
+    try:
+        summary = await proxy.apply_batch(
+            streampoints=changes.streampoints.model_dump(exclude_unset=True),
+            users=changes.users.model_dump(exclude_unset=True)
+        )
+        return JSONResponse(content=summary)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@app.post("/config/reload", status_code=status.HTTP_200_OK)
+async def reload_config_file(
+        credentials: HTTPBasicCredentials = Depends(security)
+) -> JSONResponse:
+    """Apply changes of config file made outside of REST API, connections not affected by them are kept"""
+    if not verify_password(credentials, SERVER_PASSWORD):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid server credentials")
+
+    try:
+        changes = await proxy.reload_config()
+        return JSONResponse(content=changes)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+async def reload_on_signal() -> None:
+    """SIGHUP handler"""
+    try:
+        await proxy.reload_config()
+    except ValueError as e:
+        logger.error(f"{str(datetime.datetime.now())} Config reload failed: {e}")
+
+
+web_tokens: Dict[str, tuple] = {}  # {token: (Basic authorization data, streampoint, expiry monotonic time)}
+
+
+def issue_web_token(
+        auth_data: str,
+        streampoint: str
+) -> str:
+    """One-time token for web client of streampoint, valid for WEB_TOKEN_TTL"""
+    now = time.monotonic()
+    for token in [token for token, (_, _, expiry) in web_tokens.items() if expiry < now]:
+        del web_tokens[token]
+    token = secrets.token_urlsafe(32)
+    web_tokens[token] = (auth_data, streampoint, now + WEB_TOKEN_TTL)
+    return token
+
+
+def web_auth_data(
+        authorization: Optional[str],
+        token: Optional[str],
+        streampoint: str
+) -> Optional[str]:
+    """
+    Basic authorization data of web client from Authorization header or from token of POST /web_tokens/<streampoint>.
+    Browsers can't set headers of WebSocket and EventSource requests, so they pass the token, never the password,
+    in Sec-WebSocket-Protocol or in token query parameter. Raises ValueError if token is invalid or expired
+    """
+    if authorization:
+        parts = authorization.split()
+        if len(parts) == 2 and parts[0].lower() == 'basic':
+            return parts[1]
+    if token is None:
+        return None
+    auth_data, token_streampoint, expiry = web_tokens.pop(token, (None, None, 0))
+    if token_streampoint != streampoint or expiry < time.monotonic():
+        raise ValueError("invalid or expired token")
+    return auth_data
+
+
+@app.post("/web_tokens/{streampoint}", status_code=status.HTTP_200_OK)
+async def create_web_token(
+        streampoint: str,
+        credentials: HTTPBasicCredentials = Depends(security)
+) -> JSONResponse:
+    """One-time token for WebSocket or SSE connection of user to streampoint, valid for WEB_TOKEN_TTL seconds"""
+    auth_data = base64.b64encode(f"{credentials.username}:{credentials.password}".encode()).decode()
+    login, error = await proxy.authenticate(auth_data)
+    if error:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=error)
+    allowed_streampoints = proxy.auth_index[login][1]
+    if allowed_streampoints is not None and streampoint not in allowed_streampoints:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="streampoint not allowed for user")
+    return JSONResponse(content={"token": issue_web_token(auth_data, streampoint), "expires_in": WEB_TOKEN_TTL})
+
+
+@app.websocket("/ws/{streampoint}")
+async def stream_websocket(
+        websocket: WebSocket,
+        streampoint: str,
+        types: Optional[str] = None
+) -> None:
+    """
+    Stream data of streampoint as binary WebSocket messages.
+    Browser passes token of POST /web_tokens/<streampoint> as subprotocol 'token.<token>'
+    """
+    protocol = next((p for p in websocket.scope.get('subprotocols', ()) if p.startswith('token.')), None)
+    await websocket.accept(subprotocol=protocol)
+    try:
+        login, user_data, message_types = await proxy.admit_client(
+            streampoint=streampoint,
+            auth_data=web_auth_data(
+                websocket.headers.get('authorization'),
+                protocol[len('token.'):] if protocol else None,
+                streampoint
+            ),
+            message_types=types
+        )
+    except ValueError as e:
+        await websocket.close(code=1008, reason=str(e))
+        return
+    writer = WebClientWriter()
+    client = proxy.get_fanout(streampoint).add_client(
+        writer=writer,
+        username=login,
+        message_types=message_types,
+        rate=user_data.get('max_bytes_per_sec') or 0
+    )
+
+    async def wait_disconnect() -> None:
+        while (await websocket.receive())['type'] != 'websocket.disconnect':
+            pass
+        writer.close()
+
+    receiver = asyncio.create_task(wait_disconnect())
+    try:
+        async for data in writer:
+            await websocket.send_bytes(data)
+        if not receiver.done():
+            await websocket.close()  # Client was disconnected by caster
+    except Exception as e:
+        logger.debug(f"{str(datetime.datetime.now())} WebSocket client {streampoint}:{client.client_id} error: {e}")
+    finally:
+        receiver.cancel()
+        await proxy._client_error(streampoint, client.client_id)
+
+
+@app.get("/sse/{streampoint}")
+async def stream_sse(
+        streampoint: str,
+        request: Request,
+        types: Optional[str] = None,
+        token: Optional[str] = None
+) -> StreamingResponse:
+    """
+    Stream data of streampoint as server-sent events, data of each event is base64 encoded.
+    Browser passes token of POST /web_tokens/<streampoint> in token parameter
+    """
+    try:
+        login, user_data, message_types = await proxy.admit_client(
+            streampoint=streampoint,
+            auth_data=web_auth_data(request.headers.get('authorization'), token, streampoint),
+            message_types=types
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
+    writer = WebClientWriter()
+    client = proxy.get_fanout(streampoint).add_client(
+        writer=writer,
+        username=login,
+        message_types=message_types,
+        rate=user_data.get('max_bytes_per_sec') or 0
+    )
+
+    async def events():
+        try:
+            async for data in writer:
+                yield f"data: {base64.b64encode(data).decode()}\n\n"
+        finally:
+            await proxy._client_error(streampoint, client.client_id)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-store"})
+
+
+async def run_proxy(
+        reuse_port: bool = False
+):
+    proxy.sync_relays()
     server = await asyncio.start_server(
         proxy.handle_connection,
         '0.0.0.0',
-        2101
+        NTRIP_PORT,
+        reuse_port=reuse_port
     )
     async with server:
         await server.serve_forever()
 
 
+async def run_worker_proxy(
+        worker_id: int,
+        path: str
+) -> None:
+    """NTRIP server of one worker process, all workers share NTRIP_PORT through SO_REUSEPORT"""
+    proxy.cluster = ClusterLink(caster=proxy, worker_id=worker_id, path=path)
+    await proxy.cluster.connect()
+    if PROFILE_ENABLED:
+        profiler.start()
+    server_task = asyncio.create_task(run_proxy(reuse_port=True))
+    await proxy.cluster.closed.wait()
+    server_task.cancel()
+
+
+def run_worker(
+        worker_id: int,
+        path: str
+) -> None:
+    """Entry point of worker process"""
+    run = uvloop.run if uvloop else asyncio.run
+    run(run_worker_proxy(worker_id=worker_id, path=path))
+
+
+worker_processes: List[multiprocessing.Process] = []
+
+
+async def run_cluster(
+        workers: int = WORKERS
+) -> None:
+    """Start cluster hub in this process and NTRIP workers in separate processes"""
+    proxy.cluster_hub = ClusterHub(caster=proxy)
+    await proxy.cluster_hub.start()
+    context = multiprocessing.get_context('spawn')
+    for worker_id in range(workers):
+        process = context.Process(target=run_worker, args=(worker_id, proxy.cluster_hub.path), daemon=True)
+        process.start()
+        worker_processes.append(process)
+    logger.info(f"{str(datetime.datetime.now())} Started {workers} NTRIP worker processes")
+
+
 @app.on_event("startup")
 async def startup():
-    asyncio.create_task(run_proxy())
-
+    if PROFILE_ENABLED:
+        profiler.start()
+    if WORKERS > 0:
+        await run_cluster()
+    else:
+        asyncio.create_task(run_proxy())
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, lambda: asyncio.create_task(reload_on_signal()))
+    except (AttributeError, NotImplementedError, RuntimeError):
+        pass  # No SIGHUP on Windows or not in main thread, use POST /config/reload
 
-if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
 
+@app.on_event("shutdown")
+async def shutdown():
+    await proxy.config_store.flush()
+    for process in worker_processes:
+        process.terminate()
 
 
+if __name__ == "__main__":
+    uvicorn.run(app, host="0.0.0.0", port=8000)
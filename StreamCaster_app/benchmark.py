@@ -0,0 +1,234 @@
+"""
+Load generator for StreamCaster.
+N servers send timestamped messages, M clients per streampoint receive them and measure
+end-to-end latency, throughput and loss. Results are saved to json file and can be compared with previous run.
+
+    python3 benchmark.py --streampoints point1 point2 --clients 200 --rate 10 --size 200 --duration 30
+    python3 benchmark.py --streampoints point1 --clients 1000 --compare results_old.json
+"""
+import argparse
+import asyncio
+import base64
+import datetime
+import json
+import os
+import time
+from dataclasses import (
+    asdict,
+    dataclass,
+    field,
+)
+
+MESSAGE_PREFIX = b'BENCH,'
+
+parser = argparse.ArgumentParser(description='Load generator and benchmark for StreamCaster')
+parser.add_argument('--host', default='127.0.0.1')
+parser.add_argument('--port', type=int, default=2101)
+parser.add_argument('--server-password', default='server_password')
+parser.add_argument('--streampoints', nargs='+', default=['point1'], help='one server is started for each streampoint')
+parser.add_argument('--clients', type=int, default=10, help='clients per streampoint')
+parser.add_argument('--user', default='user1')
+parser.add_argument('--password', default='password1')
+parser.add_argument('--rate', type=float, default=10, help='messages per second for each server')
+parser.add_argument('--size', type=int, default=100, help='message size in bytes')
+parser.add_argument('--duration', type=float, default=10, help='seconds of sending')
+parser.add_argument('--connect-rate', type=float, default=500, help='client connections per second')
+parser.add_argument('--pid', type=int, help='StreamCaster process id to measure memory growth')
+parser.add_argument('--output', default=f"benchmark_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+parser.add_argument('--compare', help='json file of previous run')
+
+
+@dataclass
+class Results:
+    params: dict
+    started: str = ''
+    sent: int = 0
+    expected: int = 0
+    received: int = 0
+    loss_percent: float = 0
+    connected_clients: int = 0
+    failed_clients: int = 0
+    latency_ms: dict = field(default_factory=dict)
+    msgs_per_sec: float = 0
+    bytes_per_sec: float = 0
+    rss_start_kb: int = 0
+    rss_end_kb: int = 0
+    rss_growth_kb: int = 0
+
+
+def percentile(
+        values: list,
+        p: float
+) -> float:
+    if not values:
+        return 0
+    index = min(len(values) - 1, round(p / 100 * (len(values) - 1)))
+    return values[index]
+
+
+def rss_kb(
+        pid: int
+) -> int:
+    """Resident memory of process from /proc, 0 if not available"""
+    if not pid:
+        return 0
+    try:
+        with open(f'/proc/{pid}/status') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+class Benchmark:
+    def __init__(
+            self,
+            args: argparse.Namespace
+    ):
+        self.args = args
+        self.results = Results(params={k: v for k, v in vars(args).items() if k not in ('output', 'compare')})
+        self.latencies: list = []
+        self.received_bytes = 0
+        self.stop = asyncio.Event()
+
+    def _message(
+            self,
+            seq: int
+    ) -> bytes:
+        header = MESSAGE_PREFIX + f"{seq},{time.time_ns()},".encode()
+        return header + b'x' * max(0, self.args.size - len(header) - 1) + b'\n'
+
+    async def source(
+            self,
+            streampoint: str,
+            connected: asyncio.Event
+    ) -> None:
+        reader, writer = await asyncio.open_connection(self.args.host, self.args.port)
+        writer.write(f'SOURCE {self.args.server_password} /{streampoint}\r\n\r\n'.encode())
+        await writer.drain()
+        response = await reader.read(1024)
+        if b'200' not in response:
+            raise ConnectionError(f"server for {streampoint} refused: {response}")
+        connected.set()
+        await self.stop.wait()
+
+        interval = 1 / self.args.rate
+        seq = 0
+        finish = time.monotonic() + self.args.duration
+        next_send = time.monotonic()
+        while time.monotonic() < finish:
+            writer.write(self._message(seq))
+            await writer.drain()
+            seq += 1
+            next_send += interval
+            await asyncio.sleep(max(0, next_send - time.monotonic()))
+        self.results.sent += seq
+        self.results.expected += seq * self.args.clients
+        writer.close()
+
+    async def client(
+            self,
+            streampoint: str
+    ) -> None:
+        try:
+            reader, writer = await asyncio.open_connection(self.args.host, self.args.port)
+            auth_data = base64.b64encode(f'{self.args.user}:{self.args.password}'.encode()).decode()
+            writer.write(f'GET /{streampoint} HTTP/1.1\r\nAuthorization: Basic {auth_data}\r\n\r\n'.encode())
+            await writer.drain()
+            response = await asyncio.wait_for(reader.readline(), timeout=10)
+            if b'200' not in response:
+                raise ConnectionError(response)
+        except (OSError, asyncio.TimeoutError, ConnectionError):
+            self.results.failed_clients += 1
+            return
+        self.results.connected_clients += 1
+
+        while True:
+            try:
+                line = await asyncio.wait_for(reader.readline(), timeout=self.args.duration + 5)
+            except asyncio.TimeoutError:
+                break
+            if not line:
+                break
+            received_ns = time.time_ns()
+            start = line.find(MESSAGE_PREFIX)
+            if start < 0:
+                continue
+            fields = line[start:].split(b',', 3)
+            self.latencies.append((received_ns - int(fields[2])) / 1_000_000)
+            self.received_bytes += len(line) - start
+        writer.close()
+
+    async def run(self) -> Results:
+        self.results.started = str(datetime.datetime.now())
+        self.results.rss_start_kb = rss_kb(self.args.pid)
+
+        connected = [asyncio.Event() for _ in self.args.streampoints]
+        sources = [
+            asyncio.create_task(self.source(streampoint, event))
+            for streampoint, event in zip(self.args.streampoints, connected)
+        ]
+        for event in connected:
+            await event.wait()
+
+        clients = []
+        for streampoint in self.args.streampoints:
+            for _ in range(self.args.clients):
+                clients.append(asyncio.create_task(self.client(streampoint)))
+                await asyncio.sleep(1 / self.args.connect_rate)
+        await asyncio.sleep(1)  # Let last clients finish handshake
+
+        started = time.monotonic()
+        self.stop.set()
+        await asyncio.gather(*sources)
+        elapsed = time.monotonic() - started
+        await asyncio.gather(*clients)
+
+        latencies = sorted(self.latencies)
+        self.results.received = len(latencies)
+        if self.results.expected:
+            self.results.loss_percent = round(100 * (1 - self.results.received / self.results.expected), 3)
+        self.results.latency_ms = {
+            'p50': round(percentile(latencies, 50), 3),
+            'p90': round(percentile(latencies, 90), 3),
+            'p99': round(percentile(latencies, 99), 3),
+            'max': round(latencies[-1], 3) if latencies else 0,
+        }
+        self.results.msgs_per_sec = round(self.results.received / elapsed, 1)
+        self.results.bytes_per_sec = round(self.received_bytes / elapsed, 1)
+        self.results.rss_end_kb = rss_kb(self.args.pid)
+        self.results.rss_growth_kb = self.results.rss_end_kb - self.results.rss_start_kb
+        return self.results
+
+
+def compare(
+        current: dict,
+        previous: dict
+) -> None:
+    """Print difference of main numbers with previous run"""
+    rows = [
+        ('latency p50, ms', current['latency_ms']['p50'], previous['latency_ms']['p50']),
+        ('latency p99, ms', current['latency_ms']['p99'], previous['latency_ms']['p99']),
+        ('messages/s', current['msgs_per_sec'], previous['msgs_per_sec']),
+        ('bytes/s', current['bytes_per_sec'], previous['bytes_per_sec']),
+        ('loss, %', current['loss_percent'], previous['loss_percent']),
+        ('rss growth, kB', current['rss_growth_kb'], previous['rss_growth_kb']),
+    ]
+    print(f"{'':20}{'current':>15}{'previous':>15}{'change, %':>12}")
+    for name, now, before in rows:
+        change = f"{100 * (now - before) / before:+.1f}" if before else '-'
+        print(f"{name:20}{now:>15}{before:>15}{change:>12}")
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    results = asdict(asyncio.run(Benchmark(args).run()))
+    print(json.dumps(results, indent=4))
+    with open(args.output, 'w') as output:
+        json.dump(results, output, indent=4)
+    print(f"Results saved to {os.path.abspath(args.output)}")
+    if args.compare:
+        with open(args.compare) as previous:
+            compare(results, json.load(previous))
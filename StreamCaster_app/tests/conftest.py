@@ -0,0 +1,13 @@
+import os
+import shutil
+import sys
+import tempfile
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# StreamCaster_app reads config and opens report.log at import, tests run on a copy in temporary directory
+os.chdir(tempfile.mkdtemp(prefix='streamcaster_tests_'))
+shutil.copy(os.path.join(APP_DIR, 'app_settings.json'), 'app_settings.json')
+os.environ['STREAMCASTER_CONFIG'] = os.path.abspath('app_settings.json')
+os.environ['STREAMCASTER_RECORD_DIR'] = os.path.abspath('recordings')
+sys.path.insert(0, APP_DIR)
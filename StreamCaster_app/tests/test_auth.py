@@ -0,0 +1,122 @@
+import asyncio
+import base64
+import json
+
+import StreamCaster_app
+from StreamCaster_app import (
+    StreamCaster,
+    hash_password,
+)
+
+PASSWORD_HASH = hash_password('secret')
+CONFIG = {
+    'streampoints': ['point1', 'point2'],
+    'users': {
+        'hashed': {'password': PASSWORD_HASH, 'allowed_streampoints': []},
+        'plain': {'password': 'p1', 'allowed_streampoints': ['point1']},
+    },
+}
+
+
+def auth_data(
+        user: str,
+        password: str
+) -> str:
+    return base64.b64encode(f'{user}:{password}'.encode()).decode()
+
+
+def count_checks(monkeypatch) -> list:
+    """Returns list growing with each password check"""
+    calls = []
+    check_password = StreamCaster_app.check_password
+    monkeypatch.setattr(
+        StreamCaster_app, 'check_password', lambda *args: calls.append(args) or check_password(*args)
+    )
+    return calls
+
+
+async def caster_with_config(
+        path,
+        config: dict
+) -> StreamCaster:
+    caster = StreamCaster()
+    caster.config_store.file = str(path)
+    path.write_text(json.dumps(config))
+    await caster.reload_config()
+    return caster
+
+
+def test_index_follows_users_and_streampoints(tmp_path):
+    async def run() -> None:
+        caster = await caster_with_config(tmp_path / 'config.json', CONFIG)
+        assert caster.auth_index == {
+            'hashed': (PASSWORD_HASH, None),
+            'plain': ('p1', frozenset({'point1'})),
+        }
+        await caster.add_stream_user('new', 'p2', ['point2'])
+        password, allowed_streampoints = caster.auth_index['new']
+        assert password.startswith('pbkdf2_sha256$') and allowed_streampoints == frozenset({'point2'})
+        await caster.remove_stream_user('plain')
+        assert set(caster.auth_index) == {'hashed', 'new'}
+
+        await caster.add_streampoint('point3')
+        assert caster.streampoint_index == {'point1', 'point2', 'point3'}
+        await caster.remove_streampoint('point1')
+        assert caster.streampoint_index == {'point2', 'point3'}
+
+    asyncio.run(run())
+
+
+def test_verified_credentials_are_cached(tmp_path, monkeypatch):
+    calls = count_checks(monkeypatch)
+
+    async def run() -> None:
+        caster = await caster_with_config(tmp_path / 'config.json', CONFIG)
+        assert await caster.authenticate(auth_data('hashed', 'secret')) == ('hashed', None)
+        assert await caster.authenticate(auth_data('hashed', 'secret')) == ('hashed', None)
+        assert len(calls) == 1
+        for _ in range(2):
+            assert await caster.authenticate(auth_data('hashed', 'wrong')) == ('hashed', "User authorization failed")
+        assert len(calls) == 3  # Wrong password is checked each time
+        assert await caster.authenticate(auth_data('unknown', 'secret')) == ('unknown', "User not found")
+
+    asyncio.run(run())
+
+
+def test_concurrent_checks_of_same_credentials_run_once(tmp_path, monkeypatch):
+    calls = count_checks(monkeypatch)
+
+    async def run() -> StreamCaster:
+        caster = await caster_with_config(tmp_path / 'config.json', CONFIG)
+        results = await asyncio.gather(*(caster.authenticate(auth_data('hashed', 'secret')) for _ in range(10)))
+        assert results == [('hashed', None)] * 10
+        results = await asyncio.gather(*(caster.authenticate(auth_data('hashed', 'wrong')) for _ in range(10)))
+        assert results == [('hashed', "User authorization failed")] * 10
+        return caster
+
+    caster = asyncio.run(run())
+    assert len(calls) == 2
+    assert caster.auth_pending == {}
+
+
+def test_cached_credentials_are_invalidated_by_user_changes(tmp_path):
+    async def run() -> None:
+        path = tmp_path / 'config.json'
+        caster = await caster_with_config(path, CONFIG)
+        assert await caster.authenticate(auth_data('hashed', 'secret')) == ('hashed', None)
+        assert await caster.authenticate(auth_data('plain', 'p1')) == ('plain', None)
+
+        changed = json.loads(json.dumps(CONFIG))
+        changed['users']['hashed']['password'] = hash_password('changed')
+        changed['users']['plain']['allowed_streampoints'] = ['point2']
+        path.write_text(json.dumps(changed))
+        await caster.reload_config()
+        assert await caster.authenticate(auth_data('hashed', 'secret')) == ('hashed', "User authorization failed")
+        assert await caster.authenticate(auth_data('hashed', 'changed')) == ('hashed', None)
+        assert await caster.authenticate(auth_data('plain', 'p1')) == ('plain', None)
+        assert caster.auth_index['plain'][1] == frozenset({'point2'})
+
+        await caster.remove_stream_user('plain')
+        assert await caster.authenticate(auth_data('plain', 'p1')) == ('plain', "User not found")
+
+    asyncio.run(run())
@@ -0,0 +1,61 @@
+import asyncio
+import json
+
+from StreamCaster_app import (
+    SERVER_PASSWORD,
+    StreamCaster,
+)
+from benchmark import (
+    Benchmark,
+    compare,
+    parser,
+    percentile,
+)
+
+
+def test_benchmark_against_caster(tmp_path):
+    async def run() -> dict:
+        caster = StreamCaster()
+        server = await asyncio.start_server(caster.handle_connection, '127.0.0.1', 0)
+        args = parser.parse_args([
+            '--port', str(server.sockets[0].getsockname()[1]),
+            '--server-password', SERVER_PASSWORD,
+            '--streampoints', 'point1', 'point2',
+            '--clients', '3',
+            '--rate', '50',
+            '--duration', '0.5',
+            '--output', str(tmp_path / 'results.json'),
+        ])
+        results = await asyncio.wait_for(Benchmark(args).run(), timeout=30)
+        server.close()
+        return results
+
+    results = asyncio.run(run())
+    assert results.connected_clients == 6 and results.failed_clients == 0
+    assert results.sent > 0 and results.expected == results.sent * 3
+    assert results.received == results.expected and results.loss_percent == 0
+    assert 0 < results.latency_ms['p50'] <= results.latency_ms['p99'] <= results.latency_ms['max']
+    assert results.msgs_per_sec > 0 and results.bytes_per_sec > 0
+    assert results.params['clients'] == 3 and 'output' not in results.params
+
+
+def test_percentile():
+    values = list(range(101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([], 50) == 0
+
+
+def test_compare_with_previous_run(capsys):
+    current = {
+        'latency_ms': {'p50': 2, 'p99': 10}, 'msgs_per_sec': 150, 'bytes_per_sec': 15000,
+        'loss_percent': 0, 'rss_growth_kb': 0,
+    }
+    previous = json.loads(json.dumps(current))
+    previous['latency_ms']['p50'] = 4
+    previous['msgs_per_sec'] = 100
+    compare(current, previous)
+    rows = {line[:20].strip(): line[20:].split() for line in capsys.readouterr().out.splitlines()[1:]}
+    assert rows['latency p50, ms'] == ['2', '4', '-50.0']
+    assert rows['messages/s'] == ['150', '100', '+50.0']
+    assert rows['loss, %'] == ['0', '0', '-']
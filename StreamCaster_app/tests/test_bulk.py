@@ -0,0 +1,98 @@
+from starlette.testclient import TestClient
+
+from StreamCaster_app import (
+    LISTING_MAX_LIMIT,
+    SERVER_PASSWORD,
+    app,
+    listing_cache,
+    proxy,
+)
+
+ADMIN = ('admin', SERVER_PASSWORD)
+
+
+def count_writes(monkeypatch) -> list:
+    """Returns list of configs written to the file"""
+    writes = []
+    write = proxy.config_store._write
+    monkeypatch.setattr(proxy.config_store, '_write', lambda config: writes.append(config) or write(config))
+    return writes
+
+
+def test_bulk_changes_are_saved_with_one_write(monkeypatch):
+    writes = count_writes(monkeypatch)
+    client = TestClient(app)
+    response = client.post('/bulk/', auth=ADMIN, json={
+        'streampoints': {'create': [{'stream_point': 'bulk1', 'read_size': 1024}, {'stream_point': 'bulk2'}]},
+        'users': {'create': [
+            {'login': f'bulk_user{i}', 'password': f'secret{i}', 'allowed_streampoints': ['bulk1']} for i in range(3)
+        ]},
+    })
+    assert response.status_code == 200
+    assert response.json()['streampoints_added'] == ['bulk1', 'bulk2']
+    assert response.json()['users_added'] == ['bulk_user0', 'bulk_user1', 'bulk_user2']
+    assert len(writes) == 1
+    assert proxy.get_stream_settings('bulk1')['read_size'] == 1024
+    assert proxy.auth_index['bulk_user1'][1] == frozenset({'bulk1'})
+    password_hash = proxy.stream_users['bulk_user1']['password']
+    assert password_hash.startswith('pbkdf2_sha256$')
+
+    response = client.post('/bulk/', auth=ADMIN, json={
+        'streampoints': {'update': [{'stream_point': 'bulk1', 'read_size': None}]},
+        'users': {'update': [{'login': 'bulk_user1', 'allowed_streampoints': ['bulk2']}]},
+    })
+    assert response.status_code == 200
+    assert len(writes) == 2
+    assert proxy.get_stream_settings('bulk1')['read_size'] != 1024
+    assert proxy.stream_users['bulk_user1']['password'] == password_hash  # No password - hash is kept
+    assert proxy.stream_users['bulk_user1']['allowed_streampoints'] == ['bulk2']
+
+    response = client.post('/bulk/', auth=ADMIN, json={
+        'streampoints': {'delete': ['bulk1', 'bulk2']},
+        'users': {'delete': ['bulk_user0', 'bulk_user1', 'bulk_user2']},
+    })
+    assert response.status_code == 200
+    assert len(writes) == 3
+    assert not {'bulk1', 'bulk2'} & set(proxy.stream_points)
+    assert not any(user.startswith('bulk_user') for user in proxy.stream_users)
+
+
+def test_invalid_bulk_changes_nothing(monkeypatch):
+    writes = count_writes(monkeypatch)
+    client = TestClient(app)
+    streampoints, users = list(proxy.stream_points), dict(proxy.stream_users)
+    response = client.post('/bulk/', auth=ADMIN, json={
+        'streampoints': {'create': [{'stream_point': 'bulk3'}]},
+        'users': {'create': [{'login': 'bulk_user3', 'password': 'secret'}], 'delete': ['not_existing']},
+    })
+    assert response.status_code == 400
+    assert response.json()['detail'] == 'User not_existing not found'
+    assert (proxy.stream_points, proxy.stream_users, writes) == (streampoints, users, [])
+    assert client.post('/bulk/', auth=('admin', 'wrong'), json={}).status_code == 401
+
+
+def test_listing_pages_and_cache():
+    client = TestClient(app)
+    response = client.get('/streampoints/')
+    assert [entry['stream_point'] for entry in response.json()] == proxy.stream_points
+    total = len(proxy.stream_points)
+    assert response.headers['X-Total-Count'] == str(total)
+    cached = listing_cache['streampoints']
+
+    response = client.get('/streampoints/', params={'offset': 1, 'limit': 1})
+    assert [entry['stream_point'] for entry in response.json()] == proxy.stream_points[1:2]
+    assert response.headers['X-Total-Count'] == str(total)
+    assert listing_cache['streampoints'] is cached  # Not built again without changes
+
+    response = client.get('/users/', params={'offset': 0, 'limit': 2})
+    assert [entry['login'] for entry in response.json()] == list(proxy.stream_users)[:2]
+    assert response.headers['X-Total-Count'] == str(len(proxy.stream_users))
+
+    assert client.get('/streampoints/', params={'limit': LISTING_MAX_LIMIT + 1}).status_code == 422
+    assert client.get('/users/', params={'offset': -1}).status_code == 422
+
+    assert client.post('/streampoints/', auth=ADMIN, json={'stream_point': 'bulk4'}).status_code == 200
+    response = client.get('/streampoints/')
+    assert response.headers['X-Total-Count'] == str(total + 1)
+    assert listing_cache['streampoints'] is not cached
+    assert client.delete('/streampoints/bulk4', auth=ADMIN).status_code == 200
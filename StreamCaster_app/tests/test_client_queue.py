@@ -0,0 +1,103 @@
+import asyncio
+import time
+
+from StreamCaster_app import (
+    ClientQueue,
+    WebClientWriter,
+)
+
+
+class Transport:
+    def __init__(self):
+        self.data = []
+
+    def get_write_buffer_size(self) -> int:
+        return 0
+
+    def is_closing(self) -> bool:
+        return False
+
+    def write(
+            self,
+            data: bytes
+    ) -> None:
+        self.data.append(data)
+
+
+class Writer(WebClientWriter):
+    """TCP writer with transport accepting everything"""
+    def __init__(self):
+        super().__init__()
+        self.transport = Transport()
+
+
+def queue(**options) -> ClientQueue:
+    return ClientQueue(client_id=1, writer=WebClientWriter(), streampoint='queue', **options)
+
+
+def test_ring_buffer_keeps_latest_chunks():
+    client = queue(buffer_size=4)
+    for i in range(10):
+        assert client.put(bytes([i]) * 10, now=100.0)
+    assert [data[0] for _, data in client.buffer] == [6, 7, 8, 9]
+    assert (client.buffered_bytes, client.dropped_bytes) == (40, 60)
+    assert client.lag(101.5) == (40, 1.5)
+
+
+def test_drop_oldest_policy():
+    client = queue(max_lag_bytes=250, max_lag_sec=5)
+    for i in range(5):
+        assert client.put(b'x' * 100, now=100.0 + i)
+    assert client.buffered_bytes == 200  # Below max_lag_bytes
+    client = queue(max_lag_bytes=10000, max_lag_sec=5)
+    for i in range(10):
+        client.put(b'x' * 100, now=100.0 + i)
+    assert [timestamp for timestamp, _ in client.buffer] == [104.0, 105.0, 106.0, 107.0, 108.0, 109.0]
+    assert not client.closed
+
+
+def test_skip_to_latest_policy():
+    client = queue(policy='skip_to_latest', max_lag_bytes=350)
+    for i in range(3):
+        assert client.put(bytes([i]) * 100, now=100.0)
+    assert len(client.buffer) == 3
+    assert client.put(b'\x03' * 100, now=100.0)
+    assert list(client.buffer) == [(100.0, b'\x03' * 100)]
+    assert client.dropped_bytes == 300
+
+
+def test_disconnect_policy():
+    client = queue(policy='disconnect', max_lag_bytes=250)
+    assert client.put(b'x' * 200, now=100.0)
+    assert not client.put(b'x' * 100, now=100.0)
+    assert client.closed and client.reader_closed()
+
+
+def test_fast_path_respects_token_bucket():
+    client = ClientQueue(client_id=1, writer=Writer(), streampoint='queue', rate=1000)
+    now = time.monotonic()
+    assert client.try_write(b'x' * 600, now)
+    assert not client.try_write(b'x' * 600, now)  # 400 tokens left
+    assert client.try_write(b'x' * 600, now + 0.25)
+    assert not client.try_write(b'x' * 1200, now + 10)  # Burst is limited to one second
+    assert client.writer.transport.data == [b'x' * 600] * 2
+
+
+def test_writer_task_limits_bandwidth():
+    async def run() -> list:
+        client = queue(rate=2000)
+        client.task = asyncio.create_task(client.run())
+        for _ in range(4):
+            client.put(b'x' * 1000, time.monotonic())
+        received = []
+        started = time.monotonic()
+        async for batch in client.writer:
+            received.append((time.monotonic() - started, len(batch)))
+            if sum(size for _, size in received) == 4000:
+                break
+        await client.close()
+        return received
+
+    received = asyncio.run(run())
+    assert received[0][1] == 2000 and received[0][0] < 0.1  # One second burst goes at once
+    assert 0.9 < received[-1][0] < 1.5
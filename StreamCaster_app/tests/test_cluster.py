@@ -0,0 +1,142 @@
+import asyncio
+
+from StreamCaster_app import (
+    CLUSTER_BUFFER_LIMIT,
+    FRAME_CLAIMED,
+    FRAME_RELEASE,
+    ClusterLink,
+    StreamCaster,
+    apply_config_delta,
+    config_delta,
+    metrics,
+    pack_frame,
+    write_data_frame,
+)
+
+OLD_CONFIG = {
+    'streampoints': ['point1', 'point2', 'point3'],
+    'users': {
+        'user1': {'password': 'p1', 'allowed_streampoints': []},
+        'user2': {'password': 'p2', 'allowed_streampoints': []},
+    },
+    'streampoint_settings': {'point1': {'read_size': 1024}},
+    'relays': {},
+    'replays': {},
+}
+NEW_CONFIG = {
+    'streampoints': ['point1', 'point3', 'point4'],
+    'users': {
+        'user1': {'password': 'p1', 'allowed_streampoints': ['point1']},
+        'user3': {'password': 'p3', 'allowed_streampoints': []},
+    },
+    'streampoint_settings': {'point4': {'history_mode': 'raw'}},
+    'relays': {'point4': {'host': 'localhost', 'port': 2102}},
+    'replays': {},
+}
+
+
+class Transport:
+    def __init__(self):
+        self.buffered = 0
+
+    def get_write_buffer_size(self) -> int:
+        return self.buffered
+
+
+class RecordingWriter:
+    def __init__(self):
+        self.data = b''
+        self.transport = Transport()
+
+    def write(
+            self,
+            data: bytes
+    ) -> None:
+        self.data += data
+
+
+def test_config_delta_contains_only_changes():
+    assert config_delta(OLD_CONFIG, OLD_CONFIG) == {}
+    assert config_delta(OLD_CONFIG, NEW_CONFIG) == {
+        'streampoints_added': ['point4'],
+        'streampoints_removed': ['point2'],
+        'users': {
+            'user1': {'password': 'p1', 'allowed_streampoints': ['point1']},
+            'user2': None,
+            'user3': {'password': 'p3', 'allowed_streampoints': []},
+        },
+        'streampoint_settings': {'point1': None, 'point4': {'history_mode': 'raw'}},
+        'relays': {'point4': {'host': 'localhost', 'port': 2102}},
+    }
+
+
+def test_apply_config_delta():
+    delta = config_delta(OLD_CONFIG, NEW_CONFIG)
+    config = apply_config_delta(OLD_CONFIG, delta)
+    assert config == NEW_CONFIG
+    assert apply_config_delta(config, delta) == NEW_CONFIG
+    assert OLD_CONFIG['streampoints'] == ['point1', 'point2', 'point3']
+
+
+def test_data_frame_is_dropped_for_lagging_process():
+    writer = RecordingWriter()
+    assert write_data_frame(writer, 'point1', b'frame1')
+    writer.transport.buffered = CLUSTER_BUFFER_LIMIT + 1
+    dropped = metrics.counters[('streamcaster_cluster_dropped_bytes_total', 'point1')]
+    assert not write_data_frame(writer, 'point1', b'frame2')
+    assert writer.data == b'frame1'
+    assert metrics.counters[('streamcaster_cluster_dropped_bytes_total', 'point1')] == dropped + len(b'frame2')
+
+
+def test_claim_granted_after_timeout_is_released():
+    async def run() -> tuple:
+        loop = asyncio.get_running_loop()
+        link = ClusterLink(caster=StreamCaster(), worker_id=0)
+        link.writer = RecordingWriter()
+        timed_out = loop.create_future()
+        timed_out.cancel()
+        waiting = loop.create_future()
+        link.pending_claims['point1'].extend([timed_out, waiting])
+        link.reader = asyncio.StreamReader()
+        link.reader.feed_data(pack_frame(FRAME_CLAIMED, b'1point1') + pack_frame(FRAME_CLAIMED, b'0point1'))
+        link.reader.feed_eof()
+        await link._read_loop()
+        return link, waiting
+
+    link, waiting = asyncio.run(run())
+    assert link.writer.data == pack_frame(FRAME_RELEASE, b'point1')
+    assert waiting.result() is False
+    assert not link.pending_claims
+
+
+def test_claim_is_released_if_streampoint_registered_meanwhile():
+    class Link:
+        def __init__(
+                self,
+                caster: StreamCaster
+        ):
+            self.caster = caster
+            self.released = []
+
+        async def claim(
+                self,
+                streampoint: str
+        ) -> bool:
+            # Another connection of this worker registers the streampoint while hub answers
+            self.caster.server_connections[streampoint].update(last_activity=0, writer=RecordingWriter())
+            return True
+
+        def release(
+                self,
+                streampoint: str
+        ) -> None:
+            self.released.append(streampoint)
+
+    async def run() -> tuple:
+        caster = StreamCaster()
+        caster.cluster = Link(caster)
+        return await caster._register_source('point1', writer=None), caster.cluster.released
+
+    fanout, released = asyncio.run(run())
+    assert fanout is None
+    assert released == ['point1']
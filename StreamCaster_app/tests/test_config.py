@@ -0,0 +1,88 @@
+import asyncio
+import json
+
+from StreamCaster_app import (
+    StreamCaster,
+    WebClientWriter,
+)
+
+CONFIG = {
+    'streampoints': ['point1', 'point2', 'point3'],
+    'users': {
+        'kept': {'password': 'p1', 'allowed_streampoints': []},
+        'new_password': {'password': 'p2', 'allowed_streampoints': []},
+        'removed': {'password': 'p3', 'allowed_streampoints': []},
+        'restricted': {'password': 'p4', 'allowed_streampoints': []},
+        'limited': {'password': 'p5', 'allowed_streampoints': []},
+    },
+}
+RELOADED_CONFIG = {
+    'streampoints': ['point1', 'point2', 'point4'],
+    'users': {
+        'kept': {'password': 'p1', 'allowed_streampoints': []},
+        'new_password': {'password': 'changed', 'allowed_streampoints': []},
+        'restricted': {'password': 'p4', 'allowed_streampoints': ['point2']},
+        'limited': {'password': 'p5', 'allowed_streampoints': [], 'max_bytes_per_sec': 1000},
+    },
+}
+
+
+def write_config(
+        path,
+        config: dict
+) -> None:
+    with open(path, 'w') as config_file:
+        json.dump(config, config_file)
+
+
+def test_reload_keeps_clients_not_affected_by_changes(tmp_path):
+    async def run() -> tuple:
+        caster = StreamCaster()
+        caster.config_store.file = str(tmp_path / 'config.json')
+        write_config(caster.config_store.file, CONFIG)
+        await caster.reload_config()
+        clients = {
+            (username, streampoint): caster.get_fanout(streampoint).add_client(
+                writer=WebClientWriter(),
+                username=username
+            )
+            for username, streampoint in [
+                ('kept', 'point1'), ('kept', 'point3'), ('new_password', 'point1'), ('removed', 'point2'),
+                ('restricted', 'point1'), ('restricted', 'point2'), ('limited', 'point1'),
+            ]
+        }
+        write_config(caster.config_store.file, RELOADED_CONFIG)
+        changes = await caster.reload_config()
+        connected = {key for key, client in clients.items() if client.client_id in caster.client_queues.get(key[1], ())}
+        return caster, changes, connected, clients
+
+    caster, changes, connected, clients = asyncio.run(run())
+    assert changes == {
+        'streampoints_added': ['point4'],
+        'streampoints_removed': ['point3'],
+        'users_added': [],
+        'users_removed': ['removed'],
+        'users_changed': ['limited', 'new_password', 'restricted'],
+        'clients_disconnected': 4,
+    }
+    assert connected == {('kept', 'point1'), ('restricted', 'point2'), ('limited', 'point1')}
+    assert clients[('limited', 'point1')].rate == 1000
+    assert 'point3' not in caster.streampoint_index and 'point4' in caster.streampoint_index
+    assert set(caster.auth_index) == set(RELOADED_CONFIG['users'])
+
+
+def test_reload_waits_for_config_write_in_progress(tmp_path):
+    async def run() -> StreamCaster:
+        caster = StreamCaster()
+        caster.config_store.file = str(tmp_path / 'config.json')
+        write_config(caster.config_store.file, CONFIG)
+        async with caster.config_store.write_lock:  # Save of previous admin change is running
+            reload = asyncio.create_task(caster.reload_config())
+            await asyncio.sleep(0.1)
+            assert not reload.done()
+            write_config(caster.config_store.file, RELOADED_CONFIG)
+        await reload
+        return caster
+
+    caster = asyncio.run(run())
+    assert caster.stream_points == RELOADED_CONFIG['streampoints']
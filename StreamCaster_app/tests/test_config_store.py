@@ -0,0 +1,95 @@
+import asyncio
+import json
+import os
+
+from StreamCaster_app import ConfigStore
+
+
+def read_json(path) -> dict:
+    with open(path) as config_file:
+        return json.load(config_file)
+
+
+def test_changes_within_delay_are_saved_with_one_write(tmp_path, monkeypatch):
+    writes = []
+    config = {'streampoints': []}
+    store = ConfigStore(snapshot=lambda: dict(config), file=str(tmp_path / 'config.json'), delay=0.05)
+    write = store._write
+    monkeypatch.setattr(store, '_write', lambda saved: writes.append(saved) or write(saved))
+
+    async def run() -> None:
+        for streampoint in ['point1', 'point2', 'point3']:
+            config['streampoints'] = config['streampoints'] + [streampoint]
+            store.schedule()
+            await asyncio.sleep(0.01)
+        assert writes == []
+        await asyncio.sleep(0.1)
+
+    asyncio.run(run())
+    assert writes == [{'streampoints': ['point1', 'point2', 'point3']}]
+    assert read_json(store.file) == {'streampoints': ['point1', 'point2', 'point3']}
+
+
+def test_file_is_replaced_atomically(tmp_path, monkeypatch):
+    path = tmp_path / 'config.json'
+    path.write_text(json.dumps({'streampoints': ['old'], 'other_section': {'kept': True}}))
+    store = ConfigStore(snapshot=lambda: {'streampoints': ['new']}, file=str(path), delay=0)
+    replaced = []
+
+    def replace(src, dst) -> None:
+        # New content is complete in temporary file, the old file is untouched until replace
+        assert read_json(src) == {'streampoints': ['new'], 'other_section': {'kept': True}}
+        assert read_json(dst) == {'streampoints': ['old'], 'other_section': {'kept': True}}
+        replaced.append((src, dst))
+        os.rename(src, dst)
+
+    monkeypatch.setattr(os, 'replace', replace)
+    store.dirty = True
+    assert asyncio.run(store.flush())
+    assert replaced == [(f'{path}.tmp', str(path))]
+    assert read_json(path) == {'streampoints': ['new'], 'other_section': {'kept': True}}
+    assert not os.path.exists(f'{path}.tmp')
+
+
+def test_failed_write_is_retried(tmp_path):
+    directory = tmp_path / 'not_created_yet'
+    store = ConfigStore(snapshot=lambda: {'streampoints': ['point1']}, file=str(directory / 'config.json'),
+                        delay=0.02)
+
+    async def run() -> None:
+        store.schedule()
+        await asyncio.sleep(0.1)
+        assert store.dirty and not store.task.done()  # Writes failed, retry is pending
+        directory.mkdir()
+        await asyncio.sleep(0.1)
+
+    asyncio.run(run())
+    assert not store.dirty
+    assert read_json(directory / 'config.json') == {'streampoints': ['point1']}
+
+
+def test_change_during_write_is_saved(tmp_path, monkeypatch):
+    config = {'streampoints': ['point1']}
+    store = ConfigStore(snapshot=lambda: dict(config), file=str(tmp_path / 'config.json'), delay=0.02)
+    write = store._write
+
+    def change() -> None:
+        config['streampoints'] = ['point1', 'point2']
+        store.schedule()
+
+    def write_with_change(saved: dict) -> None:
+        write(saved)
+        if saved['streampoints'] == ['point1']:
+            loop.call_soon_threadsafe(change)  # Admin change while the file is written
+
+    monkeypatch.setattr(store, '_write', write_with_change)
+
+    async def run() -> None:
+        nonlocal loop
+        loop = asyncio.get_running_loop()
+        store.schedule()
+        await asyncio.sleep(0.2)
+
+    loop = None
+    asyncio.run(run())
+    assert read_json(store.file) == {'streampoints': ['point1', 'point2']}
@@ -0,0 +1,112 @@
+import asyncio
+
+from StreamCaster_app import (
+    CLIENT_READ_SIZE,
+    DEFAULT_STREAM_SETTINGS,
+    StreamPointFanout,
+    WebClientWriter,
+    metrics,
+)
+from test_client_queue import Writer
+from test_rtcm3 import frame
+
+
+def test_slow_client_is_disconnected_once():
+    async def run() -> tuple:
+        errors = []
+
+        async def on_client_error(
+                streampoint: str,
+                client_id: int
+        ) -> None:
+            errors.append(client_id)
+
+        settings = {**DEFAULT_STREAM_SETTINGS, 'slow_client_policy': 'disconnect', 'max_lag_bytes': 1000}
+        fanout = StreamPointFanout('slow', settings=settings, on_client_error=on_client_error)
+        client = fanout.add_client(writer=WebClientWriter())  # Nobody reads batches of web client
+        for _ in range(50):
+            fanout.publish(b'x' * 100)
+            await asyncio.sleep(0)
+        await fanout.close()
+        return client, errors
+
+    disconnected = metrics.counters[('streamcaster_slow_clients_disconnected_total', 'slow')]
+    client, errors = asyncio.run(run())
+    assert client.closed
+    assert errors == [client.client_id]
+    assert metrics.counters[('streamcaster_slow_clients_disconnected_total', 'slow')] == disconnected + 1
+
+
+def test_client_input_is_discarded_and_close_is_noticed():
+    async def run() -> tuple:
+        errors = []
+        accepted = asyncio.Queue()
+
+        async def on_client_error(
+                streampoint: str,
+                client_id: int
+        ) -> None:
+            errors.append(client_id)
+            await fanout.remove_client(client_id)
+
+        async def handle(
+                reader: asyncio.StreamReader,
+                writer: asyncio.StreamWriter
+        ) -> None:
+            await accepted.put(fanout.add_client(writer=writer, reader=reader))
+
+        fanout = StreamPointFanout('rovers', on_client_error=on_client_error)
+        server = await asyncio.start_server(handle, '127.0.0.1', 0)
+        async with server:
+            _, rover = await asyncio.open_connection('127.0.0.1', server.sockets[0].getsockname()[1])
+            client = await accepted.get()
+            gga = b'$GPGGA,120000.00,5545.18912,N,03737.30920,E,4,12,0.8,150.0,M,14.0,M,1.0,0000*5B\r\n'
+            for _ in range(20000):  # About 1.6 MB nobody reads on caster side
+                rover.write(gga)
+            await rover.drain()
+            await asyncio.sleep(0.1)
+            buffered = len(client.reader._buffer)
+            rover.close()
+            for _ in range(100):
+                if errors:
+                    break
+                await asyncio.sleep(0.01)
+        return client, errors, buffered
+
+    client, errors, buffered = asyncio.run(run())
+    assert buffered <= CLIENT_READ_SIZE
+    assert client.reader_closed()
+    assert errors == [client.client_id]
+
+
+def test_keeping_up_clients_share_chunk_written_directly():
+    async def run() -> tuple:
+        fanout = StreamPointFanout('fast')
+        clients = [fanout.add_client(writer=Writer()) for _ in range(3)]
+        filtered = [fanout.add_client(writer=Writer(), message_types=frozenset({1005})) for _ in range(2)]
+        data = frame(1005, b'station') + frame(1077, b'msm')
+        fanout.publish(data)
+        written = [client.writer.transport.data for client in clients + filtered]
+        woken = [client.ready.is_set() or bool(client.buffer) for client in clients + filtered]
+        await fanout.close()
+        return data, written, woken
+
+    data, written, woken = asyncio.run(run())
+    assert all(chunks == [data] and chunks[0] is data for chunks in written[:3])  # The same object, not a copy
+    assert written[3] == [frame(1005, b'station')] and written[3][0] is written[4][0]
+    assert not any(woken)
+
+
+def test_backlog_of_slow_client_is_written_at_once():
+    async def run() -> tuple:
+        fanout = StreamPointFanout('slow')
+        writer = WebClientWriter()  # No transport, each chunk is buffered
+        client = fanout.add_client(writer=writer)
+        for i in range(3):
+            fanout.publish(b'%d' % i)
+        buffered = len(client.buffer)
+        batch = await asyncio.wait_for(writer.batches.get(), timeout=1)
+        await fanout.close()
+        return buffered, batch
+
+    assert asyncio.run(run()) == (3, b'012')
@@ -0,0 +1,61 @@
+import asyncio
+
+from StreamCaster_app import (
+    DEFAULT_STREAM_SETTINGS,
+    HistoryBuffer,
+    StreamPointFanout,
+    WebClientWriter,
+)
+from test_rtcm3 import frame
+
+
+def test_raw_history_is_limited_by_size_and_age():
+    history = HistoryBuffer(mode='raw', max_sec=10, max_bytes=10)
+    for i, chunk in enumerate([b'aaaa', b'bbbb', b'cccc']):
+        history.add(chunk, now=100 + i)
+    assert history.items(now=102) == [b'bbbb', b'cccc']
+    assert history.items(now=112) == [b'cccc']
+    assert history.items(now=113) == []
+    assert history.size == 0
+
+
+def test_rtcm3_history_keeps_latest_frame_of_each_type():
+    history = HistoryBuffer(mode='rtcm3', max_sec=10, max_bytes=1000)
+    station, msm_old, msm_new = frame(1005, b'station'), frame(1077, b'old'), frame(1077, b'new')
+    history.add(station + msm_old[:5], now=100)  # Frame split between chunks
+    history.add(msm_old[5:] + frame(1230), now=101)
+    history.add(msm_new, now=105)
+    assert history.items(now=105) == [station, frame(1230), msm_new]
+    assert history.items(now=111.5) == [msm_new]
+    assert history.size == len(msm_new)
+
+
+def test_new_client_is_primed_from_history():
+    async def run() -> list:
+        settings = {**DEFAULT_STREAM_SETTINGS, 'history_mode': 'rtcm3'}
+        fanout = StreamPointFanout('point1', settings=settings)
+        for message_type, payload in [(1005, b'station'), (1077, b'old'), (1077, b'new')]:
+            fanout.publish(frame(message_type, payload))
+        batches = []
+        for message_types in [None, frozenset({1005})]:
+            writer = WebClientWriter()
+            fanout.add_client(writer=writer, message_types=message_types)
+            batches.append(await asyncio.wait_for(writer.batches.get(), timeout=1))
+        await fanout.close()
+        return batches
+
+    assert asyncio.run(run()) == [frame(1005, b'station') + frame(1077, b'new'), frame(1005, b'station')]
+
+
+def test_no_history_by_default():
+    async def run() -> bool:
+        fanout = StreamPointFanout('point1')
+        fanout.publish(b'data')
+        writer = WebClientWriter()
+        fanout.add_client(writer=writer)
+        await asyncio.sleep(0.05)
+        primed = not writer.batches.empty()
+        await fanout.close()
+        return fanout.history is None and not primed
+
+    assert asyncio.run(run())
@@ -0,0 +1,75 @@
+import asyncio
+import base64
+
+from StreamCaster_app import (
+    SERVER_PASSWORD,
+    StreamCaster,
+    WebClientWriter,
+)
+
+
+async def wait_until(condition) -> None:
+    while not condition():
+        await asyncio.sleep(0.01)
+
+
+def test_data_path_does_not_wait_for_admin_lock():
+    async def run() -> list:
+        caster = StreamCaster()
+        server = await asyncio.start_server(caster.handle_connection, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        auth = base64.b64encode(b'user1:password1').decode()
+        received = []
+        async with caster.lock:  # Long admin change in progress
+            source_reader, source = await asyncio.open_connection('127.0.0.1', port)
+            source.write(f'SOURCE {SERVER_PASSWORD} /point1\r\n\r\n'.encode())
+            await source_reader.readline()
+            clients = []
+            for _ in range(20):
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+                writer.write(f'GET /point1 HTTP/1.0\r\nAuthorization: Basic {auth}\r\n\r\n'.encode())
+                await reader.readline()
+                clients.append((reader, writer))
+            await wait_until(lambda: caster.client_count('point1') == 20)
+            source.write(b'data')
+            for reader, writer in clients:
+                received.append(await reader.readexactly(4))
+                writer.close()
+            await wait_until(lambda: caster.client_count('point1') == 0)
+            source.close()
+            await wait_until(lambda: not caster.is_active('point1'))
+        server.close()
+        return received
+
+    assert asyncio.run(asyncio.wait_for(run(), timeout=10)) == [b'data'] * 20
+
+
+def test_cleanup_of_replaced_source_keeps_new_connection():
+    async def run() -> tuple:
+        caster = StreamCaster()
+        old_writer, new_writer = WebClientWriter(), WebClientWriter()
+        fanout = await caster._register_source(streampoint='point1', writer=new_writer)
+        client = fanout.add_client(writer=WebClientWriter())
+        await caster._cleanup(
+            del_server_connections=True,
+            del_client_queues=True,
+            streampoint='point1',
+            writer=old_writer
+        )
+        return caster.is_active('point1'), client.client_id in caster.client_queues['point1'].clients
+
+    assert asyncio.run(run()) == (True, True)
+
+
+def test_removed_user_loses_only_own_clients(tmp_path):
+    async def run() -> tuple:
+        caster = StreamCaster()
+        caster.config_store.file = str(tmp_path / 'config.json')
+        removed = caster.get_fanout('point1').add_client(writer=WebClientWriter(), username='user1')
+        kept = caster.get_fanout('point2').add_client(writer=WebClientWriter(), username='user3')
+        await caster.remove_stream_user('user1')
+        return removed.closed or removed.writer.closed, kept.writer.closed, dict(caster.user_clients)
+
+    removed_closed, kept_closed, user_clients = asyncio.run(run())
+    assert removed_closed and not kept_closed
+    assert set(user_clients) == {'user3'}
@@ -0,0 +1,26 @@
+from StreamCaster_app import Metrics
+
+
+def test_render_sums_processes():
+    metrics = Metrics()
+    metrics.inc('streamcaster_bytes_in_total', 'point1', 100)
+    metrics.observe('streamcaster_client_queue_depth', 3, 'point1', count=2)
+    worker = Metrics()
+    worker.inc('streamcaster_bytes_in_total', 'point1', 50)
+    worker.observe('streamcaster_client_queue_depth', 300, 'point1')
+
+    lines = metrics.render([worker.snapshot()]).splitlines()
+    assert 'streamcaster_bytes_in_total{streampoint="point1"} 150.0' in lines
+    assert 'streamcaster_client_queue_depth_bucket{streampoint="point1",le="2"} 0' in lines
+    assert 'streamcaster_client_queue_depth_bucket{streampoint="point1",le="4"} 2' in lines
+    assert 'streamcaster_client_queue_depth_bucket{streampoint="point1",le="+Inf"} 3' in lines
+    assert 'streamcaster_client_queue_depth_sum{streampoint="point1"} 306' in lines
+    assert 'streamcaster_client_queue_depth_count{streampoint="point1"} 3' in lines
+
+
+def test_label_values_are_escaped():
+    metrics = Metrics()
+    metrics.inc('streamcaster_bytes_in_total', 'a"b\\c\nd')
+    text = metrics.render(gauges={'streamcaster_clients': ('Connected clients', {'x"y': 1})})
+    assert 'streamcaster_bytes_in_total{streampoint="a\\"b\\\\c\\nd"} 1.0\n' in text
+    assert 'streamcaster_clients{streampoint="x\\"y"} 1\n' in text
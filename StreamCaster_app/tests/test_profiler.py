@@ -0,0 +1,67 @@
+import asyncio
+import time
+
+from starlette.testclient import TestClient
+
+import StreamCaster_app
+from StreamCaster_app import (
+    SERVER_PASSWORD,
+    LoopProfiler,
+    StreamCaster,
+    app,
+    profiler,
+)
+
+
+def test_blocked_loop_is_reported_with_its_stack():
+    def parse_blocking() -> None:
+        time.sleep(0.3)
+
+    async def run() -> LoopProfiler:
+        loop_profiler = LoopProfiler(interval=0.02, threshold=0.1)
+        loop_profiler.start()
+        await asyncio.sleep(0.1)
+        parse_blocking()
+        await asyncio.sleep(0.1)
+        loop_profiler.task.cancel()
+        return loop_profiler
+
+    loop_profiler = asyncio.run(run())
+    report = loop_profiler.report()
+    assert 0.25 < report['loop_lag']['max'] < 1
+    [stall] = report['slow_callbacks']
+    assert stall['seconds'] == round(loop_profiler.lag_max, 4)
+    assert any('parse_blocking' in entry for entry in stall['stack'])
+
+
+def test_lock_hold_is_reported_with_holder(tmp_path, monkeypatch):
+    def slow_validation(settings: dict) -> None:
+        time.sleep(0.15)
+
+    monkeypatch.setattr(StreamCaster_app, 'validate_stream_settings', slow_validation)
+
+    async def run() -> None:
+        caster = StreamCaster()
+        caster.config_store.file = str(tmp_path / 'config.json')
+        await caster.add_streampoint('profiled', settings={'read_size': 1024})
+        await caster.add_streampoint('fast')
+
+    profiler.reset()
+    asyncio.run(run())
+    [hold] = profiler.report()['lock_holds']
+    assert hold['lock'] == 'admin' and hold['holder'] == 'StreamCaster.add_streampoint'
+    assert hold['seconds'] >= 0.15
+
+
+def test_profile_endpoint():
+    client = TestClient(app)
+    assert client.get('/debug/profile').status_code == 401
+    profiler.record_lock('admin', 'StreamCaster.apply_batch', 0.5)
+    profiler.record_lock('admin', 'StreamCaster.add_streampoint', 0.2)
+    profiler.record_lock('admin', 'StreamCaster.add_stream_user', 0.001)  # Below threshold
+    response = client.get('/debug/profile', params={'limit': 1, 'reset': True}, auth=('admin', SERVER_PASSWORD))
+    assert response.status_code == 200
+    content = response.json()
+    assert set(content) == {'enabled', 'main', 'workers'}
+    assert [hold['holder'] for hold in content['main']['lock_holds']] == ['StreamCaster.apply_batch']
+    assert profiler.report()['lock_holds'] == []
@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+
+from StreamCaster_app import StreamCaster
+
+SOURCETABLE = b"STR;point1;point1;RTCM 3;;0;;;;0.00;0.00;0;0;Caster;none;B;N;0;\r\nENDSOURCETABLE\r\n"
+
+
+def connect_upstream(
+        response: bytes
+) -> tuple:
+    """Runs _connect_upstream against local caster which sends response, returns (chunked, data after headers)"""
+    async def run() -> tuple:
+        async def upstream(
+                reader: asyncio.StreamReader,
+                writer: asyncio.StreamWriter
+        ) -> None:
+            await reader.readuntil(b'\r\n\r\n')
+            writer.write(response)
+            await writer.drain()
+            writer.close()
+
+        server = await asyncio.start_server(upstream, '127.0.0.1', 0)
+        relay = {'host': '127.0.0.1', 'port': server.sockets[0].getsockname()[1], 'streampoint': 'point1'}
+        async with server:
+            reader, writer, chunked = await StreamCaster()._connect_upstream(relay=relay, streampoint='point1')
+            data = await reader.read()
+            writer.close()
+        return chunked, data
+
+    return asyncio.run(run())
+
+
+def test_ntrip1_stream():
+    assert connect_upstream(b"ICY 200 OK\r\n\xd3data") == (False, b'\xd3data')
+
+
+def test_ntrip2_stream():
+    response = (
+        b"HTTP/1.1 200 OK\r\nNtrip-Version: Ntrip/2.0\r\nContent-Type: gnss/data\r\n"
+        b"Transfer-Encoding: chunked\r\n\r\n5\r\n\xd3data\r\n"
+    )
+    assert connect_upstream(response) == (True, b'5\r\n\xd3data\r\n')
+
+
+@pytest.mark.parametrize('response', [
+    b"SOURCETABLE 200 OK\r\nContent-Type: text/plain\r\n\r\n" + SOURCETABLE,
+    b"HTTP/1.1 200 OK\r\nNtrip-Version: Ntrip/2.0\r\nContent-Type: gnss/sourcetable\r\n\r\n" + SOURCETABLE,
+    b"HTTP/1.1 401 Unauthorized\r\n\r\n",
+    b"ERROR - Bad Password\r\n",
+    b"",
+])
+def test_not_a_stream_is_refused(response: bytes):
+    with pytest.raises(ConnectionError):
+        connect_upstream(response)
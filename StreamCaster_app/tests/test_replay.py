@@ -0,0 +1,72 @@
+import os
+
+from starlette.testclient import TestClient
+
+from StreamCaster_app import (
+    RECORD_DIR,
+    RECORD_HEADER,
+    SERVER_PASSWORD,
+    app,
+    list_segments,
+    read_segment,
+)
+
+
+def test_read_segment_in_parts(tmp_path):
+    path = tmp_path / '1700000000.seg'
+    records = [(1700000000.0 + i, bytes([i]) * (i + 1)) for i in range(10)]
+    data = b''.join(RECORD_HEADER.pack(timestamp, len(chunk)) + chunk for timestamp, chunk in records)
+    path.write_bytes(data + RECORD_HEADER.pack(1700000010.0, 100) + b'partial')
+
+    read, pos, calls = [], 0, 0
+    while True:
+        part, pos = read_segment(str(path), pos, read_size=20)
+        if not part:
+            break
+        read.extend(part)
+        calls += 1
+    assert read == records
+    assert pos == len(data)  # Record being written is left for the next read
+    assert calls > 1
+
+
+def test_read_empty_segment(tmp_path):
+    path = tmp_path / '1700000000.seg'
+    path.write_bytes(b'')
+    assert read_segment(str(path)) == ([], 0)
+
+
+def test_replay_time_requires_timezone():
+    client = TestClient(app)
+    replay = {'name': 'replay1', 'stream_point': 'not_recorded', 'start': '2024-01-01T10:00:00', 'end': '2024-01-01T11:00:00'}
+    response = client.post('/replays/', json=replay, auth=('admin', SERVER_PASSWORD))
+    assert response.status_code == 422
+
+    replay.update(start='2024-01-01T10:00:00Z', end='2024-01-01T13:00:00+03:00')
+    response = client.post('/replays/', json=replay, auth=('admin', SERVER_PASSWORD))
+    assert response.status_code == 400
+    assert response.json()['detail'] == 'No recordings for streampoint not_recorded'
+
+
+def test_list_segments_of_name_only(tmp_path):
+    os.makedirs(tmp_path / 'records' / 'point1')
+    (tmp_path / 'records' / 'point1' / '1700000000.seg').write_bytes(b'')
+    (tmp_path / '1700000000.seg').write_bytes(b'')
+    record_dir = str(tmp_path / 'records')
+    assert list_segments(record_dir, 'point1') == [(1700000000, os.path.join(record_dir, 'point1', '1700000000.seg'))]
+    for streampoint in ['..', '.', '', '../records/point1', '/tmp']:
+        assert list_segments(record_dir, streampoint) == []
+
+
+def test_recordings_of_unknown_streampoint():
+    os.makedirs(os.path.join(RECORD_DIR, 'point1'), exist_ok=True)
+    with open(os.path.join(RECORD_DIR, 'point1', '1700000000.seg'), 'wb') as segment:
+        segment.write(b'data')
+    client = TestClient(app)
+    response = client.get('/recordings/point1')
+    assert response.status_code == 200
+    assert response.json() == [{'start': '2023-11-14T22:13:20+00:00', 'size': 4}]
+    for streampoint in ['%2E%2E', 'not_configured']:
+        response = client.get(f'/recordings/{streampoint}')
+        assert response.status_code == 404
+        assert response.json()['detail'] == 'streampoint not found'
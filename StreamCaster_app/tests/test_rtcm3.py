@@ -0,0 +1,58 @@
+import pytest
+
+from StreamCaster_app import (
+    Rtcm3Splitter,
+    crc24q,
+    parse_message_types,
+)
+
+
+def frame(message_type, payload=b''):
+    """RTCM3 frame with valid CRC-24Q, message type in the first 12 bits of payload"""
+    body = bytes([message_type >> 4, (message_type & 0x0F) << 4]) + payload
+    head = bytes([0xD3, len(body) >> 8, len(body) & 0xFF]) + body
+    return head + crc24q(head).to_bytes(3, 'big')
+
+
+def test_crc24q_check_value():
+    assert crc24q(b'123456789') == 0xCDE703
+
+
+def test_frames_split_at_any_byte():
+    frames = [frame(1005, b'\x01' * 17), frame(1074, b'\xd3' * 100), frame(1230, b'\x00' * 1021)]
+    stream = b''.join(frames)
+    for step in (1, 2, 5, 64, len(stream)):
+        splitter = Rtcm3Splitter(validate=True)
+        result = []
+        for i in range(0, len(stream), step):
+            result += splitter.feed(stream[i:i + step])
+        assert result == [(1005, frames[0]), (1074, frames[1]), (1230, frames[2])]
+        assert not splitter.buffer and splitter.crc_errors == 0
+
+
+def test_garbage_between_frames_is_skipped():
+    first, second = frame(1005, b'\x00' * 19), frame(1033, b'\x01' * 10)
+    splitter = Rtcm3Splitter()
+    # Preamble with reserved bits set and preamble with too short length are not frame headers
+    assert splitter.feed(b'$GPGGA\xd3\xfc\x00\xd3\x00\x01' + first + b'\x00\xd3') == [(1005, first)]
+    assert splitter.buffer == b'\xd3'  # Kept until length of frame arrives
+    assert splitter.feed(second[1:] + b'\xd3\x00') == [(1033, second)]
+    assert splitter.buffer == b'\xd3\x00'
+
+
+def test_crc_errors():
+    good = frame(1005, b'\x00' * 19)
+    bad = bytearray(frame(1077, b'\x55' * 30))
+    bad[10] ^= 0xFF
+    splitter = Rtcm3Splitter(validate=True)
+    assert splitter.feed(bytes(bad) + good) == [(1005, good)]
+    assert splitter.crc_errors == 1
+    assert Rtcm3Splitter().feed(bytes(bad))[0][1] == bytes(bad)  # Not checked without validate
+
+
+def test_parse_message_types():
+    assert parse_message_types('1005, msm4') == frozenset({1005, 1074, 1084, 1094, 1104, 1114, 1124, 1134})
+    assert parse_message_types([1033, '1230']) == frozenset({1033, 1230})
+    for value in ('msm8', 'gps', '', []):
+        with pytest.raises(ValueError):
+            parse_message_types(value)
@@ -0,0 +1,92 @@
+import asyncio
+import base64
+import time
+
+from StreamCaster_app import (
+    DEFAULT_STREAM_SETTINGS,
+    SERVER_PASSWORD,
+    StreamCaster,
+)
+
+
+async def connect_source_and_client(
+        caster: StreamCaster,
+        streampoint: str
+) -> tuple:
+    """Returns (server, source writer, client reader, client writer) connected through caster"""
+    server = await asyncio.start_server(caster.handle_connection, '127.0.0.1', 0)
+    port = server.sockets[0].getsockname()[1]
+    source_reader, source = await asyncio.open_connection('127.0.0.1', port)
+    source.write(f'SOURCE {SERVER_PASSWORD} /{streampoint}\r\n\r\n'.encode())
+    assert b'OK' in await source_reader.readline()
+    client, client_writer = await asyncio.open_connection('127.0.0.1', port)
+    auth = base64.b64encode(b'user1:password1').decode()
+    client_writer.write(f'GET /{streampoint} HTTP/1.0\r\nAuthorization: Basic {auth}\r\n\r\n'.encode())
+    assert await client.readline() == b'ICY 200 OK\r\n'
+    return server, source, client, client_writer
+
+
+def test_source_data_is_forwarded_as_it_arrives():
+    async def run() -> tuple:
+        caster = StreamCaster()
+        server, source, client, client_writer = await connect_source_and_client(caster, 'point1')
+        delays = []
+        for i in range(10):
+            sent = time.perf_counter()
+            source.write(b'%02d' % i)
+            assert await client.readexactly(2) == b'%02d' % i
+            delays.append(time.perf_counter() - sent)
+        data = bytes(range(256)) * 4096  # 1 MB
+        sent = time.perf_counter()
+        source.write(data)
+        assert await client.readexactly(len(data)) == data
+        elapsed = time.perf_counter() - sent
+        source.close()
+        client_writer.close()
+        server.close()
+        return delays, elapsed
+
+    delays, elapsed = asyncio.run(run())
+    assert max(delays) < 0.05  # Not waiting for a fixed read interval
+    assert elapsed < 2
+
+
+def test_small_reads_are_joined_inside_coalesce_window():
+    async def run() -> tuple:
+        reader = asyncio.StreamReader()
+        loop = asyncio.get_running_loop()
+        loop.call_later(0.005, reader.feed_data, b'b')
+        loop.call_later(0.01, reader.feed_data, b'c')
+        loop.call_later(0.2, reader.feed_data, b'late')
+        settings = {**DEFAULT_STREAM_SETTINGS, 'coalesce_window_us': 50_000, 'read_size': 100}
+        started = loop.time()
+        joined = await StreamCaster._coalesce(None, reader=reader, data=b'a', settings=settings)
+        return joined, loop.time() - started
+
+    joined, elapsed = asyncio.run(run())
+    assert joined == b'abc'
+    assert 0.04 < elapsed < 0.15
+
+
+def test_coalesce_returns_at_once_without_window_or_at_read_size():
+    async def run() -> tuple:
+        reader = asyncio.StreamReader()
+        reader.feed_data(b'cdef')
+        no_window = await StreamCaster._coalesce(None, reader=reader, data=b'ab', settings=DEFAULT_STREAM_SETTINGS)
+        settings = {**DEFAULT_STREAM_SETTINGS, 'coalesce_window_us': 10_000_000, 'read_size': 4}
+        started = time.perf_counter()
+        full = await StreamCaster._coalesce(None, reader=reader, data=b'ab', settings=settings)
+        return no_window, full, time.perf_counter() - started
+
+    no_window, full, elapsed = asyncio.run(run())
+    assert no_window == b'ab'
+    assert full == b'abcd'
+    assert elapsed < 1
+
+
+def test_stream_settings_are_merged_with_defaults():
+    caster = StreamCaster()
+    caster.stream_settings['point1'] = {'read_size': 1024, 'coalesce_window_us': 500}
+    settings = caster.get_stream_settings('point1')
+    assert settings == {**DEFAULT_STREAM_SETTINGS, 'read_size': 1024, 'coalesce_window_us': 500}
+    assert caster.get_stream_settings('point2') == DEFAULT_STREAM_SETTINGS
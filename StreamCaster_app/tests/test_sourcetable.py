@@ -0,0 +1,63 @@
+import asyncio
+
+from StreamCaster_app import (
+    DEFAULT_STREAM_SETTINGS,
+    SERVER_PASSWORD,
+    Sourcetable,
+    StreamCaster,
+)
+
+
+def test_response_is_rendered_once_until_change():
+    sourcetable = Sourcetable()
+    sourcetable.update('point2', DEFAULT_STREAM_SETTINGS)
+    sourcetable.update('point1', {**DEFAULT_STREAM_SETTINGS, 'rtcm3_frames': True})
+    response = sourcetable.response()
+    head, body = response.split(b'\r\n\r\n', 1)
+    assert head.startswith(b'SOURCETABLE 200 OK\r\n')
+    assert f'Content-Length: {len(body)}'.encode() in head
+    assert body.splitlines() == [
+        b'STR;point1;point1;RTCM 3;;0;;;;0.00;0.00;0;0;StreamCaster;none;B;N;0;',
+        b'STR;point2;point2;RAW;;0;;;;0.00;0.00;0;0;StreamCaster;none;B;N;0;',
+        b'ENDSOURCETABLE',
+    ]
+    assert sourcetable.response() is response
+    assert sourcetable.response('2.0').startswith(b'HTTP/1.1 200 OK\r\nNtrip-Version: Ntrip/2.0\r\n')
+
+    sourcetable.update('point2', DEFAULT_STREAM_SETTINGS)  # Not changed, cache is kept
+    assert sourcetable.response() is response
+    sourcetable.update('point2', None)
+    assert b'point2' not in sourcetable.response() and b'point1' in sourcetable.response()
+
+
+def test_sourcetable_follows_source_connections():
+    async def get_sourcetable(
+            port: int
+    ) -> bytes:
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(b'GET / HTTP/1.0\r\n\r\n')
+        response = await asyncio.wait_for(reader.read(), timeout=5)
+        writer.close()
+        return response
+
+    async def run() -> list:
+        caster = StreamCaster()
+        server = await asyncio.start_server(caster.handle_connection, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        responses = [await get_sourcetable(port)]
+        source_reader, source = await asyncio.open_connection('127.0.0.1', port)
+        source.write(f'SOURCE {SERVER_PASSWORD} /point1\r\n\r\n'.encode())
+        await source_reader.readline()
+        responses.append(await get_sourcetable(port))
+        source.close()
+        for _ in range(100):
+            if not caster.is_active('point1'):
+                break
+            await asyncio.sleep(0.01)
+        responses.append(await get_sourcetable(port))
+        server.close()
+        return [response.split(b'\r\n\r\n', 1)[1] for response in responses]
+
+    empty, connected, disconnected = asyncio.run(run())
+    assert empty == disconnected == b'ENDSOURCETABLE\r\n'
+    assert connected.startswith(b'STR;point1;') and connected.endswith(b'ENDSOURCETABLE\r\n')
@@ -0,0 +1,68 @@
+import asyncio
+import random
+
+from StreamCaster_app import TimerWheel
+
+
+async def wait_fired(
+        fired: dict,
+        count: int,
+        timeout: float
+) -> None:
+    loop = asyncio.get_running_loop()
+    finish = loop.time() + timeout
+    while len(fired) < count and loop.time() < finish:
+        await asyncio.sleep(0.005)
+
+
+def test_timers_fire_within_one_tick_of_deadline():
+    async def run() -> tuple:
+        loop = asyncio.get_running_loop()
+        wheel = TimerWheel(tick=0.02, slots=64)
+        rng = random.Random(1)
+        deadlines = {}
+        fired = {}
+        for key in range(40):
+            await asyncio.sleep(rng.uniform(0, wheel.tick))  # Random offset inside a tick
+            delay = rng.choice([0.01, 0.05, 0.2, 0.33])
+            deadlines[key] = loop.time() + delay
+            wheel.schedule(key, delay, lambda key=key: fired.setdefault(key, loop.time()))
+        await wait_fired(fired, len(deadlines), timeout=2)
+        wheel.task.cancel()
+        return wheel, deadlines, fired
+
+    wheel, deadlines, fired = asyncio.run(run())
+    assert fired.keys() == deadlines.keys()
+    for key, deadline in deadlines.items():
+        assert -0.002 <= fired[key] - deadline <= wheel.tick + 0.01, key  # Small margin for loop scheduling
+    assert not wheel.timers and not any(wheel.slots)
+
+
+def test_timer_longer_than_turn_waits_for_deadline():
+    async def run() -> tuple:
+        loop = asyncio.get_running_loop()
+        wheel = TimerWheel(tick=0.02, slots=8)  # One turn is 0.16 s
+        fired = {}
+        deadline = loop.time() + 0.5
+        wheel.schedule('long', 0.5, lambda: fired.setdefault('long', loop.time()))
+        await wait_fired(fired, 1, timeout=2)
+        wheel.task.cancel()
+        return wheel, deadline, fired
+
+    wheel, deadline, fired = asyncio.run(run())
+    assert 0 <= fired['long'] - deadline <= wheel.tick + 0.01
+
+
+def test_cancel_and_replace():
+    async def run() -> list:
+        wheel = TimerWheel(tick=0.01, slots=16)
+        calls = []
+        wheel.schedule('cancelled', 0.02, lambda: calls.append('cancelled'))
+        wheel.cancel('cancelled')
+        wheel.schedule('replaced', 0.02, lambda: calls.append('first'))
+        wheel.schedule('replaced', 0.04, lambda: calls.append('second'))
+        await asyncio.sleep(0.1)
+        wheel.task.cancel()
+        return calls
+
+    assert asyncio.run(run()) == ['second']
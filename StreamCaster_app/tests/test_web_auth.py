@@ -0,0 +1,64 @@
+import pytest
+from starlette.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+import StreamCaster_app
+from StreamCaster_app import (
+    app,
+    issue_web_token,
+    web_auth_data,
+)
+
+
+def test_authorization_header():
+    assert web_auth_data('Basic dXNlcjE6cGFzc3dvcmQx', None, 'point1') == 'dXNlcjE6cGFzc3dvcmQx'
+    assert web_auth_data(None, None, 'point1') is None
+
+
+def test_token_is_one_time_and_bound_to_streampoint():
+    token = issue_web_token('dXNlcjE6cGFzc3dvcmQx', 'point1')
+    with pytest.raises(ValueError):
+        web_auth_data(None, token, 'point2')
+    token = issue_web_token('dXNlcjE6cGFzc3dvcmQx', 'point1')
+    assert web_auth_data(None, token, 'point1') == 'dXNlcjE6cGFzc3dvcmQx'
+    with pytest.raises(ValueError):
+        web_auth_data(None, token, 'point1')
+
+
+def test_expired_token(monkeypatch):
+    monkeypatch.setattr(StreamCaster_app, 'WEB_TOKEN_TTL', -1)
+    token = issue_web_token('dXNlcjE6cGFzc3dvcmQx', 'point1')
+    with pytest.raises(ValueError):
+        web_auth_data(None, token, 'point1')
+
+
+def test_token_endpoint():
+    client = TestClient(app)
+    assert client.post('/web_tokens/point1', auth=('user1', 'wrong')).status_code == 401
+    assert client.post('/web_tokens/point3', auth=('user2', 'password2')).status_code == 403
+    response = client.post('/web_tokens/point1', auth=('user1', 'password1'))
+    assert response.status_code == 200
+    assert response.json()['expires_in'] == StreamCaster_app.WEB_TOKEN_TTL
+    assert web_auth_data(None, response.json()['token'], 'point1') is not None
+
+
+def test_websocket_token_in_subprotocol():
+    client = TestClient(app)
+    with pytest.raises(WebSocketDisconnect) as refused:
+        with client.websocket_connect('/ws/point1', subprotocols=['token.invalid']) as websocket:
+            websocket.receive_bytes()
+    assert refused.value.code == 1008
+    assert refused.value.reason == 'invalid or expired token'
+
+    protocol = 'token.' + client.post('/web_tokens/point1', auth=('user1', 'password1')).json()['token']
+    with pytest.raises(WebSocketDisconnect) as refused:
+        with client.websocket_connect('/ws/point1', subprotocols=[protocol]) as websocket:
+            assert websocket.accepted_subprotocol == protocol
+            websocket.receive_bytes()
+    assert refused.value.reason == 'streampoint is not active'  # Token is accepted, no server of point1 in tests
+
+
+def test_credentials_in_query_are_not_accepted():
+    response = TestClient(app).get('/sse/point1', params={'auth': 'dXNlcjE6cGFzc3dvcmQx', 'token': 'invalid'})
+    assert response.status_code == 403
+    assert response.json()['detail'] == 'invalid or expired token'
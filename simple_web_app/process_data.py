@@ -2,23 +2,128 @@ import os
 import sys
 import re
 import math
+import mmap
 import time as t
 import logging
 import configparser
 import numpy as np
 import shutil
 from tqdm import tqdm
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
+from decimal import Decimal, ROUND_CEILING, ROUND_FLOOR
+from typing import NamedTuple
 
+# Fields of MESSAGE: flag, counter, time (hhmmss.ss or empty), optional position "lat,N,lon,E"
+MESSAGE_FIELDS = re.compile(rb'MESSAGE,(\d*),(\d*),(\d*\.\d\d|),(?:(\d+\.\d+),N,(\d+\.\d+),E)?')
+# Patterns for lines with several MESSAGE, time is taken from the last one
+START_TIME = re.compile(rb'.*MESSAGE,\d+,\d+,(\d+\.\d\d),')
+FIX = re.compile(rb'.*MESSAGE,\d+,\d+,(\d+\.\d\d),(\d+\.\d+),N,(\d+\.\d+),E')
+NO_TIME = re.compile(rb'MESSAGE,\d*,\d*,,')
+ANY_TIME = re.compile(rb'.*MESSAGE,\d*,\d*,(\d*\.\d\d),.*?\*')
+# MESSAGE with time shorter than hhmmss, time_in_sec fails on it. Only such lines are parsed to check the times
+# in skipped parts of file
+SHORT_START_TIME = re.compile(rb'MESSAGE,\d+,\d+,\d{1,5}\.\d\d,')
+SHORT_TIME = re.compile(rb'MESSAGE,\d*,\d*,\d{0,5}\.\d\d,')
+LINES_WINDOW = 8192  # bytes of lines after EVENT split at once
+# Layout of MESSAGE assumed by numpy engine, other lines are parsed by RecordReader:
+# - 'MESSAGE,' is followed by fields flag, counter, time, lat, 'N', lon and the char 'E' right after lon's comma.
+#   Each field is shorter than FIELD_WIDTH bytes, only one MESSAGE is in line
+# - time is empty or digits with '.' as the third char from its end (hhmmss.ss), hours, minutes and seconds
+#   are the first 6 chars, shorter time is invalid as in time_in_sec
+# - lat and lon are \d+\.\d+ with at most 8 digits before '.' and 7 after it
+# Rows of FIELD_WIDTH bytes are processed as FIELD_WIDTH // 8 little-endian uint64 words, byte 0 of row is
+# the lowest byte of the first word. Bool arrays have one byte per item, 0 or 1
+FIELD_WIDTH = 16  # multiple of 8, longer fields of MESSAGE are parsed by RecordReader in numpy engine
+RECORDS_CHUNK = 1 << 18  # MESSAGE parsed at once in numpy engine
+WORD_ONES = np.uint64(0x0101010101010101)  # True in each byte of uint64
+BYTE_INDEX = np.uint64(0x0001020304050607)  # byte i is 7 - i
+POWERS_OF_TEN = 10 ** np.arange(9, dtype=np.uint64)
+CHUNKS_PER_WORKER = 4  # smaller chunks even out work of processes
 
-def find_string(line: bytes,
-                reg_expr: str
-                ) -> bool:
+
+class Record(NamedTuple):
+    start_time: bytes | None  # time of MESSAGE with all fields, used as trial start
+    fix: tuple | None  # (time, lat, lon) of MESSAGE with flag and position
+    no_time: bool  # MESSAGE with empty time
+    any_time: bytes | None  # time of MESSAGE with checksum
+
+
+EMPTY_RECORD = Record(None, None, False, None)
+
+
+class TrialState(NamedTuple):
+    """
+    State of find_trials_part at the end of processed bytes, the next part of file continues from it
+    """
+    switch_message_search: bool  # True after EVENT until the trial is finished
+    message_time: float | None
+    trial: int
+    pos_counter: int
+    start_stop: list
+    time_is_empty: bool
+    trial_stop_time: dict  # stop time of the previous trial, if any
+    expected_tts: float | None = None
+
+
+INITIAL_STATE = TrialState(False, None, 0, 0, [], False, {})
+
+
+class Columns(NamedTuple):
+    """
+    Lines with MESSAGE or EVENT as arrays, one row for line. Time in seconds, NaN if there is no such time
+    and -1 if it can not be converted by time_in_sec
+    """
+    event: np.ndarray
+    start_time: np.ndarray
+    fix: np.ndarray
+    fix_time: np.ndarray
+    good: np.ndarray  # fix within pos_threshold from reference position
+    no_time: np.ndarray
+    any_time: np.ndarray
+
+
+class RecordReader:
     """
-    Returns True if pattern is found
+    Parses line with MESSAGE into Record in one pass of precompiled pattern
     """
-    if re.search(reg_expr.encode(), line):
-        return True
+    def __init__(self,
+                 flag: int
+                 ):
+        self.flag = str(flag).encode()
+        self.fix_search = re.compile(rb'MESSAGE,' + self.flag + rb',\d+,\d*\.\d\d,\d+\.\d+,N,\d+\.\d+,E')
+
+    def read(self,
+             line: bytes
+             ) -> Record:
+        start = line.find(b'MESSAGE,')
+        if start < 0:
+            return EMPTY_RECORD
+        if line.find(b'MESSAGE,', start + 8) >= 0:
+            return self._read_several(line)
+        match = MESSAGE_FIELDS.match(line, start)
+        if match is None:
+            return EMPTY_RECORD
+        flag, counter, time, lat, lon = match.groups()
+        return Record(
+            time if flag and counter and time[:1].isdigit() else None,
+            (time, lat, lon) if flag == self.flag and counter and time and lat is not None else None,
+            not time,
+            time if time and line.find(b'*', match.end(3) + 1) >= 0 else None,
+        )
+
+    def _read_several(self,
+                      line: bytes
+                      ) -> Record:
+        start_time = START_TIME.match(line)
+        fix = FIX.match(line) if self.fix_search.search(line) else None
+        any_time = ANY_TIME.match(line)
+        return Record(
+            start_time=start_time.group(1) if start_time else None,
+            fix=fix.groups() if fix else None,
+            no_time=NO_TIME.search(line) is not None,
+            any_time=any_time.group(1) if any_time else None,
+        )
 
 
 def time_in_sec(time_str: str
@@ -26,8 +131,7 @@ def time_in_sec(time_str: str
     """
     Returns time from MESSAGE in seconds
     """
-    return timedelta(hours=int(time_str[0:2]), minutes=int(time_str[2:4]),
-                     seconds=int(time_str[4:6])).total_seconds()
+    return float(int(time_str[0:2]) * 3600 + int(time_str[2:4]) * 60 + int(time_str[4:6]))
 
 
 def delta_ll(lat: bytes,
@@ -48,6 +152,863 @@ def delta_ll(lat: bytes,
     return delta_m
 
 
+def line_bounds(data: mmap.mmap,
+                index: int,
+                low: int = 0
+                ) -> tuple:
+    """
+    Returns (start, end) of line with byte at index, end includes new line
+    """
+    start = data.rfind(b'\n', low, index) + 1 or low
+    end = data.find(b'\n', index) + 1 or len(data)
+    return start, end
+
+
+def last_start_time(data: mmap.mmap,
+                    reader: RecordReader,
+                    low: int,
+                    high: int
+                    ) -> bytes | None:
+    """
+    Returns start time of the last MESSAGE between low and high, searching from the end
+    """
+    index = data.rfind(b'MESSAGE,', low, high)
+    while index >= 0:
+        start, end = line_bounds(data, index, low)
+        start_time = reader.read(data[start:end]).start_time
+        if start_time is not None:
+            return start_time
+        index = data.rfind(b'MESSAGE,', low, start)
+    return None
+
+
+def check_start_times(data: mmap.mmap,
+                      reader: RecordReader,
+                      low: int,
+                      high: int
+                      ) -> None:
+    """
+    Converts start time of lines between low and high before EVENT, raises ValueError as time_in_sec does
+    for time shorter than hhmmss
+    """
+    match = SHORT_START_TIME.search(data, low, high)
+    while match is not None:
+        start, end = line_bounds(data, match.start(), low)
+        time = reader.read(data[start:end]).start_time
+        if time is not None:
+            time_in_sec(time)
+        match = SHORT_START_TIME.search(data, end, high)
+
+
+def lat_band(true_lat: float,
+             pos_threshold: int
+             ) -> tuple:
+    """
+    Returns (prefix, low, high): lat of each fix within pos_threshold from reference position is between
+    low and high and its text starts with prefix after leading zeros, e.g. b'55.753' for 10 m.
+    Prefix is empty if there is no such text
+    """
+    margin = pos_threshold / 111134.8611 * 1.000001 + 1e-9  # Rounding errors of delta_ll and float(lat)
+    if margin <= 0:
+        return b'', 0, 0
+    low = Decimal(true_lat - margin).quantize(Decimal('1e-12'), rounding=ROUND_FLOOR)
+    high = Decimal(true_lat + margin).quantize(Decimal('1e-12'), rounding=ROUND_CEILING)
+    prefix = os.path.commonprefix([f'{low:f}', f'{high:f}'])
+    if low < 0 or '.' not in prefix:
+        return b'', 0, 0
+    return prefix.rstrip('0').encode(), true_lat - margin, true_lat + margin  # Lat may be written with fewer digits
+
+
+def next_fix_candidate(data: mmap.mmap,
+                       band: tuple,
+                       low: int,
+                       high: int
+                       ) -> int:
+    """
+    Returns start of the first line between low and high with text after comma starting with lat_band prefix
+    and within the band or high if there is none. Fixes in lines before it are too far from reference position
+    """
+    prefix, lat_low, lat_high = band
+    index = data.find(prefix, low, high)
+    while index >= 0:
+        before = index
+        while before > low and data[before - 1] == ord('0'):
+            before -= 1
+        if before > low and data[before - 1] == ord(','):
+            try:
+                lat = float(data[before:data.find(b',', index, high)])
+            except ValueError:
+                lat = None  # Not a number, line is parsed
+            if lat is None or lat_low <= lat <= lat_high:
+                return line_bounds(data, index, low)[0]
+        index = data.find(prefix, index + 1, high)
+    return high
+
+
+def skip_bad_fixes(data: mmap.mmap,
+                   reader: RecordReader,
+                   low: int,
+                   high: int
+                   ) -> tuple:
+    """
+    Returns (fix_found, time, time_is_empty) of lines between low and high after EVENT, which have no good fix.
+    Any fix resets counter of good positions. time is of the last fix or MESSAGE with checksum, time_is_empty
+    of the last MESSAGE changing it, both are None if there is no such MESSAGE. If the last one has empty time,
+    time before it is not needed and is None. Times are converted as line by line search does, so invalid
+    time raises ValueError
+    """
+    match = SHORT_TIME.search(data, low, high)
+    while match is not None:
+        start, end = line_bounds(data, match.start(), low)
+        record = reader.read(data[start:end])
+        time = record.fix[0] if record.fix is not None else record.any_time
+        if time is not None:
+            time_in_sec(time)
+        match = SHORT_TIME.search(data, end, high)
+    fix_found = reader.fix_search.search(data, low, high) is not None
+    index = data.rfind(b'MESSAGE,', low, high)
+    while index >= 0:
+        start, end = line_bounds(data, index, low)
+        record = reader.read(data[start:end])
+        if record.fix is not None:
+            return fix_found, record.fix[0], False
+        if record.any_time is not None:
+            return fix_found, record.any_time, False
+        if record.no_time:
+            return fix_found, None, True
+        index = data.rfind(b'MESSAGE,', low, start)
+    return fix_found, None, None
+
+
+def find_trials_part(data: mmap.mmap,
+                     reader: RecordReader,
+                     true_lat: float,
+                     true_lon: float,
+                     event: bytes,
+                     pos_threshold: int,
+                     duration: int,
+                     good_pos_counter: int,
+                     start: int = 0,
+                     end: int | None = None,
+                     state: TrialState = INITIAL_STATE,
+                     checkpoints: list | None = None,
+                     progress: bool = True,
+                     ) -> tuple:
+    """
+    Returns (trials, state) for bytes from start to end, both at line starts. Trial is tts or 'fail'.
+    Between a good position and the next EVENT only the last MESSAGE time matters, so this part is skipped
+    with search of EVENT and the last MESSAGE before it is parsed, other lines are parsed only if their time
+    is too short to be converted. After EVENT lines up to the next possible good fix found by lat_band
+    are skipped the same way with skip_bad_fixes if they are longer than LINES_WINDOW, other lines are parsed once.
+    If checkpoints is a list, (line start, number of trials, message_time) is added for each EVENT
+    starting a trial after a finished one
+    """
+    end = len(data) if end is None else end
+    progress_bar = tqdm(total=end - start, desc='In process...', unit='B', unit_scale=True, disable=not progress)
+    debug = logging.getLogger().isEnabledFor(logging.DEBUG)
+    pos = start
+    next_event = data.find(event, pos, end)
+    switch_message_search, message_time, trial, pos_counter, _, time_is_empty, _, expected_tts = state
+    start_stop = list(state.start_stop)
+    trial_stop_time = dict(state.trial_stop_time)
+    trials = []
+    band = lat_band(true_lat, pos_threshold)
+    while pos < end:
+        if 0 <= next_event < pos:
+            next_event = data.find(event, pos, end)
+        if switch_message_search is False:
+            progress_bar.update(pos - start - progress_bar.n)
+            if next_event < 0:
+                check_start_times(data, reader, pos, end)
+                time = last_start_time(data, reader, pos, end)
+                if time is not None:
+                    message_time = time_in_sec(time)
+                pos = end
+                break
+            line_start, line_end = line_bounds(data, next_event, pos)
+            check_start_times(data, reader, pos, line_end)
+            before = last_start_time(data, reader, pos, line_start)
+            if checkpoints is not None:
+                checkpoints.append((line_start, len(trials), message_time if before is None else time_in_sec(before)))
+            time = last_start_time(data, reader, line_start, line_end) or before
+            if time is not None:
+                message_time = time_in_sec(time)
+            if message_time is None:
+                raise ValueError(f'No MESSAGE with time before {event.decode()}')
+            trial += 1
+            if trial > 1:
+                trial_stop_time[trial-1] = t.strftime('%H:%M:%S', t.gmtime(message_time))
+            start_stop.append(message_time)
+            switch_message_search = True
+            logging.debug('*'*20)
+            start_time = t.strftime('%H:%M:%S', t.gmtime(message_time))
+            logging.debug(f'Trial {trial} start:{message_time}; {start_time}')
+            pos = line_end
+            continue
+
+        if band[0]:
+            stop = line_bounds(data, next_event, pos)[0] if next_event >= 0 else end
+            candidate = next_fix_candidate(data, band, pos, stop)
+            if candidate - pos > LINES_WINDOW:
+                progress_bar.update(pos - start - progress_bar.n)
+                fix_found, time, empty = skip_bad_fixes(data, reader, pos, candidate)
+                if fix_found:
+                    pos_counter = 0
+                if time is not None:
+                    message_time = time_in_sec(time)
+                if empty is not None:
+                    time_is_empty = empty
+                pos = candidate
+                continue
+
+        window_end = data.find(b'\n', min(pos + LINES_WINDOW, end - 1), end) + 1 or end
+        lines = data[pos:window_end].split(b'\n')
+        if not lines[-1]:
+            lines.pop()
+        for line in lines:
+            pos += len(line) + 1
+            if b'MESSAGE,' not in line and event not in line:
+                continue
+            record = reader.read(line)
+            if record.fix is not None:
+                time, lat, lon = record.fix
+                message_time = time_in_sec(time)
+                time_is_empty = False
+                delta = delta_ll(lat=lat, lon=lon, true_lat=true_lat, true_lon=true_lon)
+                if delta > pos_threshold:
+                    if debug:
+                        logging.debug(f'delta {delta}; {time}')
+                    pos_counter = 0
+                    continue
+                if pos_counter == 0:
+                    expected_tts = message_time
+                    if expected_tts - start_stop[0] < 0:
+                        expected_tts += 86400
+                    start_stop.append(expected_tts)
+                pos_counter += 1
+                if pos_counter < good_pos_counter:
+                    continue
+                tts = start_stop[-1] - start_stop[0]
+                if tts < 0:   # if day rollover
+                    tts += 86400
+                trials.append(tts)
+                stop_time = t.strftime('%H:%M:%S', t.gmtime(expected_tts))
+                logging.debug(f'Trial {trial} stop:sec {expected_tts}; tts {tts}; {stop_time}')
+                start_stop = []
+                pos_counter = 0
+                switch_message_search = False
+                break
+            if record.no_time:
+                time_is_empty = True
+            if record.any_time is not None:
+                message_time = time_in_sec(record.any_time)
+                time_is_empty = False
+            if event in line:
+                if not time_is_empty:
+                    stop_time = t.strftime('%H:%M:%S', t.gmtime(message_time))
+                else:
+                    message_time = (datetime.strptime(trial_stop_time[trial-1], '%H:%M:%S') + timedelta(seconds=duration)).time()
+                    message_time = (message_time.hour * 60 + message_time.minute) * 60 + message_time.second
+                    stop_time = t.strftime('%H:%M:%S', t.gmtime(message_time))
+                trial_stop_time[trial] = stop_time
+                logging.debug(f'Trial {trial} stop: FAIL; {stop_time}')
+                trial += 1
+                trials.append('fail')
+                start_stop.clear()
+                start_stop.append(message_time)
+                logging.debug('*'*20)
+                start_time = t.strftime('%H:%M:%S', t.gmtime(message_time))
+                logging.debug(f'Trial {trial} start:{message_time}; {start_time}')
+    progress_bar.update(end - start - progress_bar.n)
+    progress_bar.close()
+    state = TrialState(
+        switch_message_search=switch_message_search,
+        message_time=message_time,
+        trial=trial,
+        pos_counter=pos_counter,
+        start_stop=start_stop,
+        time_is_empty=time_is_empty,
+        trial_stop_time={trial-1: trial_stop_time[trial-1]} if trial-1 in trial_stop_time else {},
+        expected_tts=expected_tts,
+    )
+    return trials, state
+
+
+def find_trials(data: mmap.mmap,
+                reader: RecordReader,
+                true_lat: float,
+                true_lon: float,
+                event: bytes,
+                pos_threshold: int,
+                duration: int,
+                good_pos_counter: int,
+                ) -> list:
+    """
+    Returns tts of each trial or 'fail' for the whole file
+    """
+    trials, _ = find_trials_part(
+        data=data,
+        reader=reader,
+        true_lat=true_lat,
+        true_lon=true_lon,
+        event=event,
+        pos_threshold=pos_threshold,
+        duration=duration,
+        good_pos_counter=good_pos_counter,
+    )
+    return trials
+
+
+def column_time(value: float
+                ) -> float:
+    """
+    Returns time in seconds from Columns, raises the same error as time_in_sec for invalid time
+    """
+    if value < 0:
+        raise ValueError('time of MESSAGE is shorter than hhmmss')
+    return float(value)
+
+
+def find_all(buf: np.ndarray,
+             pattern: bytes
+             ) -> np.ndarray:
+    """
+    Returns positions of all pattern occurrences in buffer
+    """
+    positions = np.flatnonzero(buf[:len(buf) - len(pattern) + 1] == pattern[0])
+    for i in range(1, len(pattern)):
+        positions = positions[buf[positions + i] == pattern[i]]
+    return positions
+
+
+def unique_sorted(values: np.ndarray
+                  ) -> np.ndarray:
+    """
+    Returns unique values of sorted array
+    """
+    return values[np.append(True, values[1:] != values[:-1])] if len(values) else values
+
+
+def rows_all(mask: np.ndarray
+             ) -> np.ndarray:
+    """
+    Returns True for rows of bool mask with all True, 8 columns are compared at once as uint64
+    """
+    words = mask.view('<u8')  # Row of all True is 0x01 in each byte
+    result = words[:, 0] == WORD_ONES
+    for i in range(1, words.shape[1]):
+        result &= words[:, i] == WORD_ONES
+    return result
+
+
+def rows_count(mask: np.ndarray
+               ) -> np.ndarray:
+    """
+    Returns number of True in rows of bool mask, bytes of uint64 are summed into the top one by multiplication
+    """
+    words = mask.view('<u8')
+    # Top byte of word * 0x0101010101010101 is sum of all its bytes, at most 8, so no carry between bytes
+    return sum((words[:, i] * WORD_ONES) >> np.uint64(56) for i in range(words.shape[1]))
+
+
+def rows_first(mask: np.ndarray
+               ) -> np.ndarray:
+    """
+    Returns index of the first True in rows of bool mask or number of columns if there is none.
+    Lowest set byte of uint64 is isolated and multiplication moves its index to the top byte
+    """
+    words = mask.view('<u8')
+    first = np.full(len(mask), mask.shape[1], dtype=np.int64)
+    for i in reversed(range(words.shape[1])):
+        word = words[:, i]
+        # word & -word keeps the lowest set bit, for True at byte k it is 1 << 8k. Multiplication shifts
+        # BYTE_INDEX left by k bytes, its byte 7 - k with value k becomes the top byte
+        lowest = word & (~word + np.uint64(1))
+        first = np.where(word != 0, 8 * i + ((lowest * BYTE_INDEX) >> np.uint64(56)).astype(np.int64), first)
+    return first
+
+
+def read_rows(windows: np.ndarray,
+              starts: np.ndarray
+              ) -> np.ndarray:
+    """
+    Returns FIELD_WIDTH bytes from each start as rows of uint8, windows is buffer viewed as overlapping items
+    of FIELD_WIDTH bytes, so each row is one copy
+    """
+    return windows[np.clip(starts, 0, len(windows) - 1)].view(np.uint8).reshape(-1, FIELD_WIDTH)
+
+
+def is_digit(chars: np.ndarray
+             ) -> np.ndarray:
+    return chars - np.uint8(ord('0')) < 10
+
+
+def eight_digits(words: np.ndarray
+                 ) -> np.ndarray:
+    """
+    Returns numbers of 8 ASCII digits in uint64, the first digit in the lowest byte
+    """
+    # Digits d0..d7 in bytes 0..7
+    words = words - np.uint64(0x3030303030303030)
+    # Byte 2i is 10 * d2i + d2i+1, at most 99, so bytes do not overflow. Odd bytes are not used
+    words = words * np.uint64(10) + (words >> np.uint64(8))
+    # Pairs p0, p2 in bytes 0, 4 and p1, p3 in bytes 2, 6 are multiplied so that the high 32 bits of sum are
+    # p0 * 1000000 + p2 * 100 and p1 * 10000 + p3, low 32 bits (p0 * 100 + p1) do not carry into them
+    return ((words & np.uint64(0x000000FF000000FF)) * np.uint64(100 + (1000000 << 32))
+            + ((words >> np.uint64(16)) & np.uint64(0x000000FF000000FF)) * np.uint64(1 + (10000 << 32))
+            ) >> np.uint64(32)
+
+
+def parse_decimal(windows: np.ndarray,
+                  starts: np.ndarray,
+                  chars: np.ndarray,
+                  lengths: np.ndarray
+                  ) -> tuple:
+    """
+    Returns (valid, value, fallback) of fields matching \\d+\\.\\d+. Field is read again with dot after
+    the 8th byte, so integer part and fraction are parsed as 8 digits each. Value is integer of all digits divided
+    by power of ten, both are exact in float64, so result is the same as float() of the text.
+    Fields with more than 8 digits before dot or 7 after it are marked in fallback
+    """
+    padding = np.arange(FIELD_WIDTH) >= lengths[:, None]
+    dots = (chars == ord('.')) & ~padding
+    dot = rows_first(dots)
+    valid = (rows_count(dots) == 1) & rows_all(is_digit(chars) | dots | padding) & (dot > 0) & (dot < lengths - 1)
+    fraction = lengths - dot - 1
+    fallback = valid & ((dot > 8) | (fraction > 7))
+    fraction = np.clip(fraction, 0, 7).astype(np.uint64)
+    # Field is read from 8 bytes before dot: word 0 is integer part ending at its top byte, word 1 is dot
+    # in byte 0 and fraction in bytes 1-7. Field starts after 'MESSAGE,' and dot is at most 8 bytes
+    # after it in valid fields not in fallback, so their read is within buffer and not moved by clip of read_rows
+    aligned = read_rows(windows, starts + dot - 8).view('<u8')
+    zeros = np.uint64(0x3030303030303030)
+    # Bytes out of field are replaced with '0'
+    kept = np.uint64(0xFFFFFFFFFFFFFFFF) << (np.uint64(8) * (np.uint64(8) - np.minimum(dot, 8).astype(np.uint64)))
+    integer = eight_digits(aligned[:, 0] & kept | zeros & ~kept)
+    # Fraction digits of bytes 1-fraction, dot and bytes after field are '0', so they are divided off as trailing zeros
+    kept = ((np.uint64(1) << np.uint64(8) * fraction) - np.uint64(1)) << np.uint64(8)
+    fraction_digits = eight_digits(aligned[:, 1] & kept | zeros & ~kept) // POWERS_OF_TEN[7 - fraction]
+    mantissa = integer * POWERS_OF_TEN[fraction] + fraction_digits
+    return valid, mantissa.astype(np.float64) / POWERS_OF_TEN[fraction].astype(np.float64), fallback
+
+
+def parse_messages(buf: np.ndarray,
+                   positions: np.ndarray,
+                   line_ends: np.ndarray,
+                   stars: np.ndarray,
+                   flag: bytes,
+                   ) -> dict:
+    """
+    Parses lines with one MESSAGE at positions the same way as RecordReader.read, all lines at once.
+    Returns arrays of Columns fields and lat, lon. Lines which can not be parsed here are marked
+    in 'fallback' to be parsed by RecordReader
+    """
+    size = len(buf)
+    rows = np.arange(len(positions))
+    columns = np.arange(FIELD_WIDTH)
+    windows = np.ndarray(shape=(size - FIELD_WIDTH + 1,), dtype=f'V{FIELD_WIDTH}', buffer=buf, strides=(1,))
+    # Flag, counter, time, lat, N, lon: each field ends with the first comma in FIELD_WIDTH bytes after
+    # the previous one. Field is valid only if all commas before it are in the same line
+    starts, fields, lengths, inside = [], [], [], []
+    valid = np.ones(len(positions), dtype=bool)
+    fallback = np.zeros(len(positions), dtype=bool)
+    start = positions + 8
+    for _ in range(6):
+        fallback |= valid & (start > size - FIELD_WIDTH)
+        chars = read_rows(windows, start)
+        length = rows_first((chars == ord(',')) | (chars == ord('\n')))
+        # Field of digits and dots longer than window
+        fallback |= valid & (length == FIELD_WIDTH) & rows_all(is_digit(chars) | (chars == ord('.')))
+        valid &= chars[rows, np.minimum(length, FIELD_WIDTH - 1)] == ord(',')
+        starts.append(start)
+        fields.append(chars)
+        lengths.append(np.where(valid, length, 0))
+        inside.append(valid.copy())
+        start = start + length + 1
+
+    flag_length, counter_length, time_length = lengths[0], lengths[1], lengths[2]
+    time = fields[2]
+    # Index of '.' in time, 'hhmmss.ss' has it at 6. Time is \d*\.\d\d, seconds are valid if dot is at 6 or later
+    fraction = np.maximum(time_length - 3, 0)
+    time_digits = is_digit(time)
+    time_valid = (time_length == 0) | (
+        (time_length >= 3) & (time[rows, fraction] == ord('.'))
+        & time_digits[rows, fraction + 1] & time_digits[rows, fraction + 2]
+        & rows_all(time_digits | (columns >= fraction[:, None])))
+    match = (inside[2] & time_valid
+             & rows_all(is_digit(fields[0]) | (columns >= flag_length[:, None]))
+             & rows_all(is_digit(fields[1]) | (columns >= counter_length[:, None])))
+
+    lat_valid, lat, lat_fallback = parse_decimal(windows, starts[3], fields[3], lengths[3])
+    lon_valid, lon, lon_fallback = parse_decimal(windows, starts[5], fields[5], lengths[5])
+    # After 6 fields start is the byte after comma of lon, which must be 'E'
+    east = np.minimum(start, size - 1)
+    position = (inside[5] & lat_valid & lon_valid & (lengths[4] == 1) & (fields[4][:, 0] == ord('N'))
+                & (start < size) & (buf[east] == ord('E')))
+    fallback |= match & (lat_fallback | lon_fallback)
+    is_flag = flag_length == len(flag)
+    for i, char in enumerate(flag[:FIELD_WIDTH]):
+        is_flag &= fields[0][:, i] == char
+    # '*' after time and before line end, as RecordReader searches it from the char after time's comma
+    checksum = np.searchsorted(stars, starts[3]) < np.searchsorted(stars, line_ends)
+
+    # hhmmss are the first 6 chars of time, -1 marks time shorter than that as time_in_sec would fail
+    digit = time[:, :6].astype(np.int64) - ord('0')
+    seconds = np.where(
+        fraction >= 6,
+        (digit[:, 0] * 10 + digit[:, 1]) * 3600 + (digit[:, 2] * 10 + digit[:, 3]) * 60 + digit[:, 4] * 10 + digit[:, 5],
+        -1,
+    ).astype(np.float64)
+    has_time = match & (time_length > 0)
+    return {
+        'fallback': fallback,
+        'start_time': np.where(has_time & (flag_length > 0) & (counter_length > 0) & (fraction > 0), seconds, np.nan),
+        'fix': has_time & is_flag & (counter_length > 0) & position,
+        'fix_time': seconds,
+        'no_time': match & (time_length == 0),
+        'any_time': np.where(has_time & checksum, seconds, np.nan),
+        'lat': lat,
+        'lon': lon,
+    }
+
+
+def load_columns(data: mmap.mmap,
+                 reader: RecordReader,
+                 event: bytes,
+                 true_lat: float,
+                 true_lon: float,
+                 pos_threshold: int,
+                 ) -> Columns:
+    """
+    Finds lines with MESSAGE or EVENT and parses them into Columns with numpy
+    """
+    buf = np.frombuffer(data, dtype=np.uint8)
+    size = len(buf)
+    line_ends = np.flatnonzero(buf == ord('\n'))
+    messages = find_all(buf, b'MESSAGE,')
+    # Positions are sorted, so are their line numbers
+    message_lines = np.searchsorted(line_ends, messages)
+    event_lines = unique_sorted(np.searchsorted(line_ends, find_all(buf, event)))
+    lines = unique_sorted(np.sort(np.concatenate((message_lines, event_lines)), kind='stable'))
+    ends = np.append(line_ends, size)[lines]
+    count = len(lines)
+
+    event_rows = np.searchsorted(lines, event_lines)
+    columns = Columns(
+        event=np.zeros(count, dtype=bool),
+        start_time=np.full(count, np.nan),
+        fix=np.zeros(count, dtype=bool),
+        fix_time=np.full(count, np.nan),
+        good=np.zeros(count, dtype=bool),
+        no_time=np.zeros(count, dtype=bool),
+        any_time=np.full(count, np.nan),
+    )
+    columns.event[event_rows] = True
+    message_rows = np.searchsorted(lines, message_lines)
+    single = np.bincount(message_rows, minlength=count)[message_rows] == 1
+    fallback = [unique_sorted(message_rows[~single])]
+    stars = np.flatnonzero(buf == ord('*'))
+    meters_in_lon = math.cos(math.radians(true_lat)) * 111321.3778
+    # Files shorter than one window are parsed by RecordReader
+    if size < FIELD_WIDTH:
+        fallback.append(message_rows[single])
+    for chunk in range(0, len(messages) if size >= FIELD_WIDTH else 0, RECORDS_CHUNK):
+        positions = messages[chunk:chunk + RECORDS_CHUNK][single[chunk:chunk + RECORDS_CHUNK]]
+        rows = message_rows[chunk:chunk + RECORDS_CHUNK][single[chunk:chunk + RECORDS_CHUNK]]
+        parsed = parse_messages(buf, positions, ends[rows], stars, reader.flag)
+        fallback.append(rows[parsed['fallback']])
+        parsed_rows = ~parsed['fallback']
+        rows = rows[parsed_rows]
+        for name in ('start_time', 'fix', 'fix_time', 'no_time', 'any_time'):
+            getattr(columns, name)[rows] = parsed[name][parsed_rows]
+        # Same operations as delta_ll, so results are equal
+        delta_lat_m = (true_lat - parsed['lat'][parsed_rows]) * 111134.8611
+        delta_lon_m = meters_in_lon * (true_lon - parsed['lon'][parsed_rows])
+        delta = np.sqrt(delta_lat_m ** 2 + delta_lon_m ** 2)
+        columns.good[rows] = columns.fix[rows] & ~(delta > pos_threshold)
+    columns.fix_time[~columns.fix] = np.nan
+
+    # Several MESSAGE in line or too long fields
+    line_starts = np.append(0, line_ends + 1)[lines]
+    for row in np.concatenate(fallback):
+        record = reader.read(data[line_starts[row]:ends[row]])
+        if record.start_time is not None:
+            columns.start_time[row] = time_or_invalid(record.start_time)
+        if record.fix is not None:
+            time, lat, lon = record.fix
+            columns.fix[row] = True
+            columns.fix_time[row] = time_or_invalid(time)
+            columns.good[row] = not delta_ll(lat=lat, lon=lon, true_lat=true_lat, true_lon=true_lon) > pos_threshold
+        columns.no_time[row] = record.no_time
+        if record.any_time is not None:
+            columns.any_time[row] = time_or_invalid(record.any_time)
+    return columns
+
+
+def time_or_invalid(time_str: bytes
+                    ) -> float:
+    """
+    Returns time in seconds or -1 if time_in_sec fails
+    """
+    try:
+        return time_in_sec(time_str)
+    except ValueError:
+        return -1.0
+
+
+def find_trials_numpy(data: mmap.mmap,
+                      reader: RecordReader,
+                      true_lat: float,
+                      true_lon: float,
+                      event: bytes,
+                      pos_threshold: int,
+                      duration: int,
+                      good_pos_counter: int,
+                      ) -> list:
+    """
+    Returns the same trials as find_trials. Lines are loaded into Columns and trial ends are found with
+    searchsorted instead of line by line: the fix finishing a trial is where cumulative count of good
+    positions since EVENT or since the last bad position reaches good_pos_counter,
+    failed trials are EVENT before this fix. Its time does not depend on positions: it is faster than find_trials
+    when bad positions after EVENT have lat close to reference and are not skipped by lat_band search
+    """
+    columns = load_columns(data, reader, event, true_lat, true_lon, pos_threshold)
+    events = np.flatnonzero(columns.event)
+    fails = np.flatnonzero(columns.event & ~columns.fix)  # EVENT in line with fix is skipped after start
+    starts = np.flatnonzero(~np.isnan(columns.start_time))
+    # Lines changing message_time or time_is_empty, time is NaN for empty time
+    new_time = np.where(columns.fix, columns.fix_time, columns.any_time)
+    timed = np.flatnonzero(columns.fix | columns.no_time | ~np.isnan(columns.any_time))
+    # find_trials converts each time after EVENT, so invalid one fails it when reached
+    invalid = np.append(0, np.cumsum((columns.fix_time < 0) | (columns.any_time < 0) & ~columns.fix))
+    # and each start time before EVENT
+    invalid_start = np.append(0, np.cumsum(columns.start_time < 0))
+
+    # Run length of good positions, fixes are numbered in order
+    fixes = np.flatnonzero(columns.fix)
+    good = columns.good[fixes]
+    good_count = np.cumsum(good)
+    last_bad = np.maximum.accumulate(np.where(good, -1, np.arange(len(fixes))))
+    run_length = good_count - np.where(last_bad >= 0, good_count[last_bad], 0)
+    bad = np.flatnonzero(~good)
+    needed = max(good_pos_counter, 1)
+    run_ends = np.flatnonzero(good & (run_length >= needed))
+
+    message_time = None
+    trial = 0
+    trial_stop_time = {}
+    trials = []
+    row = 0
+    while True:
+        # Last start time before EVENT
+        i = np.searchsorted(events, row)
+        end = events[i] if i < len(events) else len(columns.event) - 1
+        if invalid_start[end + 1] > invalid_start[row]:
+            raise ValueError('time of MESSAGE is shorter than hhmmss')
+        last = np.searchsorted(starts, end, side='right') - 1
+        if last >= 0 and starts[last] >= row:
+            message_time = column_time(columns.start_time[starts[last]])
+        if i == len(events):
+            break
+        if message_time is None:
+            raise ValueError(f'No MESSAGE with time before {event.decode()}')
+        trial += 1
+        if trial > 1:
+            trial_stop_time[trial-1] = t.strftime('%H:%M:%S', t.gmtime(message_time))
+        start_stop = [message_time]
+        logging.debug('*'*20)
+        start_time = t.strftime('%H:%M:%S', t.gmtime(message_time))
+        logging.debug(f'Trial {trial} start:{message_time}; {start_time}')
+        row = end + 1
+
+        # Fix finishing the trial: enough good positions before the first bad one or the first long enough run after it.
+        # pos_counter is not reset by failed trials, so the run may start before the last fail
+        first = np.searchsorted(fixes, row)
+        i = np.searchsorted(bad, first)
+        first_bad = bad[i] if i < len(bad) else len(fixes)
+        done = np.searchsorted(good_count, (good_count[first-1] if first > 0 else 0) + needed)
+        run_start = first
+        if done >= first_bad:
+            i = np.searchsorted(run_ends, first_bad)
+            done = run_ends[i] if i < len(run_ends) else len(fixes)
+            run_start = last_bad[done] + 1 if done < len(fixes) else None
+        stop = fixes[done] if done < len(fixes) else len(columns.event)
+
+        time_is_empty = False
+        previous = row - 1
+        for fail in fails[np.searchsorted(fails, row):np.searchsorted(fails, stop)]:
+            if invalid[fail + 1] > invalid[previous + 1]:
+                raise ValueError('time of MESSAGE is shorter than hhmmss')
+            last = np.searchsorted(timed, fail, side='right') - 1
+            if last >= 0 and timed[last] > previous:
+                time_is_empty = bool(np.isnan(new_time[timed[last]]))
+                if not time_is_empty:
+                    message_time = column_time(new_time[timed[last]])
+            if not time_is_empty:
+                stop_time = t.strftime('%H:%M:%S', t.gmtime(message_time))
+            else:
+                message_time = (datetime.strptime(trial_stop_time[trial-1], '%H:%M:%S') + timedelta(seconds=duration)).time()
+                message_time = (message_time.hour * 60 + message_time.minute) * 60 + message_time.second
+                stop_time = t.strftime('%H:%M:%S', t.gmtime(message_time))
+            trial_stop_time[trial] = stop_time
+            logging.debug(f'Trial {trial} stop: FAIL; {stop_time}')
+            trial += 1
+            trials.append('fail')
+            start_stop = [message_time]
+            logging.debug('*'*20)
+            start_time = t.strftime('%H:%M:%S', t.gmtime(message_time))
+            logging.debug(f'Trial {trial} start:{message_time}; {start_time}')
+            previous = fail
+        if invalid[min(stop + 1, len(invalid) - 1)] > invalid[previous + 1]:
+            raise ValueError('time of MESSAGE is shorter than hhmmss')
+        if run_start is None:
+            break
+
+        # Run started before the last fail is not added to start_stop
+        if fixes[run_start] > previous:
+            expected_tts = column_time(columns.fix_time[fixes[run_start]])
+            if expected_tts - start_stop[0] < 0:
+                expected_tts += 86400
+            start_stop.append(expected_tts)
+        tts = start_stop[-1] - start_stop[0]
+        if tts < 0:   # if day rollover
+            tts += 86400
+        trials.append(tts)
+        message_time = column_time(columns.fix_time[stop])
+        logging.debug(f'Trial {trial} stop:sec {start_stop[-1]}; tts {tts}')
+        row = stop + 1
+    return trials
+
+
+def chunk_bounds(data: mmap.mmap,
+                 event: bytes,
+                 chunks: int
+                 ) -> list:
+    """
+    Returns starts of chunks of about equal size, each chunk except the first one starts with line with EVENT
+    """
+    bounds = [0]
+    for i in range(1, chunks):
+        index = data.find(event, max(len(data) * i // chunks, bounds[-1]))
+        if index < 0:
+            break
+        start = data.rfind(b'\n', 0, index) + 1
+        if start > bounds[-1]:
+            bounds.append(start)
+    return bounds
+
+
+def find_trials_chunk(file: str,
+                      flag: int,
+                      true_lat: float,
+                      true_lon: float,
+                      event: bytes,
+                      pos_threshold: int,
+                      duration: int,
+                      good_pos_counter: int,
+                      start: int,
+                      end: int,
+                      low: int,
+                      ) -> tuple:
+    """
+    Processes chunk of file in worker process. Trial before the chunk is assumed finished and message_time
+    is taken from the last MESSAGE after low. Returns (trials, state, checkpoints) of find_trials_part.
+    The assumption is only a guess: times before start are checked when the previous chunk is processed
+    and find_trials_parallel takes the result from the first checkpoint where the state matches
+    """
+    with open(file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        reader = RecordReader(flag)
+        state = INITIAL_STATE
+        if start > 0:
+            time = last_start_time(data, reader, low, start)
+            state = state._replace(message_time=time_in_sec(time) if time is not None else None, trial=1)
+        checkpoints = []
+        trials, state = find_trials_part(
+            data=data,
+            reader=reader,
+            true_lat=true_lat,
+            true_lon=true_lon,
+            event=event,
+            pos_threshold=pos_threshold,
+            duration=duration,
+            good_pos_counter=good_pos_counter,
+            start=start,
+            end=end,
+            state=state,
+            checkpoints=checkpoints,
+            progress=False,
+        )
+    return trials, state, checkpoints
+
+
+def find_trials_parallel(file: str,
+                         flag: int,
+                         true_lat: float,
+                         true_lon: float,
+                         event: bytes,
+                         pos_threshold: int,
+                         duration: int,
+                         good_pos_counter: int,
+                         workers: int,
+                         ) -> list:
+    """
+    Returns the same trials as find_trials, file is split at EVENT lines and chunks are processed in process pool.
+    Each chunk assumes the trial before it is finished. Results are merged in order: from the first checkpoint
+    where state of the previous chunks is the same as assumed, the chunk result is taken as is,
+    before it the chunk is processed again with the right state
+    """
+    with open(file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data, \
+            ProcessPoolExecutor(max_workers=workers) as pool:
+        bounds = chunk_bounds(data, event, workers * CHUNKS_PER_WORKER)
+        ends = bounds[1:] + [len(data)]
+        futures = [
+            pool.submit(find_trials_chunk, file, flag, true_lat, true_lon, event, pos_threshold, duration,
+                        good_pos_counter, start, end, low)
+            for low, start, end in zip([0] + bounds, bounds, ends)
+        ]
+        reader = RecordReader(flag)
+        progress = tqdm(total=len(data), desc='In process...', unit='B', unit_scale=True)
+        trials = []
+        state = INITIAL_STATE
+        for start, end, future in zip(bounds, ends, futures):
+            try:
+                chunk_trials, chunk_state, checkpoints = future.result()
+            except Exception as e:
+                # Error may be caused by wrong assumption, the chunk is processed again
+                logging.debug(f'Chunk {start}-{end} failed: {e}')
+                checkpoints = []
+            pos = start
+            for checkpoint, count, message_time in checkpoints:
+                if pos < checkpoint:
+                    part, state = find_trials_part(
+                        data, reader, true_lat, true_lon, event, pos_threshold, duration, good_pos_counter,
+                        start=pos, end=checkpoint, state=state, progress=False,
+                    )
+                    trials += part
+                    pos = checkpoint
+                if state.trial > 0 and state == TrialState(False, message_time, state.trial, 0, [], False,
+                                                     state.trial_stop_time, state.expected_tts):
+                    trials += chunk_trials[count:]
+                    state = chunk_state
+                    pos = end
+                    break
+            if pos < end:
+                part, state = find_trials_part(
+                    data, reader, true_lat, true_lon, event, pos_threshold, duration, good_pos_counter,
+                    start=pos, end=end, state=state, progress=False,
+                )
+                trials += part
+            progress.update(end - start)
+        progress.close()
+    return trials
+
+
+ENGINES = {
+    'lines': find_trials,
+    'numpy': find_trials_numpy,
+}
+
+
 def process_data(
         flag: int,
         true_lat: float,
@@ -57,10 +1018,19 @@ def process_data(
         duration: int,
         good_pos_counter: int,
         file: str,
+        engine: str = 'lines',
+        workers: int = 1,
         ) -> dict | None:
     """
-    Analyzes data and returns statistics of tts (time to start) in dict format for further demonstration
+    Analyzes data and returns statistics of tts (time to start) in dict format for further demonstration.
+    engine is 'lines' (find_trials) or 'numpy' (find_trials_numpy), results are the same.
+    With workers > 1 file is processed in parallel by find_trials_parallel, only for engine 'lines'
     """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine {engine}, expected one of: {', '.join(ENGINES)}")
+    if workers > 1 and engine != 'lines':
+        raise ValueError("Parallel processing is supported only for engine 'lines'")
+
     # Prepare or clean result folder
     result_folder = os.path.join(os.getcwd(), 'results')
     if not os.path.exists(result_folder):
@@ -79,81 +1049,30 @@ def process_data(
 
     event = event.encode()
     trials = []
-    with open(file, 'rb') as f:
-        trial = 0
-        pos_counter = 0
-        start_stop = []
-        time_is_empty = False
-        switch_message_search = False
-        trial_stop_time = {}
-        for line in tqdm(f, desc='In process...',unit=''):
-            if (b'MESSAGE,' in line or event in line) and switch_message_search is False:
-                if b'MESSAGE' in line:
-                    if find_string(line, f'MESSAGE,\d+,\d+,\d+\.\d\d,'):
-                        time = re.match(f'.*MESSAGE,\d+,\d+,(\d+\.\d\d),'.encode(), line).group(1)
-                        message_time = time_in_sec(time)
-                if event in line:
-                    trial += 1
-                    if trial > 1:
-                        trial_stop_time[trial-1] = t.strftime('%H:%M:%S', t.gmtime(message_time))
-                    start_stop.append(message_time)
-                    switch_message_search = True
-                    logging.debug('*'*20)
-                    start_time = t.strftime('%H:%M:%S', t.gmtime(message_time))
-                    logging.debug(f'Trial {trial} start:{message_time}; {start_time}')
-                continue
-            if (b'MESSAGE' in line or event in line) and switch_message_search is True:
-                if find_string(line, f'MESSAGE,{flag},\d+,\d*\.\d\d,\d+\.\d+,N,\d+\.\d+,E'):
-                    time = re.match(r'.*MESSAGE,\d+,\d+,(\d+\.\d\d),(\d+\.\d+),N,(\d+\.\d+),E'.encode(), line).group(1)
-                    lat = re.match(r'.*MESSAGE,\d+,\d+,(\d+\.\d\d),(\d+\.\d+),N,(\d+\.\d+),E'.encode(), line).group(2)
-                    lon = re.match(r'.*MESSAGE,\d+,\d+,(\d+\.\d\d),(\d+\.\d+),N,(\d+\.\d+),E'.encode(), line).group(3)
-                    message_time = time_in_sec(time)
-                    time_is_empty = False
-                    if delta_ll(lat=lat, lon=lon, true_lat=true_lat, true_lon=true_lon) > pos_threshold:
-                        logging.debug(f'delta {delta_ll(lat=lat, lon=lon, true_lat=true_lat, true_lon=true_lon)}; {time}')
-                        pos_counter = 0
-                        continue
-                    if pos_counter == 0:
-                        expected_tts = time_in_sec(time)
-                        if expected_tts - start_stop[0] < 0:
-                            expected_tts += 86400
-                        start_stop.append(expected_tts)
-                    pos_counter += 1
-                    if pos_counter < good_pos_counter:
-                        continue
-                    tts = start_stop[-1] - start_stop[0]
-                    if tts < 0:   # if day rollover
-                        tts += 86400
-                    trials.append(tts)
-                    stop_time = t.strftime('%H:%M:%S', t.gmtime(expected_tts))
-                    logging.debug(f'Trial {trial} stop:sec {expected_tts}; tts {tts}; {stop_time}')
-                    start_stop = []
-                    pos_counter = 0
-                    switch_message_search = False
-                    continue
-                if find_string(line, f'MESSAGE,\d*,\d*,,'):
-                    time_is_empty = True
-                if find_string(line, f'MESSAGE,\d*,\d*,\d*\.\d\d,.*?\*'):
-                    time = re.match(r'.*MESSAGE,\d*,\d*,(\d*\.\d\d),.*?\*'.encode(), line).group(1)
-                    message_time = time_in_sec(time)
-                    time_is_empty = False
-                if event in line:
-                    if not time_is_empty:
-                        stop_time = t.strftime('%H:%M:%S', t.gmtime(message_time))
-                    else:
-                        message_time = (datetime.strptime(trial_stop_time[trial-1], '%H:%M:%S') + timedelta(seconds=duration)).time()
-                        message_time = (message_time.hour * 60 + message_time.minute) * 60 + message_time.second
-                        stop_time = t.strftime('%H:%M:%S', t.gmtime(message_time))
-                    trial_stop_time[trial] = stop_time
-                    logging.debug(f'Trial {trial} stop: FAIL; {stop_time}')
-                    trial += 1
-                    trials.append('fail')
-                    start_stop.clear()
-                    start_stop.append(message_time)
-                    logging.debug('*'*20)
-                    start_time = t.strftime('%H:%M:%S', t.gmtime(message_time))
-                    logging.debug(f'Trial {trial} start:{message_time}; {start_time}')
-                    continue
+    if os.path.getsize(file) > 0 and workers > 1:
+        trials = find_trials_parallel(
+            file=file,
+            flag=flag,
+            true_lat=true_lat,
+            true_lon=true_lon,
+            event=event,
+            pos_threshold=pos_threshold,
+            duration=duration,
+            good_pos_counter=good_pos_counter,
+            workers=workers,
+        )
+    elif os.path.getsize(file) > 0:
+        with open(file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            trials = ENGINES[engine](
+                data=data,
+                reader=RecordReader(flag),
+                true_lat=true_lat,
+                true_lon=true_lon,
+                event=event,
+                pos_threshold=pos_threshold,
+                duration=duration,
+                good_pos_counter=good_pos_counter,
+            )
 
     success_trials = [x for x in trials if x != 'fail']
     logging.debug(success_trials)
@@ -203,6 +1122,8 @@ if __name__ == "__main__":
         duration=int(config.get('Settings', 'duration')),
         good_pos_counter=int(config.get('Settings', 'good_pos_counter')),
         file=config.get('Settings', 'file'),
+        engine=config.get('Settings', 'engine', fallback='lines'),
+        workers=int(config.get('Settings', 'workers', fallback='1')),
     )
 
 
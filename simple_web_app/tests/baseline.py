@@ -0,0 +1,117 @@
+"""
+Trial detection loop of process_data before the tokenizer, numpy and parallel engines were added,
+kept unchanged as the reference their results are compared with
+"""
+import re
+import time as t
+import logging
+from datetime import datetime, timedelta
+
+from process_data import delta_ll
+
+
+def find_string(line: bytes,
+                reg_expr: str
+                ) -> bool:
+    """
+    Returns True if pattern is found
+    """
+    if re.search(reg_expr.encode(), line):
+        return True
+
+
+def time_in_sec(time_str: str
+                ) -> float:
+    """
+    Returns time from MESSAGE in seconds
+    """
+    return timedelta(hours=int(time_str[0:2]), minutes=int(time_str[2:4]),
+                     seconds=int(time_str[4:6])).total_seconds()
+
+
+def baseline_trials(file: str,
+                    flag: int,
+                    true_lat: float,
+                    true_lon: float,
+                    event: bytes,
+                    pos_threshold: int,
+                    duration: int,
+                    good_pos_counter: int,
+                    ) -> list:
+    trials = []
+    with open(file, 'rb') as f:
+        trial = 0
+        pos_counter = 0
+        start_stop = []
+        time_is_empty = False
+        switch_message_search = False
+        trial_stop_time = {}
+        for line in f:
+            if (b'MESSAGE,' in line or event in line) and switch_message_search is False:
+                if b'MESSAGE' in line:
+                    if find_string(line, r'MESSAGE,\d+,\d+,\d+\.\d\d,'):
+                        time = re.match(r'.*MESSAGE,\d+,\d+,(\d+\.\d\d),'.encode(), line).group(1)
+                        message_time = time_in_sec(time)
+                if event in line:
+                    trial += 1
+                    if trial > 1:
+                        trial_stop_time[trial-1] = t.strftime('%H:%M:%S', t.gmtime(message_time))
+                    start_stop.append(message_time)
+                    switch_message_search = True
+                    logging.debug('*'*20)
+                    start_time = t.strftime('%H:%M:%S', t.gmtime(message_time))
+                    logging.debug(f'Trial {trial} start:{message_time}; {start_time}')
+                continue
+            if (b'MESSAGE' in line or event in line) and switch_message_search is True:
+                if find_string(line, f'MESSAGE,{flag},' + r'\d+,\d*\.\d\d,\d+\.\d+,N,\d+\.\d+,E'):
+                    time = re.match(r'.*MESSAGE,\d+,\d+,(\d+\.\d\d),(\d+\.\d+),N,(\d+\.\d+),E'.encode(), line).group(1)
+                    lat = re.match(r'.*MESSAGE,\d+,\d+,(\d+\.\d\d),(\d+\.\d+),N,(\d+\.\d+),E'.encode(), line).group(2)
+                    lon = re.match(r'.*MESSAGE,\d+,\d+,(\d+\.\d\d),(\d+\.\d+),N,(\d+\.\d+),E'.encode(), line).group(3)
+                    message_time = time_in_sec(time)
+                    time_is_empty = False
+                    if delta_ll(lat=lat, lon=lon, true_lat=true_lat, true_lon=true_lon) > pos_threshold:
+                        logging.debug(f'delta {delta_ll(lat=lat, lon=lon, true_lat=true_lat, true_lon=true_lon)}; {time}')
+                        pos_counter = 0
+                        continue
+                    if pos_counter == 0:
+                        expected_tts = time_in_sec(time)
+                        if expected_tts - start_stop[0] < 0:
+                            expected_tts += 86400
+                        start_stop.append(expected_tts)
+                    pos_counter += 1
+                    if pos_counter < good_pos_counter:
+                        continue
+                    tts = start_stop[-1] - start_stop[0]
+                    if tts < 0:   # if day rollover
+                        tts += 86400
+                    trials.append(tts)
+                    stop_time = t.strftime('%H:%M:%S', t.gmtime(expected_tts))
+                    logging.debug(f'Trial {trial} stop:sec {expected_tts}; tts {tts}; {stop_time}')
+                    start_stop = []
+                    pos_counter = 0
+                    switch_message_search = False
+                    continue
+                if find_string(line, r'MESSAGE,\d*,\d*,,'):
+                    time_is_empty = True
+                if find_string(line, r'MESSAGE,\d*,\d*,\d*\.\d\d,.*?\*'):
+                    time = re.match(r'.*MESSAGE,\d*,\d*,(\d*\.\d\d),.*?\*'.encode(), line).group(1)
+                    message_time = time_in_sec(time)
+                    time_is_empty = False
+                if event in line:
+                    if not time_is_empty:
+                        stop_time = t.strftime('%H:%M:%S', t.gmtime(message_time))
+                    else:
+                        message_time = (datetime.strptime(trial_stop_time[trial-1], '%H:%M:%S') + timedelta(seconds=duration)).time()
+                        message_time = (message_time.hour * 60 + message_time.minute) * 60 + message_time.second
+                        stop_time = t.strftime('%H:%M:%S', t.gmtime(message_time))
+                    trial_stop_time[trial] = stop_time
+                    logging.debug(f'Trial {trial} stop: FAIL; {stop_time}')
+                    trial += 1
+                    trials.append('fail')
+                    start_stop.clear()
+                    start_stop.append(message_time)
+                    logging.debug('*'*20)
+                    start_time = t.strftime('%H:%M:%S', t.gmtime(message_time))
+                    logging.debug(f'Trial {trial} start:{message_time}; {start_time}')
+                    continue
+    return trials
@@ -0,0 +1,155 @@
+import mmap
+import os
+import random
+
+import pytest
+
+import process_data
+from baseline import baseline_trials
+from process_data import (
+    ENGINES,
+    RecordReader,
+    find_trials_parallel,
+)
+
+EDGE_CASES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'edge_cases.log')
+SETTINGS = dict(true_lat=55.753152, true_lon=37.621820, event=b'EVENT', pos_threshold=10, duration=300)
+
+
+def outcome(function, **kwargs):
+    """
+    Returns trials or 'error'. Baseline fails on some broken logs with other exceptions than ValueError,
+    so only the fact of error is compared
+    """
+    try:
+        return function(**kwargs)
+    except Exception:
+        return 'error'
+
+
+def run_engines(file, good_pos_counter, flag=1):
+    """Returns {engine: trials or 'error'} of baseline, all ENGINES and of parallel processing with 2 workers"""
+    results = {'baseline': outcome(baseline_trials, file=file, flag=flag, good_pos_counter=good_pos_counter,
+                                   **SETTINGS)}
+    with open(file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        for name, engine in ENGINES.items():
+            results[name] = outcome(engine, data=data, reader=RecordReader(flag), good_pos_counter=good_pos_counter,
+                                    **SETTINGS)
+    results['parallel'] = outcome(find_trials_parallel, file=file, flag=flag, good_pos_counter=good_pos_counter,
+                                  workers=2, **SETTINGS)
+    return results
+
+
+def random_log(path, lines, seed, short_times=0.0):
+    """
+    Log with random mix of good and bad positions, empty times, several MESSAGE in line and EVENT,
+    short_times is share of times shorter than hhmmss
+    """
+    rnd = random.Random(seed)
+    seconds = 86400 - 600  # Trials cross midnight
+    with open(path, 'w') as f:
+        f.write('MESSAGE,1,0,235000.00,55.753152,N,37.621820,E*00\n')
+        for counter in range(1, lines):
+            seconds = (seconds + rnd.choice((1, 1, 1, 2, 5))) % 86400
+            time = f'{seconds // 3600:02d}{seconds // 60 % 60:02d}{seconds % 60:02d}.{rnd.randrange(100):02d}'
+            if rnd.random() < short_times:
+                time = rnd.choice(('12.30', '.30', '1234.56', '12345.67'))
+            lat = rnd.choice(('55.753152', '055.753152', '55.75315')) if rnd.random() < 0.6 else \
+                f'55.7{rnd.randrange(10000, 99999)}'
+            kind = rnd.random()
+            if kind < 0.05:
+                f.write('EVENT\n')
+            elif kind < 0.08:
+                f.write(f'MESSAGE,1,{counter},,*{counter % 100:02d}\n')
+            elif kind < 0.1:
+                f.write(f'MESSAGE,1,{counter},{time},{lat},N,37.621820,E MESSAGE,2,{counter},{time},,*00\n')
+            else:
+                flag = rnd.choice((1, 1, 1, 2))
+                checksum = f'*{counter % 100:02d}' if rnd.random() < 0.9 else ''
+                f.write(f'MESSAGE,{flag},{counter},{time},{lat},N,{rnd.choice(("37.621820", "37.6218201234"))},E'
+                        f'{checksum}\n')
+
+
+@pytest.mark.parametrize('good_pos_counter', [1, 2, 3])
+def test_engines_on_edge_cases(good_pos_counter):
+    results = run_engines(EDGE_CASES, good_pos_counter)
+    assert results['baseline'] != 'error' and results['baseline']
+    for name, trials in results.items():
+        assert trials == results['baseline'], name
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_engines_on_random_log(tmp_path, seed):
+    path = str(tmp_path / 'random.log')
+    random_log(path, 20000, seed)
+    results = run_engines(path, good_pos_counter=seed + 1)
+    assert 'fail' in results['baseline'] and len(set(results['baseline'])) > 2
+    for name, trials in results.items():
+        assert trials == results['baseline'], name
+
+
+@pytest.mark.parametrize('lat, lon', [
+    ('55.753400', '37.621820'),  # Bad lat close to reference, passes lat_band prefix
+    ('55.753152', '37.631820'),  # Bad lon only, each line is parsed by lines engine
+])
+def test_engines_on_bad_positions_near_reference(tmp_path, lat, lon):
+    path = tmp_path / 'near.log'
+    lines = []
+    for counter in range(20000):
+        seconds = counter % 86400
+        time = f'{seconds // 3600:02d}{seconds // 60 % 60:02d}{seconds % 60:02d}.00'
+        if counter % 500 == 0 and counter:
+            lines.append('EVENT')
+        elif counter % 500 < 495:
+            lines.append(f'MESSAGE,1,{counter},{time},{lat},N,{lon},E*00')
+        else:
+            lines.append(f'MESSAGE,1,{counter},{time},55.753152,N,37.621820,E*00')
+    path.write_text('\n'.join(lines) + '\n')
+    results = run_engines(str(path), good_pos_counter=3)
+    assert results['baseline'] == [496.0] * 39
+    for name, trials in results.items():
+        assert trials == results['baseline'], name
+
+
+@pytest.mark.parametrize('seed', range(40))
+def test_engines_on_log_with_short_times(tmp_path, seed):
+    path = str(tmp_path / 'short_times.log')
+    random_log(path, 300, seed, short_times=0.005)
+    results = run_engines(path, good_pos_counter=seed % 3 + 1)
+    for name, trials in results.items():
+        assert trials == results['baseline'], name
+
+
+@pytest.mark.parametrize('line', [
+    b'MESSAGE,1,2,12.30,55.753152,N,37.621820,E*01\n',  # Start time before EVENT, not the last one
+    b'MESSAGE,2,2,1.30,55.753152,N,37.621820,E*01\n',  # Other flag
+])
+def test_engines_fail_on_short_time_before_event(tmp_path, line):
+    path = tmp_path / 'short_time.log'
+    path.write_bytes(b'MESSAGE,1,1,000100.00,55.753152,N,37.621820,E*00\nEVENT\n'
+                     b'MESSAGE,1,2,000110.00,55.753152,N,37.621820,E*01\n' + line +
+                     b'MESSAGE,1,3,000130.00,55.753152,N,37.621820,E*02\nEVENT\n')
+    results = run_engines(str(path), good_pos_counter=1)
+    assert set(results.values()) == {'error'}
+
+
+def test_engines_fail_on_short_time_after_event(tmp_path):
+    path = tmp_path / 'short_time.log'
+    lines = [b'MESSAGE,1,%d,0001%02d.00,55.763152,N,37.621820,E*00\n' % (i, i % 60) for i in range(2000)]
+    lines[1000] = b'MESSAGE,1,1000,1234.56,55.763152,N,37.621820,E*00\n'  # Bad fix far from the next good one
+    path.write_bytes(b'MESSAGE,1,1,000100.00,55.753152,N,37.621820,E*00\nEVENT\n' + b''.join(lines) +
+                     b'MESSAGE,1,1,000300.00,55.753152,N,37.621820,E*00\n')
+    results = run_engines(str(path), good_pos_counter=1)
+    assert set(results.values()) == {'error'}
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_parallel_chunks_on_log_with_short_times(tmp_path, monkeypatch, seed):
+    # Chunk per EVENT and short skips after EVENT check each boundary and skipped span
+    monkeypatch.setattr(process_data, 'CHUNKS_PER_WORKER', 50)
+    monkeypatch.setattr(process_data, 'LINES_WINDOW', 64)
+    path = str(tmp_path / 'short_times.log')
+    random_log(path, 300, seed, short_times=0.005)
+    expected = outcome(baseline_trials, file=path, flag=1, good_pos_counter=seed % 3 + 1, **SETTINGS)
+    trials = outcome(find_trials_parallel, file=path, flag=1, good_pos_counter=seed % 3 + 1, workers=2, **SETTINGS)
+    assert trials == expected